@@ -0,0 +1,161 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API, for load tests.
+
+Answers every prompt the app sends with plausible canned output: intent classification,
+chat synthesis (streamed or not), clause extraction and contract assembly JSON.
+Latency, streaming speed and a requests-per-minute limit are configurable, so provider
+slowness and 429s can be reproduced without a paid key.
+
+Usage:
+    python benchmarks/fake_llm_server.py --port 8100 --latency-ms 400 --jitter-ms 150 --rpm 300
+    GROQ_BASE_URL=http://127.0.0.1:8100 GROQ_API_KEY=fake python main.py
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake LLM")
+
+config = {"latency_ms": 300.0, "jitter_ms": 100.0, "chunk_delay_ms": 15.0, "rpm": 0}
+stats = {"requests": 0, "rate_limited": 0, "streamed": 0}
+_recent = deque()
+
+ASSEMBLED_CONTRACT = [
+    "## 1. Terms of Employment\n\nThis Employment Contract is made between **{company_name}** of {company_address} "
+    "and **{name}**. The contract is fixed-term from {start_date} until {end_date}.",
+    "## 2. Job Details\n\nThe Employee is employed as {role} and shall perform the duties assigned by the Employer.",
+    "## 3. Remuneration\n\nThe Employee shall receive a Basic Salary of {salary} per month plus {allowances}.",
+    "## 4. Probation Period\n\nThe probation period is [Insert Probation Period] months.",
+    "## 5. Working Conditions\n\nThe Employee is entitled to 30 days of annual leave per year.",
+    "## 6. Termination\n\nEither party may terminate this contract with at least 30 days written notice.",
+    "## 7. End of Service Gratuity\n\nGratuity is paid in accordance with UAE Labour Law.",
+]
+
+SYNTHESIS_REPLY = ("Based on the company policy, you are entitled to thirty calendar days of annual leave per year, "
+                   "accrued monthly, and unused days may be carried over with your manager's approval.")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _reply_for(messages) -> str:
+    system = messages[0]["content"] if messages else ""
+    prompt = messages[-1]["content"] if messages else ""
+    if "assembled_contract" in prompt:
+        return json.dumps({"assembled_contract": ASSEMBLED_CONTRACT})
+    if "legal document parser" in prompt:
+        return json.dumps({"clauses": []})
+    if "TOOLS:" in system:
+        # Intent classification
+        text = prompt.lower()
+        if "policy" in text or "?" in text:
+            return "TOOL:SEARCH_POLICY|" + prompt.replace("User:", "").strip()
+        return "Hi! I can help with HR policies, leave, expenses and address changes."
+    return SYNTHESIS_REPLY
+
+
+def _rate_limited() -> bool:
+    if not config["rpm"]:
+        return False
+    now = time.monotonic()
+    while _recent and now - _recent[0] > 60:
+        _recent.popleft()
+    if len(_recent) >= config["rpm"]:
+        return True
+    _recent.append(now)
+    return False
+
+
+async def _latency():
+    delay = max(0.0, random.gauss(config["latency_ms"], config["jitter_ms"] / 2)) / 1000
+    await asyncio.sleep(delay)
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if _rate_limited():
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached for requests per minute", "type": "requests",
+                               "code": "rate_limit_exceeded"}}
+        )
+
+    model = body.get("model", "fake-model")
+    messages = body.get("messages", [])
+    content = _reply_for(messages)
+    usage = {
+        "prompt_tokens": sum(_estimate_tokens(m.get("content", "")) for m in messages),
+        "completion_tokens": _estimate_tokens(content),
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    completion_id = f"chatcmpl-{random.getrandbits(48):012x}"
+    created = int(time.time())
+
+    await _latency()
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    stats["streamed"] += 1
+
+    async def events():
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                             "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(config["chunk_delay_ms"] / 1000)
+        final = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": completion_id, "usage": usage},
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "config": config}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300, help="mean time to first byte")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--chunk-delay-ms", type=float, default=15, help="delay between streamed chunks")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, chunk_delay_ms=args.chunk_delay_ms, rpm=args.rpm)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Import-time report: which modules make `import main` (the worker cold start) slow.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter a few times and prints the
+top-level packages and the slowest individual modules by cumulative import time (best run).
+Modules that should stay off this list (groq, pypdf, reportlab, openpyxl, numpy) are flagged.
+
+Usage:
+    python benchmarks/import_times.py
+    python benchmarks/import_times.py --module services.chat_service --top 30 --runs 5
+"""
+import os
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, Tuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded lazily by the handlers or during warm-up, not at import
+LAZY_MODULES = ("groq", "pypdf", "reportlab", "openpyxl", "numpy", "certifi")
+
+
+def import_times(module: Optional[str]) -> Tuple[Dict[str, int], Dict[str, int], float]:
+    """(cumulative us by module, self us by module, wall time s) of one cold import, None: bare interpreter"""
+    env = {**os.environ, "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "import-report")}
+    statement = f"import {module}" if module else "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import time; t = time.perf_counter(); {statement}; "
+                                                   f"print(time.perf_counter() - t)"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+    cumulative, own = {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(cumulative_us)
+            own[name.strip()] = int(self_us)
+        except ValueError:
+            continue  # header line
+    return cumulative, own, float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Modules the interpreter loads at startup (site, .pth files) are not the app's doing
+    preloaded = set(import_times(None)[1])
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    cumulative, own, wall = min(runs, key=lambda r: r[2])
+    cumulative = {k: v for k, v in cumulative.items() if k not in preloaded}
+    own = {k: v for k, v in own.items() if k not in preloaded}
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, us in own.items():
+        packages[name.split(".")[0]] += us
+
+    print(f"import {args.module}: {wall * 1000:.0f} ms (best of {args.runs}), {len(own)} modules\n")
+    print(f"{'package':<30} {'ms':>8}")
+    for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        flag = "  <- should be lazy" if name in LAZY_MODULES else ""
+        print(f"{name:<30} {us / 1000:>8.1f}{flag}")
+
+    print(f"\n{'module (cumulative)':<50} {'ms':>8}")
+    for name, us in sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:<50} {us / 1000:>8.1f}")
+
+    eager = sorted(name for name in LAZY_MODULES if name in packages)
+    if eager:
+        print(f"\nImported eagerly: {', '.join(eager)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+"""
+Load test: replays a mixed workload against the running app and reports throughput and
+p50/p95/p99 latency per endpoint.
+
+By default it is self-contained: it starts the fake LLM server (fake_llm_server.py) and the
+app (loadtest_server.py, in-memory MongoDB stand-in) as subprocesses, seeds employees,
+a law and a policy PDF, a legal template and some employment contracts, then runs the
+workload. Use --base-url to hit an already running deployment instead (it is seeded the
+same way, so use a scratch database).
+
+Needs the dev dependencies (httpx, mongomock-motor): pip install -r requirements-dev.txt
+
+The mix is a weighted choice per request:
+    chat         POST /chat (policy questions through the LLM, leave/expense questions on the fast path)
+    chat_stream  POST /chat/stream (read to the end, time to first token reported separately)
+    generate     POST /contracts/generate/employment
+    pdf          GET  /contracts/{id}/pdf
+    upload       POST /policies/pdf/upload or /employees/upload_excel
+
+Usage:
+    python benchmarks/loadtest.py --concurrency 20 --duration 60
+    python benchmarks/loadtest.py --mix chat=5,pdf=3,generate=2 --requests 2000 --llm-latency-ms 800 --llm-rpm 600
+    python benchmarks/loadtest.py --base-url http://staging:8000 --concurrency 50 --output results.json
+"""
+import os
+import io
+import sys
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+DEFAULT_MIX = "chat=40,chat_stream=10,generate=20,pdf=25,upload=5"
+
+COUNTRY = "UAE"
+COMPANY_ID = "loadtest"
+
+POLICY_QUESTIONS = [
+    "What is the policy on remote work?",
+    "How many days of annual leave do I get according to the policy?",
+    "What does the company policy say about overtime?",
+    "Is there a policy for sick leave certificates?",
+]
+FAST_PATH_MESSAGES = [
+    "What is my leave balance?",
+    "How many leave days do I have left?",
+]
+
+LAW_ARTICLES = [
+    ("Annual Leave", "The worker is entitled to annual leave with full pay of thirty days for every year of service."),
+    ("Working Hours", "The maximum normal working hours for private sector workers are eight hours per day."),
+    ("Probation", "The worker may be placed on probation for a period not exceeding six months."),
+    ("Notice Period", "Either party may terminate the contract with written notice of at least thirty days."),
+    ("End of Service Gratuity", "A worker who completes one year of continuous service is entitled to gratuity."),
+    ("Sick Leave", "The worker is entitled to sick leave of up to ninety days per year after probation."),
+]
+POLICY_ARTICLES = [
+    ("Remote Work", "Employees may work remotely up to two days per week with their manager's approval."),
+    ("Overtime", "Overtime must be approved in advance and is compensated at the statutory rate."),
+    ("Expenses", "Business expenses are reimbursed within thirty days of an approved claim."),
+    ("Sick Leave", "A medical certificate is required for sick leave longer than two consecutive days."),
+]
+
+
+def build_pdf(title: str, articles: List[Tuple[str, str]], paragraphs: int = 3) -> bytes:
+    """Small text PDF with "Article N" headers, which the heuristic clause parser splits on"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    styles = getSampleStyleSheet()
+    story = [Paragraph(title, styles["Title"])]
+    for i, (heading, text) in enumerate(articles, 1):
+        story.append(Paragraph(f"Article {i}. {heading}", styles["Heading2"]))
+        for _ in range(paragraphs):
+            story.append(Paragraph(text, styles["Normal"]))
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4).build(story)
+    return buf.getvalue()
+
+
+def build_employees_csv(count: int, start: int = 1) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["Employee ID", "First Name", "Last Name", "Job Title", "Email", "Department"])
+    for i in range(start, start + count):
+        writer.writerow([f"LT{i:05d}", "Load", f"Tester{i}", "Engineer", f"lt{i}@example.com", "R&D"])
+    return buf.getvalue().encode()
+
+
+def candidate(i: int) -> Dict[str, str]:
+    return {
+        "name": f"Candidate {i}",
+        "employee_id": f"LT{i:05d}",
+        "role": "Engineer",
+        "salary": "AED 15,000",
+        "start_date": "2025-01-01",
+        "end_date": "2027-01-01",
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in --mix: {name} (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, status: Optional[int]):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status or 0] += 1
+        if status is None or status >= 400:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> List[Dict]:
+        rows = []
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "statuses": {str(k): v for k, v in sorted(self.statuses[endpoint].items())},
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            })
+        return rows
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, employees: int):
+        self.client = client
+        self.recorder = recorder
+        self.employees = employees
+        self.legal_contract_id: Optional[str] = None
+        self.employment_ids: List[str] = []
+        self.law_pdf = build_pdf("Labour Law (load test)", LAW_ARTICLES)
+        self.policy_pdf = build_pdf("Company Policy (load test)", POLICY_ARTICLES)
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, time.perf_counter() - started, None)
+            print(f"{endpoint}: {type(e).__name__}: {e}", file=sys.stderr)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    def _employee_id(self) -> str:
+        return f"LT{random.randint(1, self.employees):05d}"
+
+    # Setup (not part of the measured run)
+
+    async def seed(self, contracts: int):
+        r = await self.request("setup", "POST", "/employees/upload_excel",
+                               files={"file": ("loadtest_employees.csv", build_employees_csv(self.employees), "text/csv")})
+        _check(r, "employee upload")
+        r = await self.request("setup", "POST", "/legal/pdf/upload", params={"country": COUNTRY},
+                               files={"file": ("loadtest_law.pdf", self.law_pdf, "application/pdf")})
+        _check(r, "law upload")
+        r = await self.request("setup", "POST", "/policies/pdf/upload", params={"company_id": COMPANY_ID},
+                               files={"file": ("loadtest_policy.pdf", self.policy_pdf, "application/pdf")})
+        _check(r, "policy upload")
+
+        await asyncio.gather(*(
+            self.request("setup", "PUT", f"/employees/LT{i:05d}/leave-balance", json={"annual": 20, "sick": 10})
+            for i in range(1, self.employees + 1)
+        ))
+
+        r = await self.request("setup", "POST", "/contracts/generate/legal",
+                               json={"company_id": COMPANY_ID, "country": COUNTRY})
+        _check(r, "legal contract generation")
+        self.legal_contract_id = r.json()["legal_contract_id"]
+
+        for i in range(1, contracts + 1):
+            r = await self.request("setup", "POST", "/contracts/generate/employment",
+                                   json={"legal_contract_id": self.legal_contract_id, "candidate": candidate(i)})
+            _check(r, "employment contract generation")
+            self.employment_ids.append(r.json()["employment_contract_id"])
+
+    # Operations
+
+    async def chat(self):
+        if random.random() < 0.5:
+            message = random.choice(FAST_PATH_MESSAGES)
+        else:
+            message = random.choice(POLICY_QUESTIONS)
+        await self.request("POST /chat", "POST", "/chat",
+                           json={"message": message, "employee_id": self._employee_id()})
+
+    async def chat_stream(self):
+        endpoint = "POST /chat/stream"
+        started = time.perf_counter()
+        first_token = None
+        status = None
+        try:
+            async with self.client.stream("POST", "/chat/stream", json={
+                "message": random.choice(POLICY_QUESTIONS), "employee_id": self._employee_id()
+            }) as response:
+                status = response.status_code
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: token":
+                        first_token = time.perf_counter() - started
+        except httpx.HTTPError as e:
+            print(f"{endpoint}: {type(e).__name__}: {e}", file=sys.stderr)
+            status = None
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        if first_token is not None:
+            self.recorder.record(f"{endpoint} (first token)", first_token, status)
+
+    async def generate(self):
+        r = await self.request("POST /contracts/generate/employment", "POST", "/contracts/generate/employment",
+                               json={"legal_contract_id": self.legal_contract_id,
+                                     "candidate": candidate(random.randint(1, self.employees))})
+        if r is not None and r.status_code == 200:
+            self.employment_ids.append(r.json()["employment_contract_id"])
+
+    async def pdf(self):
+        contract_id = random.choice(self.employment_ids)
+        await self.request("GET /contracts/{id}/pdf", "GET", f"/contracts/{contract_id}/pdf")
+
+    async def upload(self):
+        if random.random() < 0.5:
+            await self.request("POST /policies/pdf/upload", "POST", "/policies/pdf/upload",
+                               params={"company_id": COMPANY_ID},
+                               files={"file": ("loadtest_policy.pdf", self.policy_pdf, "application/pdf")})
+        else:
+            start = random.randint(1, self.employees)
+            await self.request("POST /employees/upload_excel", "POST", "/employees/upload_excel",
+                               files={"file": ("loadtest_employees.csv", build_employees_csv(20, start), "text/csv")})
+
+
+OPERATIONS = {
+    "chat": Workload.chat,
+    "chat_stream": Workload.chat_stream,
+    "generate": Workload.generate,
+    "pdf": Workload.pdf,
+    "upload": Workload.upload,
+}
+
+
+def _check(response: Optional[httpx.Response], what: str):
+    if response is None or response.status_code >= 400:
+        detail = response.text[:500] if response is not None else "no response"
+        raise SystemExit(f"Setup failed ({what}): {detail}")
+
+
+async def run_workload(workload: Workload, mix: Dict[str, float], concurrency: int,
+                       duration: Optional[float], total_requests: Optional[int]) -> float:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total_requests] if total_requests else None
+
+    async def worker():
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            op = random.choices(names, weights)[0]
+            await OPERATIONS[op](workload)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+def print_report(rows: List[Dict], elapsed: float, concurrency: int):
+    total = sum(r["requests"] for r in rows if not r["endpoint"].endswith("(first token)"))
+    errors = sum(r["errors"] for r in rows if not r["endpoint"].endswith("(first token)"))
+    print(f"\n{total} requests in {elapsed:.1f}s at concurrency {concurrency}: "
+          f"{total / elapsed:.1f} req/s, {errors} errors\n")
+    width = max(len(r["endpoint"]) for r in rows) if rows else 10
+    print(f"{'endpoint':<{width}}  {'count':>7}  {'errors':>6}  {'req/s':>7}  "
+          f"{'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+    for r in rows:
+        print(f"{r['endpoint']:<{width}}  {r['requests']:>7}  {r['errors']:>6}  {r['rps']:>7.1f}  "
+              f"{r['p50_ms']:>8.1f}  {r['p95_ms']:>8.1f}  {r['p99_ms']:>8.1f}  {r['max_ms']:>8.1f}")
+
+
+def start_process(args: List[str], env: Dict[str, str], log_name: str) -> subprocess.Popen:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    log = open(os.path.join(RESULTS_DIR, log_name), "w")
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_process(proc: subprocess.Popen):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def wait_ready(url: str, proc: Optional[subprocess.Popen], timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            if proc is not None and proc.poll() is not None:
+                raise SystemExit(f"{url} exited during startup, see the logs in {RESULTS_DIR}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"Timed out waiting for {url}")
+
+
+async def main_async(args) -> int:
+    mix = parse_mix(args.mix)
+    processes = []
+    base_url = args.base_url
+    try:
+        if not base_url:
+            if args.db == "memory":
+                from loadtest_server import require_mongomock
+                require_mongomock()
+            llm_url = f"http://127.0.0.1:{args.llm_port}"
+            llm = start_process([
+                "benchmarks/fake_llm_server.py", "--port", str(args.llm_port),
+                "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+                "--chunk-delay-ms", str(args.llm_chunk_delay_ms), "--rpm", str(args.llm_rpm),
+            ], os.environ.copy(), "fake_llm.log")
+            processes.append(llm)
+            await wait_ready(f"{llm_url}/stats", llm)
+
+            env = {**os.environ, "GROQ_BASE_URL": llm_url, "GROQ_API_KEY": "fake-loadtest-key"}
+            app = start_process(["benchmarks/loadtest_server.py", "--port", str(args.port), "--db", args.db],
+                                env, "loadtest_server.log")
+            processes.append(app)
+            base_url = f"http://127.0.0.1:{args.port}"
+            await wait_ready(f"{base_url}/chat/router/metrics", app)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            workload = Workload(client, Recorder(), args.employees)
+            print(f"Seeding {args.employees} employees, PDFs and {args.contracts} contracts at {base_url} ...")
+            await workload.seed(args.contracts)
+
+            # Setup requests are not part of the report
+            workload.recorder = Recorder()
+            target = f"{args.requests} requests" if args.requests else f"{args.duration:.0f}s"
+            print(f"Running {target} at concurrency {args.concurrency}, mix {mix}")
+            elapsed = await run_workload(workload, mix, args.concurrency,
+                                         None if args.requests else args.duration, args.requests)
+
+        rows = workload.recorder.summary(elapsed)
+        print_report(rows, elapsed, args.concurrency)
+
+        if args.output:
+            report = {
+                "base_url": base_url,
+                "db": None if args.base_url else args.db,
+                "concurrency": args.concurrency,
+                "mix": mix,
+                "elapsed_s": round(elapsed, 3),
+                "llm": None if args.base_url else {
+                    "latency_ms": args.llm_latency_ms, "jitter_ms": args.llm_jitter_ms, "rpm": args.llm_rpm
+                },
+                "endpoints": rows,
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nWrote {args.output}")
+
+        return 1 if any(r["errors"] for r in rows) and args.fail_on_errors else 0
+    finally:
+        for proc in reversed(processes):
+            stop_process(proc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="test a running server instead of starting one (and the fake LLM)")
+    parser.add_argument("--db", choices=["memory", "mongo"], default="memory",
+                        help="memory: mongomock-motor in the app process, mongo: DATABASE_URL")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-chunk-delay-ms", type=float, default=15)
+    parser.add_argument("--llm-rpm", type=int, default=0, help="fake LLM rate limit, requests per minute (0 = none)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--contracts", type=int, default=20, help="employment contracts created before the run")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--fail-on-errors", action="store_true", help="exit with status 1 if any request failed")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Runs the app for load tests, optionally against an in-memory MongoDB stand-in.
+
+With --db memory the collections live in mongomock-motor inside this process (no mongod to
+run or clean up, but queries are slower than a real one and nothing is persisted). It is a
+dev dependency: pip install -r requirements-dev.txt
+Otherwise DATABASE_URL / MONGO_DB_NAME are used as usual; point them at a scratch database.
+
+Usage:
+    GROQ_BASE_URL=http://127.0.0.1:8100 GROQ_API_KEY=fake python benchmarks/loadtest_server.py --db memory
+"""
+import os
+import sys
+import argparse
+from importlib.util import find_spec
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def require_mongomock():
+    if find_spec("mongomock_motor") is None:
+        raise SystemExit("--db memory needs mongomock-motor: pip install -r requirements-dev.txt "
+                         "(or use --db mongo with DATABASE_URL pointing at a scratch database)")
+
+
+async def init_memory_db():
+    from mongomock_motor import AsyncMongoMockClient
+    from database import init_db
+
+    os.environ.setdefault("MONGO_DB_NAME", "auto_hr_loadtest")
+    await init_db(AsyncMongoMockClient())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", choices=["memory", "mongo"], default="memory")
+    args = parser.parse_args()
+    if args.db == "memory":
+        require_mongomock()
+
+    # uploads/ and cache/ are relative to the project root
+    os.chdir(ROOT)
+    import main as app_module
+    if args.db == "memory":
+        # lifespan() calls the init_db bound in main
+        app_module.init_db = init_memory_db
+
+    import uvicorn
+    uvicorn.run(app_module.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
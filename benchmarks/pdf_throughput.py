@@ -0,0 +1,69 @@
+"""
+PDF rendering throughput (contracts/second), serial vs the process pool.
+
+Usage:
+    python benchmarks/pdf_throughput.py --count 200 --workers 4
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_contract(index: int, sections: int = 9, paragraphs: int = 4) -> str:
+    lines = [f"# Employment Contract #{index}"]
+    for s in range(1, sections + 1):
+        lines.append(f"## {s}. Section {s}")
+        for p in range(paragraphs):
+            lines.append(
+                f"The **Employee** shall comply with clause {s}.{p} of this Agreement. "
+                "The Employer shall pay the Basic Salary of AED 10,000 monthly in arrears, "
+                "subject to UAE Labour Law and the Company Policies in force from time to time."
+            )
+        lines.append("- Thirty (30) calendar days of annual leave")
+        lines.append("- Notice period of thirty (30) days")
+    return "\n\n".join(lines)
+
+
+def bench_serial(texts) -> float:
+    from services.pdf_gen_service import render_contract_pdf_bytes
+    render_contract_pdf_bytes(texts[0])  # warm-up (imports, styles)
+    start = time.perf_counter()
+    for text in texts:
+        render_contract_pdf_bytes(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+async def bench_pool(texts) -> float:
+    from services import pdf_gen_service
+    await pdf_gen_service.render_contract_pdf_async(texts[0])  # warm-up (spawns workers)
+    start = time.perf_counter()
+    await asyncio.gather(*(pdf_gen_service.render_contract_pdf_async(t) for t in texts))
+    elapsed = time.perf_counter() - start
+    pdf_gen_service.shutdown_pdf_pool()
+    return len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    from services import pdf_gen_service
+    pdf_gen_service.PDF_WORKERS = args.workers
+
+    texts = [synthetic_contract(i) for i in range(args.count)]
+    serial = bench_serial(texts)
+    pooled = asyncio.run(bench_pool(texts))
+
+    print(f"contracts: {args.count}, workers: {args.workers}")
+    print(f"serial:    {serial:8.1f} contracts/s")
+    print(f"pool:      {pooled:8.1f} contracts/s ({pooled / serial:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
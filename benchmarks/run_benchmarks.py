@@ -0,0 +1,316 @@
+"""
+In-process micro-benchmarks for the ingestion, parsing and rendering hot paths.
+
+Runs against synthetic inputs and the real PDFs in uploads/, writes JSON results and
+compares them with a saved baseline. Exits with status 1 when a benchmark got slower
+than the baseline by more than --tolerance.
+
+Usage:
+    python benchmarks/run_benchmarks.py                      # run, compare with benchmarks/baseline.json if present
+    python benchmarks/run_benchmarks.py --save-baseline      # run and store the results as the new baseline
+    python benchmarks/run_benchmarks.py -k csv --sizes 1000  # only matching benchmarks, smaller inputs
+"""
+import os
+import io
+import gc
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.pdf_throughput import synthetic_contract
+
+# pypdf logs every malformed xref entry of the real PDFs, which drowns the results
+logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+UPLOADS_DIR = os.path.join(ROOT, "uploads")
+# The PDFs committed in uploads/; files uploaded at runtime or by the load test land there too
+# and must not change the benchmark inputs
+REAL_PDF_FILES = (
+    "Federal Decree-Law No. 13 of 2022 Concerning Unemployment Insurance Scheme.pdf",
+    "Federal Decree-Law No. 47 of 2021.pdf",
+    "Federal Decree-Law No. 9 of 2022 Concerning Domestic Workers.pdf",
+    "yogapolicies.pdf",
+)
+
+CLAUSE_TOPICS = [
+    ("Probation", "The probation period shall not exceed six months from the date of commencement of work."),
+    ("Termination", "Either party may terminate the contract subject to a notice period of thirty days."),
+    ("Remuneration", "The employer shall pay the salary in UAE Dirhams through the Wage Protection System."),
+    ("Annual Leave", "The worker is entitled to annual leave of thirty calendar days for each year of service."),
+    ("Confidentiality", "The worker shall not disclose confidential information or trade secrets of the employer."),
+    ("Non-Compete", "The worker shall not compete with the employer for a period not exceeding two years."),
+    ("Working Hours", "Maximum working hours shall be eight hours per day or forty-eight hours per week."),
+    ("General Provisions", "This Decree-Law shall be published in the Official Gazette and come into force."),
+]
+
+
+# --- Inputs ---
+
+def synthetic_legal_text(articles: int) -> str:
+    parts = []
+    for i in range(articles):
+        header, body = CLAUSE_TOPICS[i % len(CLAUSE_TOPICS)]
+        parts.append(f"Article {i + 1}. {header}")
+        parts.append(" ".join([body] * 3))
+    return "\n".join(parts)
+
+
+EMPLOYEE_HEADERS = ["Employee ID", "First Name", "Last Name", "Job Title", "Email", "Salary",
+                    "Start Date", "Nationality", "Passport Number", "Department"]
+
+
+def employee_rows(count: int) -> List[List[str]]:
+    return [
+        [f"EMP{i:06d}", f"First{i}", f"Last{i}", "Engineer", f"user{i}@example.com", str(10000 + i % 5000),
+         "2024-01-15", "UAE", f"P{i:08d}", ["Engineering", "Sales", "HR"][i % 3]]
+        for i in range(count)
+    ]
+
+
+def employee_csv(count: int) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EMPLOYEE_HEADERS)
+    writer.writerows(employee_rows(count))
+    return buf.getvalue().encode("utf-8")
+
+
+def employee_xlsx(count: int) -> bytes:
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(EMPLOYEE_HEADERS)
+    for row in employee_rows(count):
+        sheet.append(row)
+    buf = io.BytesIO()
+    workbook.save(buf)
+    return buf.getvalue()
+
+
+def synthetic_pdf(pages: int = 5) -> bytes:
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf)
+    article = 1
+    for _ in range(pages):
+        y = 800
+        while y > 60:
+            header, body = CLAUSE_TOPICS[article % len(CLAUSE_TOPICS)]
+            pdf.drawString(50, y, f"Article {article}. {header}")
+            pdf.drawString(50, y - 15, body[:95])
+            article += 1
+            y -= 40
+        pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def real_pdfs() -> List[Tuple[str, bytes]]:
+    pdfs = []
+    for name in REAL_PDF_FILES:
+        path = os.path.join(UPLOADS_DIR, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                pdfs.append((name, f.read()))
+    return pdfs
+
+
+def employment_template():
+    """A compiled legal template plus clause map shaped like the ones generate_employment_contract renders"""
+    from types import SimpleNamespace
+    from services.template_service import compile_contract_template
+
+    blocks, clause_map = [], {}
+    for i, (header, body) in enumerate(CLAUSE_TOPICS * 3):
+        blocks.append(f"## {i + 1}. {header}\n\nThis agreement is made between {{company_name}} and {{name}}, "
+                      f"employed as {{role}} from {{start_date}} until {{end_date}} at [Insert Basic Salary].")
+        clause_id = f"clause{i}"
+        blocks.append({"clause_id": clause_id, "variables": {"notice_period": "30"}})
+        clause_map[clause_id] = SimpleNamespace(
+            text=body + " Notice: {notice_period} days, probation {probation_period} months for {name}.",
+            variables=json.dumps({"probation_period": "6"})
+        )
+    return compile_contract_template(blocks), clause_map
+
+
+# --- Runner ---
+
+def measure(fn: Callable[[], Any], min_time: float, min_repeats: int, max_repeats: int) -> Dict[str, Any]:
+    fn()  # warm-up: imports, caches, lazy init
+    gc.collect()
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_repeats and (len(times) < min_repeats or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "mean_s": statistics.fmean(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeats": len(times),
+    }
+
+
+def build_benchmarks(sizes: List[int]) -> List[Tuple[str, int, Callable[[], Any]]]:
+    """(name, items per call, fn); inputs are built lazily so -k skips the expensive ones"""
+    from services.parsing_service import heuristic_extract_clauses, infer_clause_type
+    from services.pdf_service import extract_text_from_pdf
+    from services.excel_service import parse_employee_excel, parse_employee_csv
+    from services.template_service import build_candidate_variables, render_employment_clauses, _compile_text_cached
+    from services.pdf_gen_service import generate_contract_pdf
+
+    benches = []
+
+    clause_texts = [(" ".join([body] * 4), header) for header, body in CLAUSE_TOPICS] * 125
+    benches.append(("infer_clause_type", len(clause_texts),
+                    lambda: [infer_clause_type(t, h) for t, h in clause_texts]))
+
+    for articles in (50, 500):
+        text = synthetic_legal_text(articles)
+        benches.append((f"heuristic_extract_clauses[synthetic_{articles}]", articles,
+                        lambda text=text: heuristic_extract_clauses(text, "bench")))
+
+    pdfs = real_pdfs() or [("synthetic.pdf", synthetic_pdf())]
+    for name, data in pdfs:
+        benches.append((f"extract_text_from_pdf[{name}]", 1, lambda data=data: extract_text_from_pdf(data)))
+        benches.append((f"heuristic_extract_clauses[{name}]", 1,
+                        lambda data=data, name=name, cache={}: heuristic_extract_clauses(
+                            cache["text"] if "text" in cache else cache.setdefault("text", extract_text_from_pdf(data)),
+                            name)))
+
+    for size in sizes:
+        benches.append((f"parse_employee_csv[{size}]", size,
+                        lambda size=size, cache={}: parse_employee_csv(
+                            cache["data"] if "data" in cache else cache.setdefault("data", employee_csv(size)))))
+        benches.append((f"parse_employee_excel[{size}]", size,
+                        lambda size=size, cache={}: parse_employee_excel(
+                            cache["data"] if "data" in cache else cache.setdefault("data", employee_xlsx(size)))))
+
+    compiled, clause_map = employment_template()
+    candidate = {"name": "Jane Doe", "role": "Engineer", "salary": "20000", "start_date": "2024-02-29",
+                 "basic_salary": "12000"}
+    benches.append(("render_employment_clauses", 1, lambda: render_employment_clauses(
+        compiled, clause_map, build_candidate_variables("Acme", candidate), candidate)))
+    # Cold compile (the lru_cache is bypassed), i.e. the cost of a template seen for the first time
+    raw_texts = [f"{h}: {{name}} joins as {{role}} on [Insert Start Date]. {b}" for h, b in CLAUSE_TOPICS]
+    benches.append(("compile_text_uncached", len(raw_texts),
+                    lambda: [_compile_text_cached.__wrapped__(t, False) for t in raw_texts]))
+
+    contract = synthetic_contract(1)
+    benches.append(("generate_contract_pdf", 1, lambda: generate_contract_pdf(contract)))
+    return benches
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Prints current vs baseline, returns the names of regressed benchmarks.
+    Compares the fastest run (like timeit): noise only ever adds time, so the minimum is the most stable figure.
+    """
+    regressions = []
+    print(f"\n{'benchmark (best of N)':<60} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<60} {'-':>12} {_fmt(current['min_s']):>12} {'new':>9}")
+            continue
+        change = current["min_s"] / base["min_s"] - 1 if base["min_s"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<60} {_fmt(base['min_s']):>12} {_fmt(current['min_s']):>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="employee file row counts")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend per benchmark")
+    parser.add_argument("--min-repeats", type=int, default=3)
+    parser.add_argument("--max-repeats", type=int, default=1000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = {}
+    for name, items, fn in build_benchmarks(sizes):
+        if args.pattern and args.pattern not in name:
+            continue
+        stats = measure(fn, args.min_time, args.min_repeats, args.max_repeats)
+        stats["items"] = items
+        stats["per_item_us"] = stats["median_s"] / items * 1e6
+        results[name] = stats
+        print(f"{name:<60} {_fmt(stats['median_s']):>12}  ({stats['repeats']} runs, {stats['per_item_us']:.1f}us/item)")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare with (run with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%} "
+              f"vs baseline {baseline['meta'].get('git')}:")
+        for name in regressions:
+            print(f"  - {name}")
+        sys.exit(1)
+    print(f"\nno regressions vs baseline {baseline['meta'].get('git')} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import asyncio
+
+import pytest
+
+# test_setup.py, test_features.py and test_csv_upload.py drive a running server on localhost:8000;
+# run them by hand (python test_setup.py), pytest only collects the self-contained tests
+collect_ignore = ["test_setup.py", "test_features.py", "test_csv_upload.py"]
+
+
+@pytest.fixture
+def run_db():
+    """Runs an async test body against a fresh in-memory database (mongomock-motor, see requirements-dev.txt)"""
+    from mongomock_motor import AsyncMongoMockClient
+    import database
+
+    def run(test_body):
+        async def main():
+            await database.init_db(AsyncMongoMockClient())
+            return await test_body()
+        return asyncio.run(main())
+    return run
@@ -1,8 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from dotenv import load_dotenv
+from pymongo import ReadPreference
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional
 import os
-import certifi
+import time
 
 # Import models (will be defined in models.py)
 # We need to import them inside the init function or after definition to avoid circular imports if any,
@@ -12,16 +15,161 @@ import certifi
 
 load_dotenv()
 
-async def init_db():
+# One client per worker process, shared by Beanie and the raw Motor calls; it owns the connection pool
+_client: Optional[AsyncIOMotorClient] = None
+_pool_listener = None
+_options: Dict[str, Any] = {}
+
+_READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primarypreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondarypreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+# Compressor -> module pymongo needs for it (zlib is in the standard library)
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def _int_env(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def _read_preference(name: str):
+    try:
+        return _READ_PREFERENCES[name.replace("_", "").lower()]
+    except KeyError:
+        raise ValueError(f"Unknown read preference {name!r}, expected one of {sorted(_READ_PREFERENCES)}")
+
+
+def _compressors() -> List[str]:
+    """MONGO_COMPRESSORS in order of preference, minus the ones whose library isn't installed"""
+    requested = [c.strip() for c in os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(",") if c.strip()]
+    available = [c for c in requested if c in _COMPRESSOR_MODULES and find_spec(_COMPRESSOR_MODULES[c]) is not None]
+    dropped = [c for c in requested if c not in available]
+    if dropped:
+        # zstandard / python-snappy come with pymongo[zstd,snappy] (requirements.txt)
+        print(f"MongoDB wire compression: {dropped} not available (unknown or library not installed), "
+              f"using {available or 'none'}")
+    return available
+
+
+def client_options() -> Dict[str, Any]:
+    """
+    Motor client settings from the environment; unset values keep the driver defaults
+    (maxPoolSize 100, minPoolSize 0, serverSelectionTimeoutMS 30000, connectTimeoutMS 20000, no socket timeout).
+    The server picks the first compressor it supports, none if it supports none of them.
+    """
+    options = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE"),
+        "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_TIME_MS"),
+        "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS"),
+        "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS"),
+        "appname": os.getenv("MONGO_APP_NAME", "auto-hr"),
+    }
+    compressors = _compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+        if "zlib" in compressors and _int_env("MONGO_ZLIB_LEVEL") is not None:
+            options["zlibCompressionLevel"] = _int_env("MONGO_ZLIB_LEVEL")
+    if os.getenv("MONGO_READ_PREFERENCE"):
+        options["readPreference"] = _read_preference(os.getenv("MONGO_READ_PREFERENCE")).mongos_mode
+    return {k: v for k, v in options.items() if v is not None}
+
+
+# Read preference of the list endpoints (GET /clauses, /employees, /contracts, /equity/cap-table), which
+# can tolerate slightly stale data; everything else reads from the primary (or MONGO_READ_PREFERENCE)
+LIST_READ_PREFERENCE = os.getenv("MONGO_LIST_READ_PREFERENCE", "primary")
+# Secondaries lagging more than this are skipped by list reads (-1: no limit, else at least 90)
+LIST_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_LIST_MAX_STALENESS_SECONDS", "-1"))
+
+
+def _list_read_preference():
+    mode = _read_preference(LIST_READ_PREFERENCE)
+    if mode is ReadPreference.PRIMARY or LIST_MAX_STALENESS_SECONDS < 0:
+        return mode
+    return type(mode)(max_staleness=LIST_MAX_STALENESS_SECONDS)
+
+
+def get_client() -> AsyncIOMotorClient:
+    if _client is None:
+        raise RuntimeError("init_db() has not been called in this process")
+    return _client
+
+
+async def init_db(client: Optional[AsyncIOMotorClient] = None):
+    """
+    Creates this worker's client (unless one is passed in, e.g. an in-memory stand-in)
+    and initialises Beanie on it.
+    """
+    global _client, _pool_listener, _options
     database_url = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
     db_name = os.getenv("MONGO_DB_NAME", "auto_hr_db")
-    
-    # Create Motor client
-    if "mongodb+srv" in database_url:
-         client = AsyncIOMotorClient(database_url, tlsCAFile=certifi.where())
-    else:
-        client = AsyncIOMotorClient(database_url) 
-    
+
+    if client is None:
+        # Every command is timed for /metrics, pool usage feeds /metrics and /health/db
+        from services.metrics_service import MongoCommandListener, MongoPoolListener
+        _pool_listener = MongoPoolListener()
+        options = client_options()
+        _options = dict(options)
+        options["event_listeners"] = [MongoCommandListener(), _pool_listener]
+
+        # Create Motor client
+        if "mongodb+srv" in database_url:
+            import certifi
+            options["tlsCAFile"] = certifi.where()
+        client = AsyncIOMotorClient(database_url, **options)
+    _client = client
+
     # Initialize Beanie with the specific database
-    from models import PDFSource, Clause, Contract, Employee, EquityGrant
-    await init_beanie(database=client[db_name], document_models=[PDFSource, Clause, Contract, Employee, EquityGrant])
+    from models import PDFSource, Clause, Contract, Employee, EquityGrant, LeaveBalance, ExpenseClaim
+    await init_beanie(database=client[db_name], document_models=[PDFSource, Clause, Contract, Employee, EquityGrant, LeaveBalance, ExpenseClaim])
+
+
+def close_db():
+    """Closes the pooled connections; called once at worker shutdown"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def list_collection(model):
+    """Motor collection of a Beanie model with the list read preference applied"""
+    collection = model.get_motor_collection()
+    mode = _list_read_preference()
+    if mode is ReadPreference.PRIMARY:
+        return collection
+    return collection.with_options(read_preference=mode)
+
+
+async def find_for_listing(model, filter: Optional[Dict[str, Any]] = None, sort=None) -> list:
+    """model.find(filter).to_list() for list endpoints, read with the list read preference"""
+    cursor = list_collection(model).find(filter or {})
+    if sort:
+        cursor = cursor.sort(sort)
+    return [model.model_validate(doc) for doc in await cursor.to_list(None)]
+
+
+async def ping_db() -> float:
+    """Round trip of a ping command in seconds"""
+    started = time.perf_counter()
+    await get_client().admin.command("ping")
+    return time.perf_counter() - started
+
+
+async def db_health() -> Dict[str, Any]:
+    ping = await ping_db()
+    return {
+        "status": "ok",
+        "ping_ms": round(ping * 1000, 2),
+        # Options set from the environment (driver defaults for the rest)
+        "settings": {**_options, "list_read_preference": _list_read_preference().mongos_mode},
+        # Per server: open / in_use connections and checkout counters of this worker
+        "pool": _pool_listener.stats() if _pool_listener is not None else {},
+    }
@@ -22,6 +22,7 @@ export default function ChatPage() {
     ]);
     const [input, setInput] = useState("");
     const [employeeId, setEmployeeId] = useState<string | null>(null);
+    const [sessionId, setSessionId] = useState<string | null>(null);
     const [isLoading, setIsLoading] = useState(false);
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -50,12 +51,16 @@ export default function ChatPage() {
         try {
             const response = await axios.post("http://localhost:8000/chat", {
                 message: userMsg.text,
-                employee_id: employeeId
+                employee_id: employeeId,
+                session_id: sessionId
             });
 
             if (response.data.verified_employee_id) {
                 setEmployeeId(response.data.verified_employee_id);
             }
+            if (response.data.session_id) {
+                setSessionId(response.data.session_id);
+            }
 
             const botMsg: Message = {
                 id: (Date.now() + 1).toString(),
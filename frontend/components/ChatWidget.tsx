@@ -2,7 +2,6 @@
 "use client";
 import { useState, useRef, useEffect } from "react";
 import { MessageCircle, X, Send, User, Bot } from "lucide-react";
-import axios from "axios";
 
 interface Message {
     id: string;
@@ -23,6 +22,7 @@ export default function ChatWidget() {
     ]);
     const [input, setInput] = useState("");
     const [isLoading, setIsLoading] = useState(false);
+    const [sessionId, setSessionId] = useState<string | null>(null);
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
     const scrollToBottom = () => {
@@ -47,30 +47,76 @@ export default function ChatWidget() {
         setInput("");
         setIsLoading(true);
 
+        const botId = (Date.now() + 1).toString();
+        const updateBot = (text: string) => {
+            setMessages(prev => prev.map(m => m.id === botId ? { ...m, text } : m));
+        };
+
         try {
-            // Call Backend
-            const response = await axios.post("http://localhost:8000/chat", {
-                message: userMsg.text,
-                employee_id: "emp_001" // Mock ID
+            // Call Backend: Server-Sent Events, the reply is rendered as it is generated
+            const response = await fetch("http://localhost:8000/chat/stream", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({
+                    message: userMsg.text,
+                    employee_id: "emp_001", // Mock ID
+                    session_id: sessionId
+                })
             });
-
-            const botMsg: Message = {
-                id: (Date.now() + 1).toString(),
-                sender: "bot",
-                text: response.data.response || "Sorry, I didn't catch that.",
-                timestamp: new Date()
-            };
-
-            setMessages(prev => [...prev, botMsg]);
+            if (!response.ok || !response.body) {
+                throw new Error(`Chat request failed: ${response.status}`);
+            }
+
+            setMessages(prev => [...prev, { id: botId, sender: "bot", text: "", timestamp: new Date() }]);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let text = "";
+            let finalText: string | null = null;
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // Events are separated by a blank line
+                const events = buffer.split("\n\n");
+                buffer = events.pop() || "";
+                for (const raw of events) {
+                    let eventName = "message";
+                    let data = "";
+                    for (const line of raw.split("\n")) {
+                        if (line.startsWith("event: ")) eventName = line.slice(7);
+                        else if (line.startsWith("data: ")) data += line.slice(6);
+                    }
+                    if (!data) continue;
+                    const payload = JSON.parse(data);
+
+                    if (eventName === "token") {
+                        text += payload.text;
+                        updateBot(text);
+                    } else if (eventName === "status" && !text) {
+                        updateBot(payload.stage === "responding" ? "Looking that up..." : "Thinking...");
+                    } else if (eventName === "done") {
+                        finalText = payload.response;
+                        if (payload.session_id) {
+                            setSessionId(payload.session_id);
+                        }
+                    }
+                }
+            }
+
+            updateBot(finalText || text || "Sorry, I didn't catch that.");
         } catch (error) {
             console.error("Chat error:", error);
             const errorMsg: Message = {
-                id: (Date.now() + 1).toString(),
+                id: (Date.now() + 2).toString(),
                 sender: "bot",
                 text: "I'm having trouble connecting to the server. Please try again later.",
                 timestamp: new Date()
             };
-            setMessages(prev => [...prev, errorMsg]);
+            setMessages(prev => [...prev.filter(m => !(m.id === botId && !m.text)), errorMsg]);
         } finally {
             setIsLoading(false);
         }
@@ -100,7 +146,7 @@ export default function ChatWidget() {
 
                     {/* Messages */}
                     <div className="flex-1 overflow-y-auto p-4 bg-gray-50 space-y-4">
-                        {messages.map((msg) => (
+                        {messages.filter(msg => msg.text).map((msg) => (
                             <div key={msg.id} className={`flex ${msg.sender === "user" ? "justify-end" : "justify-start"}`}>
                                 <div className={`max-w-[80%] rounded-lg p-3 ${msg.sender === "user"
                                         ? "bg-blue-600 text-white rounded-br-none"
@@ -113,7 +159,7 @@ export default function ChatWidget() {
                                 </div>
                             </div>
                         ))}
-                        {isLoading && (
+                        {isLoading && !(messages[messages.length - 1].sender === "bot" && messages[messages.length - 1].text) && (
                             <div className="flex justify-start">
                                 <div className="bg-white border border-gray-200 rounded-lg p-3 shadow-sm rounded-bl-none">
                                     <div className="flex space-x-1">
@@ -1,23 +1,68 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+import time
+_PROCESS_STARTED = time.perf_counter()  # Import + startup time, see /health/startup
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import json
 import os
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-from database import init_db
-from models import PDFSource, Clause, Contract, EquityGrant, Employee
+from database import init_db, close_db, find_for_listing
+from models import PDFSource, Clause, Contract, EquityGrant, Employee, ClauseVersionView, VestingSchedule
 from services.pdf_service import extract_text_from_pdf
 from services.llm_service import assemble_contract_from_clauses
 from services.parsing_service import heuristic_extract_clauses
+from services.contract_service import (
+    compute_clause_fingerprint, fetch_clauses_by_ids, generate_employment_contracts_batch, EMPLOYEE_FILTER_FIELDS,
+    load_compiled_template
+)
+from services.versioning_service import (
+    build_contract_version, load_contract_content, hydrate_contents, get_contract_history, backfill_parent_ids
+)
+from services.dedup_service import insert_clauses_with_dedup, dedup_scope
+from services.employee_service import backfill_employee_id_keys
+from services.hris_service import expense_writer
+from services.metrics_service import (
+    stage_timer, render_metrics, route_label, start_metrics_flusher, stop_metrics_flusher,
+    HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_PROGRESS
+)
+from services.profiling_service import should_profile, begin_profile, finish_profile
+from services.template_service import (
+    compile_contract_template, referenced_clause_ids, build_candidate_variables, render_employment_clauses
+)
+from services.clause_selection_service import select_clauses_for_assembly, selection_settings
+from services.startup_service import record_step, mark_ready, start_warm_up, stop_warm_up
+
+# Heavy modules (groq, pypdf, reportlab, openpyxl, numpy) are imported lazily or during warm-up
+record_step("imports", _PROCESS_STARTED)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    started = time.perf_counter()
     await init_db()
+    record_step("init_db", started)
+    started = time.perf_counter()
+    await backfill_parent_ids()
+    await backfill_employee_id_keys()
+    record_step("backfills", started)
     # Ensure uploads directory exists
     os.makedirs("uploads", exist_ok=True)
+    expense_writer.start()
+    # With several workers (serve.py), /metrics reports the sum of all of them
+    start_metrics_flusher()
+    # Client, stylesheet, template cache and PDF pool; in the background unless STARTUP_WARMUP=blocking
+    await start_warm_up()
+    mark_ready(_PROCESS_STARTED)
     yield
+    await stop_warm_up()
+    # Queued expense claims are written out before the worker exits
+    await expense_writer.stop()
+    from services.pdf_gen_service import shutdown_pdf_pool
+    shutdown_pdf_pool()
+    close_db()
+    stop_metrics_flusher()
 
 app = FastAPI(
     title="Auto-HR Backend",
@@ -28,6 +73,44 @@ app = FastAPI(
 
 from fastapi.middleware.cors import CORSMiddleware
 
+@app.middleware("http")
+async def metrics_middleware(request, call_next):
+    method = request.method
+    started = time.perf_counter()
+    HTTP_IN_PROGRESS.inc(method=method)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_PROGRESS.dec(method=method)
+        # Streaming responses count until their headers are sent
+        route = route_label(request)
+        HTTP_LATENCY.observe(time.perf_counter() - started, method=method, route=route)
+        HTTP_REQUESTS.inc(method=method, route=route, status=status)
+
+@app.middleware("http")
+async def profiling_middleware(request, call_next):
+    """Samples the handler's stacks when the request carries X-Profile: <PROFILING_TOKEN>, or at the admin-set rate"""
+    if not should_profile(request.headers.get("x-profile")):
+        return await call_next(request)
+    sampler = begin_profile()
+    if sampler is None:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        profile_id = finish_profile(
+            sampler, request.method, request.url.path, route_label(request), status, time.perf_counter() - started
+        )
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"], # Frontend URL
@@ -40,11 +123,18 @@ app.add_middleware(
 class ContractLegalRequest(BaseModel):
     company_id: str
     country: str
+    force: bool = False # Re-run LLM assembly even if an identical template exists
 
 class ContractEmploymentRequest(BaseModel):
     legal_contract_id: str
     candidate: Dict[str, Any]
 
+class ContractEmploymentBatchRequest(BaseModel):
+    legal_contract_id: str
+    employee_ids: Optional[List[str]] = None
+    employee_filter: Optional[Dict[str, Any]] = None # e.g. {"role": "Engineer", "nationality": "UK"}
+    chunk_size: int = 200
+
 class PDFExtractRequest(BaseModel):
     pdf_id: str
 
@@ -52,10 +142,84 @@ class EquityGrantRequest(BaseModel):
     employee_id: str
     vesting_start_date: str # YYYY-MM-DD
     number_of_options: int
-    vesting_schedule: Dict[str, Any] # e.g. {"details": "4 year vesting, 1 year cliff"}
+    vesting_schedule: VestingSchedule = VestingSchedule() # e.g. {"cliff_months": 12, "duration_months": 48, "details": "4 year vesting, 1 year cliff"}
+
+class EquityGrantBulkRequest(BaseModel):
+    grants: List[EquityGrantRequest] = Field(..., max_length=1000)
+    response_format: str = "zip" # "zip": streamed archive of letters, "links": grant ids + letter URLs
 
 # --- API Endpoints ---
 
+@app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (this worker's metrics)"""
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    from services.profiling_service import PROFILING_TOKEN, token_valid
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_TOKEN)")
+    if not token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ProfilingSettingsRequest(BaseModel):
+    sample_rate: float = Field(..., ge=0, le=1) # share of requests profiled, 0 = only X-Profile requests
+    top_n: Optional[int] = Field(None, gt=0, le=500)
+
+@app.get("/health/startup", tags=["Monitoring"])
+async def startup_health():
+    """Time spent importing and initialising this worker, and the warm-up steps"""
+    from services.startup_service import startup_report
+    return startup_report()
+
+@app.get("/health/db", tags=["Monitoring"])
+async def db_health_check():
+    """MongoDB ping latency, client settings and this worker's connection pool usage (503 if the ping fails)"""
+    from fastapi.responses import JSONResponse
+    from database import db_health
+    try:
+        return await db_health()
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e)})
+
+@app.get("/admin/profiling", tags=["Monitoring"], dependencies=[Depends(require_admin)])
+async def get_profiling_settings():
+    from services.profiling_service import get_settings
+    return get_settings()
+
+@app.put("/admin/profiling", tags=["Monitoring"], dependencies=[Depends(require_admin)])
+async def set_profiling_settings(request: ProfilingSettingsRequest):
+    """Sets the profiling sample rate for all workers (picked up within a second)"""
+    from services.profiling_service import update_settings
+    return update_settings(request.sample_rate, request.top_n)
+
+@app.get("/admin/profiles", tags=["Monitoring"], dependencies=[Depends(require_admin)])
+async def list_request_profiles(limit: int = 50):
+    """Recent request profiles, newest first"""
+    from services.profiling_service import list_profiles
+    return list_profiles(limit)
+
+@app.get("/admin/profiles/{profile_id}", tags=["Monitoring"], dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str):
+    """Profile summary with the top-N functions by samples"""
+    from services.profiling_service import profile_path
+    path = profile_path(profile_id, "json")
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path) as f:
+        return json.load(f)
+
+@app.get("/admin/profiles/{profile_id}/collapsed", tags=["Monitoring"], dependencies=[Depends(require_admin)])
+async def get_request_profile_stacks(profile_id: str):
+    """Collapsed stacks (flamegraph.pl / speedscope input)"""
+    from fastapi.responses import FileResponse
+    from services.profiling_service import profile_path
+    path = profile_path(profile_id, "folded")
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
 @app.post("/legal/pdf/upload", tags=["PDF Ingestion"])
 async def upload_legal_pdf(
     file: UploadFile = File(...),
@@ -79,24 +243,30 @@ async def upload_legal_pdf(
     await pdf_source.create()
     
     # Trigger extraction
-    text = extract_text_from_pdf(content)
+    with stage_timer("pdf_extraction"):
+        text = extract_text_from_pdf(content)
     
     # Save extracted clauses
     # Use heuristic parsing to avoid LLM rate limits/token costs at ingestion
-    extracted_data = heuristic_extract_clauses(text, f"Legal Document: {file.filename}")
+    with stage_timer("clause_parsing"):
+        extracted_data = heuristic_extract_clauses(text, f"Legal Document: {file.filename}")
     clauses_list = extracted_data.get("clauses", [])
     
-    for c_data in clauses_list:
-        clause = Clause(
+    clauses = [
+        Clause(
             text=c_data["text"],
             clause_type=c_data["clause_type"],
             country=c_data.get("country") or country,
             variables=json.dumps(c_data.get("variables", {})),
             source_id=str(pdf_source.id)
         )
-        await clause.create()
+        for c_data in clauses_list
+    ]
+    # Near-duplicates of this country's stored law clauses (other editions, translations) are linked or skipped
+    with stage_timer("clause_insert"):
+        dedup_result = await insert_clauses_with_dedup(clauses, await dedup_scope(pdf_source))
     
-    return {"message": "PDF uploaded and processed", "pdf_id": str(pdf_source.id), "file_path": file_path, "clauses_count": len(clauses_list)}
+    return {"message": "PDF uploaded and processed", "pdf_id": str(pdf_source.id), "file_path": file_path, "clauses_count": len(clauses_list), "duplicates_count": dedup_result["duplicates"]}
 
 @app.post("/policies/pdf/upload", tags=["PDF Ingestion"])
 async def upload_policy_pdf(
@@ -119,22 +289,27 @@ async def upload_policy_pdf(
     )
     await pdf_source.create()
     
-    text = extract_text_from_pdf(content)
+    with stage_timer("pdf_extraction"):
+        text = extract_text_from_pdf(content)
     
-    extracted_data = heuristic_extract_clauses(text, f"Company Policy: {file.filename}")
+    with stage_timer("clause_parsing"):
+        extracted_data = heuristic_extract_clauses(text, f"Company Policy: {file.filename}")
     clauses_list = extracted_data.get("clauses", [])
     
-    for c_data in clauses_list:
-        clause = Clause(
+    clauses = [
+        Clause(
             text=c_data["text"],
             clause_type=c_data["clause_type"],
             country=c_data.get("country"),
             variables=json.dumps(c_data.get("variables", {})),
             source_id=str(pdf_source.id)
         )
-        await clause.create()
+        for c_data in clauses_list
+    ]
+    with stage_timer("clause_insert"):
+        dedup_result = await insert_clauses_with_dedup(clauses, await dedup_scope(pdf_source))
         
-    return {"message": "Policy uploaded and processed", "pdf_id": str(pdf_source.id), "file_path": file_path, "clauses_count": len(clauses_list)}
+    return {"message": "Policy uploaded and processed", "pdf_id": str(pdf_source.id), "file_path": file_path, "clauses_count": len(clauses_list), "duplicates_count": dedup_result["duplicates"]}
 
 @app.post("/clauses/extract", tags=["Clause Management"])
 async def extract_clauses_from_existing_pdf(
@@ -150,13 +325,14 @@ async def list_clauses(
 ):
     """List extracted clauses with optional filtering"""
     try:
-        query = Clause.find_all()
+        query = {}
         if country:
-            query = query.find(Clause.country == country)
+            query["country"] = country
         if clause_type:
-            query = query.find(Clause.clause_type == clause_type)
+            query["clause_type"] = clause_type
             
-        clauses = await query.to_list()
+        # List reads may go to a secondary (MONGO_LIST_READ_PREFERENCE)
+        clauses = await find_for_listing(Clause, query)
         
         # Serialize to ensure frontend compatibility
         results = []
@@ -171,6 +347,10 @@ async def list_clauses(
                 except:
                     c_dict["variables"] = {}
             
+            # Dedup internals are not useful to the frontend
+            c_dict.pop("minhash", None)
+            c_dict.pop("lsh_buckets", None)
+            
             # Explicitly remove _id if present to avoid duplicate id fields or serialization errors
             if "_id" in c_dict:
                 del c_dict["_id"]
@@ -189,6 +369,8 @@ async def upload_employees_excel(
 ):
     """Upload Excel/CSV file with employee details"""
     from services.excel_service import parse_employee_excel, parse_employee_csv
+    from services.chat_session_service import invalidate_employee
+    from services.employee_service import find_employee
     from models import Employee
     
     content = await file.read()
@@ -221,8 +403,12 @@ async def upload_employees_excel(
         try:
             # Check if exists (simple UPSERT based on ID)
             if emp_data.get("employee_id"):
-                existing = await Employee.find_one(Employee.employee_id == emp_data["employee_id"])
+                # Cached chat contexts of this employee are stale now
+                invalidate_employee(emp_data["employee_id"])
+                # Matched on the normalised key, so "emp 001" updates EMP001 instead of duplicating it
+                existing = await find_employee(emp_data["employee_id"])
                 if existing:
+                    invalidate_employee(existing.employee_id)
                     # Update fields
                     existing.name = emp_data["name"]
                     existing.role = emp_data.get("role")
@@ -245,54 +431,124 @@ async def upload_employees_excel(
         "errors": errors
     }
 
+class EmployeeVerifyRequest(BaseModel):
+    employee_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+@app.post("/employees/verify", tags=["Employee Management"])
+async def verify_employees(request: EmployeeVerifyRequest):
+    """Bulk identity check for kiosk / batch flows: one indexed query, results in request order"""
+    from services.chat_tools import verify_identities
+
+    results = await verify_identities(request.employee_ids)
+    return {
+        "results": results,
+        "verified_count": sum(1 for r in results if r["valid"]),
+        "total": len(results)
+    }
+
+class LeaveBalanceRequest(BaseModel):
+    annual: float = Field(..., ge=0)
+    sick: float = Field(..., ge=0)
+
+@app.put("/employees/{employee_id}/leave-balance", tags=["Employee Management"])
+async def update_leave_balance(employee_id: str, request: LeaveBalanceRequest):
+    """Sets an employee's leave balance (read by the chat assistant)"""
+    from services.employee_service import find_employee
+    from services.hris_service import set_leave_balance
+
+    employee = await find_employee(employee_id)
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return await set_leave_balance(employee.employee_id, request.annual, request.sick)
+
+@app.get("/employees/{employee_id}/expenses", tags=["Employee Management"])
+async def list_employee_expenses(employee_id: str):
+    """Expense claims of an employee, newest first"""
+    from services.employee_service import find_employee
+    from services.hris_service import list_expense_claims
+
+    employee = await find_employee(employee_id)
+    return await list_expense_claims(employee.employee_id if employee else employee_id)
+
 @app.get("/employees", tags=["Employee Management"])
 async def list_employees():
     """List all employees"""
     from models import Employee
-    return await Employee.find_all().to_list()
+    return await find_for_listing(Employee)
 
 @app.post("/contracts/generate/legal", tags=["Contract Generation"])
 async def generate_legal_contract(
     request: ContractLegalRequest
 ):
     """Generate a legal contract structure (no candidate data)"""
-    # Fetch relevant clauses
-    law_clauses = await Clause.find(Clause.country == request.country).to_list()
-    
-    # Fetch policy clauses
+    # Policy sources (small collection) decide which clauses count as policy clauses
     policy_sources = await PDFSource.find(PDFSource.category == "policy").to_list()
     policy_ids = [str(p.id) for p in policy_sources]
     
-    policy_clauses = await Clause.find({"source_id": {"$in": policy_ids}}).to_list()
-    
-    all_clauses = []
-    for c in law_clauses + policy_clauses:
-        c_dict = c.model_dump()
-        c_dict["id"] = str(c_dict["id"]) if c_dict.get("id") else None
-        c_dict["source_id"] = str(c_dict["source_id"]) if c_dict.get("source_id") else None
-        all_clauses.append(c_dict)
+    # Near-duplicates are excluded, their originals already carry the text
+    law_filter = {"country": request.country, "duplicate_of": None}
+    policy_filter = {"source_id": {"$in": policy_ids}, "duplicate_of": None}
     
-    if not all_clauses:
-        raise HTTPException(status_code=404, detail="No relevant clauses found")
-
-    # LLM Assembly
     requirements = {
         "country": request.country,
         "company_id": request.company_id
     }
     
-    assembly_result = assemble_contract_from_clauses(all_clauses, requirements)
+    # Fingerprint the clause set using only ids + versions (no clause text loaded)
+    law_versions = await Clause.find(law_filter).project(ClauseVersionView).to_list()
+    policy_versions = await Clause.find(policy_filter).project(ClauseVersionView).to_list()
+    fingerprint = compute_clause_fingerprint(
+        [(str(v.id), v.version) for v in law_versions + policy_versions],
+        {**requirements, "selection": selection_settings()}
+    )
+    
+    # Reuse the active template if nothing changed since it was assembled
+    existing = await Contract.find_one(
+        Contract.fingerprint == fingerprint,
+        Contract.contract_type == "legal",
+        Contract.is_active == True
+    )
+    if existing and not request.force:
+        return {"legal_contract_id": str(existing.id), "clauses": json.loads(existing.content), "reused": True}
+    
+    # Fetch relevant clauses
+    law_clauses = await Clause.find(law_filter).to_list()
+    policy_clauses = await Clause.find(policy_filter).to_list()
+    
+    if not law_clauses and not policy_clauses:
+        raise HTTPException(status_code=404, detail="No relevant clauses found")
+
+    # Pre-select top clauses per type within a token budget so the prompt stays bounded
+    selection = select_clauses_for_assembly(law_clauses, policy_clauses)
+    
+    # LLM Assembly
+    assembly_result = assemble_contract_from_clauses(selection["clauses"], requirements)
     assembled_contract_data = assembly_result.get("assembled_contract", [])
     
+    # A forced rebuild supersedes the previous template for this fingerprint
+    if existing:
+        await Contract.find(
+            Contract.fingerprint == fingerprint,
+            Contract.is_active == True
+        ).update({"$set": {"is_active": False}})
+    
     # Store draft contract
     contract = Contract(
         contract_type="legal",
         company_id=request.company_id,
-        content=json.dumps(assembled_contract_data)
+        country=request.country,
+        fingerprint=fingerprint,
+        content=json.dumps(assembled_contract_data),
+        compiled_template=json.dumps(compile_contract_template(assembled_contract_data))
     )
     await contract.create()
     
-    return {"legal_contract_id": str(contract.id), "clauses": assembled_contract_data}
+    return {
+        "legal_contract_id": str(contract.id),
+        "clauses": assembled_contract_data,
+        "reused": False,
+        "prompt_stats": selection["stats"]
+    }
 
 @app.post("/contracts/generate/employment", tags=["Contract Generation"])
 async def generate_employment_contract(
@@ -303,141 +559,80 @@ async def generate_employment_contract(
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
         
-    contract_content = json.loads(contract.content)
+    # Blocks are compiled once (at legal contract creation); older contracts are compiled and stored on first use
+    compiled = await load_compiled_template(contract)
     
-    final_clauses = []
     candidate_data = request.candidate
     
-    for item in contract_content:
-        # Pre-process: If item is a dict with just "text" (LLM artifact), convert to string
-        if isinstance(item, dict) and "text" in item and not item.get("clause_id") and not item.get("id"):
-            item = item["text"]
-
-        # CASE A: Item is a direct text string (from LLM rewriting)
-        if isinstance(item, str):
-            text = item
-            # Perform variable replacement on the text directly
-            # 1. Define Defaults (UAE Labor Law / Best Practice)
-            defaults = {
-                "probation_period": "6", # Months
-                "notice_period": "30",   # Days
-                "annual_leave": "30",    # Days
-                "working_hours": "8",
-                "rest_days": "1",
-                "currency": "AED",
-                "term": "2",             # Years standard
-                "company_address": "Dubai, United Arab Emirates",
-                "company_name": contract.company_id or "Employer"
-            }
-            
-            # 2. Merge candidate data (Candidate overrides defaults)
-            final_vars = {**defaults, **candidate_data}
-            
-            # 3. Add Computed Values
-            if "start_date" in final_vars:
-                try:
-                    # Calculate end_date based on term
-                    start_dt = datetime.strptime(str(final_vars["start_date"]), "%Y-%m-%d")
-                    term_years = int(float(final_vars.get("term", 2)))
-                    
-                    # Simple calculation: same day, + term years
-                    end_dt = start_dt.replace(year=start_dt.year + term_years)
-                    # Adjust for leap year if needed (Feb 29 -> Feb 28 or Mar 1) - .replace handles errors? No, separate logic.
-                    # But for now, let's keep it simple or use relativedelta if available (not standard).
-                    # Actually standard way:
-                    try:
-                        end_dt = start_dt.replace(year=start_dt.year + term_years)
-                    except ValueError: # Leap day case
-                        end_dt = start_dt.replace(year=start_dt.year + term_years, day=28)
-                        
-                    final_vars["end_date"] = end_dt.strftime("%Y-%m-%d")
-                except Exception as e:
-                    print(f"Error computing end_date: {e}")
-                    # Fallback to empty if calculation fails
-                    final_vars["end_date"] = "________________"
-
-            # Add company_id as company_name if missing (covered by defaults but ensuring precedence)
-            if contract.company_id and "company_name" not in final_vars:
-                final_vars["company_name"] = contract.company_id
-                
-            for k, v in final_vars.items():
-                val_str = str(v)
-                # Replace {key}
-                text = text.replace(f"{{{k}}}", val_str)
-                # Replace [Insert Key] or [Insert Key Name] loose matching attempt
-                text = text.replace(f"[Insert {k}]", val_str)
-                text = text.replace(f"[Insert {k.replace('_', ' ').title()}]", val_str)
-            
-            # Clean up leftover placeholders if any (simple heuristic)
-            import re
-            text = re.sub(r'\[Insert .*?\]', '_______________', text)
-            
-            final_clauses.append(text)
-            
-        # CASE B: Item is a clause object with an ID
-        elif isinstance(item, dict):
-            clause_id = item.get("clause_id") or item.get("id")
-            
-            if clause_id:
-                # Try to get clause from DB to ensure text integrity
-                db_clause = await Clause.get(clause_id)
-                if db_clause:
-                    text = db_clause.text
-                    
-                    # 1. Start with default variables extracted from the clause source
-                    final_vars = {}
-                    try:
-                        if db_clause.variables:
-                            final_vars = json.loads(db_clause.variables)
-                    except:
-                        pass
-                    
-                    # 2. Update with variables resolved during assembly (context-specific)
-                    assembly_vars = item.get("variables", {})
-                    if assembly_vars:
-                        final_vars.update(assembly_vars)
-                    
-                    # 3. Update with candidate specific data (highest priority)
-                    final_vars.update(candidate_data)
-                    
-                    # Perform replacement
-                    for k, v in final_vars.items():
-                         # Handle potential case mismatch or cleanup
-                         val_str = str(v)
-                         text = text.replace(f"{{{k}}}", val_str)
-                    
-                    final_clauses.append(text)
-                else:
-                    # Fallback if clause not found (shouldn't happen)
-                    final_clauses.append(f"[Clause {clause_id} missing]")
-            # Fallback if clause deleted but ID exists in contract draft?
-            pass
+    # Resolve every referenced clause in one query instead of one round trip per clause
+    clause_map, missing_clause_ids = await fetch_clauses_by_ids(referenced_clause_ids(compiled))
+    
+    final_vars = build_candidate_variables(contract.company_id, candidate_data)
+    final_clauses = render_employment_clauses(compiled, clause_map, final_vars, candidate_data)
     
     # Save final employment contract
     employment_contract = Contract(
         contract_type="employment",
         company_id=contract.company_id,
         candidate_name=candidate_data.get("name"),
+        employee_id=candidate_data.get("employee_id"),
         content=json.dumps(final_clauses),
         status="generated"
     )
     await employment_contract.create()
     
-    return {"employment_contract_id": str(employment_contract.id), "final_text": "\n\n".join(final_clauses)}
+    return {
+        "employment_contract_id": str(employment_contract.id),
+        "final_text": "\n\n".join(final_clauses),
+        "missing_clause_ids": missing_clause_ids
+    }
+
+@app.post("/contracts/generate/employment/batch", tags=["Contract Generation"])
+async def generate_employment_contracts_bulk(
+    request: ContractEmploymentBatchRequest
+):
+    """
+    Generate employment contracts for many employees from one legal contract.
+    Streams NDJSON: one line per employee (generated / failed), then a summary line.
+    """
+    from fastapi.responses import StreamingResponse
+    
+    if request.employee_ids is None and request.employee_filter is None:
+        raise HTTPException(status_code=400, detail="Provide employee_ids or employee_filter")
+    
+    # Only plain equality on known Employee fields, no raw Mongo operators from the client
+    employee_filter = request.employee_filter or {}
+    invalid = [k for k, v in employee_filter.items() if k not in EMPLOYEE_FILTER_FIELDS or isinstance(v, (dict, list))]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unsupported employee_filter fields: {invalid}")
+    
+    contract = await Contract.get(request.legal_contract_id)
+    if not contract:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    
+    async def ndjson():
+        async for result in generate_employment_contracts_batch(
+            contract,
+            employee_ids=request.employee_ids,
+            employee_filter=employee_filter,
+            chunk_size=max(1, request.chunk_size)
+        ):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @app.get("/contracts", tags=["Contract Generation"])
 async def list_contracts(contract_type: Optional[str] = None):
     """List all contracts, optionally filtered by type"""
-    query = Contract.find_all()
-    if contract_type:
-        query = query.find(Contract.contract_type == contract_type)
-    return await query.to_list()
+    query = {"contract_type": contract_type} if contract_type else {}
+    # Delta-stored versions get their full text rebuilt
+    return await hydrate_contents(await find_for_listing(Contract, query))
 
 @app.get("/contracts/{contract_id}/pdf", tags=["Contract Generation"])
-async def download_contract_pdf(contract_id: str):
-    """Generate and download PDF for a contract"""
-    from services.pdf_gen_service import generate_contract_pdf
-    from fastapi.responses import StreamingResponse
+async def download_contract_pdf(contract_id: str, if_none_match: Optional[str] = Header(None)):
+    """Generate and download PDF for a contract (cached on disk, supports ETag / If-None-Match)"""
+    from services.pdf_cache_service import contract_pdf_text, pdf_content_hash, etag_for, etag_matches, get_contract_pdf
+    from fastapi.responses import Response
     
     contract = await Contract.get(contract_id)
     if not contract:
@@ -447,20 +642,73 @@ async def download_contract_pdf(contract_id: str):
          raise HTTPException(status_code=400, detail="Can only generate PDF for final employment contracts")
          
     # content is stored as a JSON list of strings, join them
-    try:
-        clauses = json.loads(contract.content)
-        full_text = "\n\n".join(clauses)
-    except:
-        full_text = contract.content
-        
-    pdf_buffer = generate_contract_pdf(full_text)
+    full_text = contract_pdf_text(await load_contract_content(contract))
     
-    return StreamingResponse(
-        pdf_buffer, 
+    # Client already has this exact PDF
+    etag = etag_for(pdf_content_hash(full_text))
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    # Rendered once (in the PDF process pool), then served from the disk cache
+    pdf_bytes, _ = await get_contract_pdf(str(contract.id), full_text)
+    
+    return Response(
+        content=pdf_bytes, 
         media_type="application/pdf", 
-        headers={"Content-Disposition": f"attachment; filename=Contract_{contract.candidate_name or 'Draft'}.pdf"}
+        headers={
+            **cache_headers,
+            "Content-Disposition": f"attachment; filename=Contract_{contract.candidate_name or 'Draft'}.pdf"
+        }
     )
 
+@app.get("/contracts/export/zip", tags=["Contract Generation"])
+async def export_contracts_zip(
+    company_id: Optional[str] = None,
+    status: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    contract_type: str = "employment"
+):
+    """Stream a ZIP of contract PDFs matching the filter (rendered or read from the PDF cache as it goes)"""
+    from services.pdf_cache_service import contract_pdf_text, get_contract_pdf
+    from services.export_service import stream_zip, safe_filename
+    from fastapi.responses import StreamingResponse
+    
+    if contract_type != "employment":
+        raise HTTPException(status_code=400, detail="Can only generate PDF for final employment contracts")
+    
+    query = {"contract_type": contract_type}
+    if company_id:
+        query["company_id"] = company_id
+    if status:
+        query["status"] = status
+    if is_active is not None:
+        query["is_active"] = is_active
+    
+    async def load_pdf(contract: Contract):
+        full_text = contract_pdf_text(await load_contract_content(contract))
+        data, _ = await get_contract_pdf(str(contract.id), full_text)
+        return f"{safe_filename(contract.candidate_name or 'Draft')}_{contract.id}.pdf", data
+    
+    archive_name = safe_filename(f"contracts_{company_id or 'all'}_{datetime.utcnow().strftime('%Y%m%d')}")
+    return StreamingResponse(
+        stream_zip(Contract.find(query), load_pdf),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={archive_name}.zip"}
+    )
+
+@app.get("/contracts/{contract_id}/history", tags=["Contract Versioning"])
+async def contract_history(contract_id: str, include_content: bool = False):
+    """Full version chain of a contract in version order (content only if include_content=true)"""
+    from bson import ObjectId
+    
+    if not ObjectId.is_valid(contract_id):
+        raise HTTPException(status_code=404, detail="Contract not found")
+    history = await get_contract_history(contract_id, include_content)
+    if not history:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    return history
+
 @app.post("/contracts/{contract_id}/amend", tags=["Contract Versioning"])
 async def amend_contract(contract_id: str, amendments: Dict[str, Any]):
     """Create a new version of a contract with amendments"""
@@ -473,19 +721,16 @@ async def amend_contract(contract_id: str, amendments: Dict[str, Any]):
     await original.save()
     
     # Create new version
-    new_content = original.content
+    original_content = await load_contract_content(original)
+    new_content = original_content
     # Simple replace for amendment demo
     for k, v in amendments.items():
         new_content = new_content.replace(str(k), str(v))
         
-    new_contract = Contract(
-        contract_type=original.contract_type,
+    # Stored as a diff against the original (full snapshot every N versions)
+    new_contract = build_contract_version(
+        original, original_content, new_content,
         status="amended",
-        company_id=original.company_id,
-        candidate_name=original.candidate_name,
-        content=new_content,
-        version=original.version + 1,
-        parent_contract_id=str(original.id),
         is_active=True
     )
     await new_contract.create()
@@ -499,28 +744,186 @@ async def renew_contract(contract_id: str, new_end_date: str):
         raise HTTPException(status_code=404, detail="Contract not found")
     
     # Logic similar to amend but focused on dates
-    new_contract = Contract(
-        contract_type=original.contract_type,
-        status="renewed",
-        company_id=original.company_id,
-        candidate_name=original.candidate_name,
-        content=original.content, # In real app, would update date clauses
-        version=original.version + 1,
-        parent_contract_id=str(original.id)
+    original_content = await load_contract_content(original)
+    new_contract = build_contract_version(
+        original, original_content,
+        original_content, # In real app, would update date clauses
+        status="renewed"
     )
     await new_contract.create()
     return {"message": "Contract renewed", "new_contract_id": str(new_contract.id)}
 
+async def validate_grant_requests(grants: List[EquityGrantRequest]):
+    """
+    Checks dates, option counts and employees (one query for all of them, ids matched like /employees/verify).
+    Returns the parsed vesting start dates, the stored employee ids and a list of {"index", "employee_id", "error"}.
+    """
+    errors = []
+    start_dates = []
+    for i, g in enumerate(grants):
+        try:
+            start_dates.append(datetime.strptime(g.vesting_start_date, "%Y-%m-%d"))
+        except ValueError:
+            start_dates.append(None)
+            errors.append({"index": i, "employee_id": g.employee_id, "error": "vesting_start_date must be YYYY-MM-DD"})
+        if g.number_of_options <= 0:
+            errors.append({"index": i, "employee_id": g.employee_id, "error": "number_of_options must be positive"})
+    
+    from services.employee_service import find_employees
+    from models import normalize_employee_id
+    known = await find_employees([g.employee_id for g in grants])
+    employee_ids = []
+    for i, g in enumerate(grants):
+        employee = known.get(normalize_employee_id(g.employee_id))
+        employee_ids.append(employee.employee_id if employee else None)
+        if employee is None:
+            errors.append({"index": i, "employee_id": g.employee_id, "error": "Employee not found"})
+    
+    errors.sort(key=lambda e: e["index"])
+    return start_dates, employee_ids, errors
+
 @app.post("/equity/generate", tags=["Equity Documentation"])
 async def generate_equity_grant(request: EquityGrantRequest):
     """Generate an Equity Grant Letter"""
-    return {"message": "Equity grant generation not implemented yet."}
+    from services.equity_service import grant_letter_text
+    from services.pdf_gen_service import render_contract_pdf_async
+    from fastapi.responses import Response
+    
+    start_dates, employee_ids, errors = await validate_grant_requests([request])
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(e["error"] for e in errors))
+    
+    # Create Equity Record
+    grant = EquityGrant(
+        employee_id=employee_ids[0],
+        vesting_start_date=start_dates[0],
+        number_of_options=request.number_of_options,
+        vesting_schedule=request.vesting_schedule.model_dump_json(),
+        vesting=request.vesting_schedule,
+        status="granted"
+    )
+    await grant.create()
+    
+    pdf_bytes = await render_contract_pdf_async(grant_letter_text(grant), title="Equity Option Grant Letter")
+    
+    return Response(
+        content=pdf_bytes, 
+        media_type="application/pdf", 
+        headers={
+            "Content-Disposition": f"attachment; filename=Grant_{grant.employee_id}.pdf",
+            "X-Grant-Id": str(grant.id)
+        }
+    )
+
+@app.post("/equity/grants/bulk", tags=["Equity Documentation"])
+async def bulk_generate_equity_grants(request: EquityGrantBulkRequest):
+    """
+    Issue many grants at once (e.g. an option pool refresh).
+    All employees are validated in one query and nothing is inserted if any entry is invalid.
+    Letters are rendered in parallel and returned as a streamed ZIP, or as per-grant links.
+    """
+    from beanie import PydanticObjectId
+    from services.equity_service import grant_letter_text
+    from services.pdf_cache_service import get_contract_pdf
+    from services.export_service import stream_zip, safe_filename, EXPORT_WINDOW
+    from fastapi.responses import StreamingResponse
+    import asyncio
+    
+    if request.response_format not in ("zip", "links"):
+        raise HTTPException(status_code=400, detail="response_format must be 'zip' or 'links'")
+    if not request.grants:
+        raise HTTPException(status_code=400, detail="No grants provided")
+    
+    start_dates, employee_ids, errors = await validate_grant_requests(request.grants)
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "Invalid grants, nothing was issued", "errors": errors})
+    
+    grants = [
+        EquityGrant(
+            id=PydanticObjectId(),
+            employee_id=employee_id,
+            vesting_start_date=start_date,
+            number_of_options=g.number_of_options,
+            vesting_schedule=g.vesting_schedule.model_dump_json(),
+            vesting=g.vesting_schedule,
+            status="granted"
+        )
+        for g, start_date, employee_id in zip(request.grants, start_dates, employee_ids)
+    ]
+    await EquityGrant.insert_many(grants)
+    
+    letter_title = "Equity Option Grant Letter"
+    
+    async def render_letter(grant: EquityGrant):
+        # Rendered through the PDF pool and kept in the PDF disk cache
+        pdf_bytes, _ = await get_contract_pdf(f"grant-{grant.id}", grant_letter_text(grant), title=letter_title)
+        return pdf_bytes
+    
+    if request.response_format == "links":
+        # Same window as the ZIP path; letters are only warmed into the cache, so their bytes aren't kept
+        window = asyncio.Semaphore(EXPORT_WINDOW)
+        
+        async def warm_letter(grant: EquityGrant):
+            async with window:
+                await render_letter(grant)
+        
+        await asyncio.gather(*(warm_letter(g) for g in grants))
+        return {
+            "issued": len(grants),
+            "grants": [
+                {"grant_id": str(g.id), "employee_id": g.employee_id, "letter_url": f"/equity/grants/{g.id}/letter"}
+                for g in grants
+            ]
+        }
+    
+    async def grant_items():
+        for g in grants:
+            yield g
+    
+    async def load_letter(grant: EquityGrant):
+        data = await render_letter(grant)
+        return f"Grant_{safe_filename(grant.employee_id)}_{grant.id}.pdf", data
+    
+    return StreamingResponse(
+        stream_zip(grant_items(), load_letter),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=grants_{datetime.utcnow().strftime('%Y%m%d')}.zip"}
+    )
+
+@app.get("/equity/grants/{grant_id}/letter", tags=["Equity Documentation"])
+async def download_grant_letter(grant_id: str):
+    """Download the letter PDF for an issued grant"""
+    from services.equity_service import grant_letter_text
+    from services.pdf_cache_service import get_contract_pdf
+    from fastapi.responses import Response
+    
+    grant = await EquityGrant.get(grant_id)
+    if not grant:
+        raise HTTPException(status_code=404, detail="Grant not found")
+    
+    pdf_bytes, _ = await get_contract_pdf(f"grant-{grant.id}", grant_letter_text(grant), title="Equity Option Grant Letter")
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=Grant_{grant.employee_id}.pdf"}
+    )
+
+@app.get("/equity/cap-table", tags=["Equity Documentation"])
+async def equity_cap_table(as_of: Optional[str] = None):
+    """Company-wide cap table snapshot: vested / unvested options as of a date (YYYY-MM-DD, default today)"""
+    from services.equity_service import cap_table_snapshot
+    
+    try:
+        as_of_date = datetime.strptime(as_of, "%Y-%m-%d") if as_of else datetime.utcnow()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="as_of must be YYYY-MM-DD")
+    return await cap_table_snapshot(as_of_date)
 
-# --- Chatbot Endpoint ---
 # --- Chatbot Endpoint ---
 class ChatRequest(BaseModel):
     message: str
     employee_id: Optional[str] = None # Optional now, generic check first
+    session_id: Optional[str] = None # Issued after VERIFY_IDENTITY succeeds, skips the employee lookup
     history: List[Dict[str, str]] = []
 
 @app.post("/chat", tags=["Conversational HR"])
@@ -532,251 +935,40 @@ async def chat_endpoint(request: ChatRequest):
     2. Policy QA (RAG)
     3. HR Actions (Tools)
     """
-    from services.rag_service import search_knowledge_base
-    from services.chat_tools import get_leave_balance, submit_expense, update_address, verify_identity
-    from services.llm_service import client  # Re-use the Groq client
-    
-    user_msg = request.message
-    emp_id = request.employee_id
-    
-    # Context Builder
-    user_context_str = "Status: UNVERIFIED - UNKNOWN USER"
-    
-    if emp_id:
-        from models import Employee
-        # Fetch details to inject into context
-        emp_record = await Employee.find_one(Employee.employee_id == emp_id)
-        if emp_record:
-            user_context_str = f"""
-            Status: VERIFIED
-            Employee ID: {emp_id}
-            Name: {emp_record.name}
-            Role: {emp_record.role}
-            Department: {emp_record.additional_data_dict.get('Department', 'Unknown')}
-            """
-    
-    # SYSTEM PROMPT: Define tools and behavior
-    system_prompt = f"""
-    You are an intelligent, friendly, and concise HR Assistant. 
-    Your goal is to help employees with questions and tasks quickly and efficiently.
-    
-    USER CONTEXT:
-    {user_context_str}
-    
-    TONE & STYLE:
-    - distinct, modern, and professional but approachable.
-    - NO "Dear User" or "Best Regards". Do NOT write like an email.
-    - Be concise. Get straight to the answer.
-    
-    TOOLS:
-    1. VERIFY_IDENTITY(employee_id): **CRITICAL**: Use this if the user is UNVERIFIED and provides an ID.
-    2. SEARCH_POLICY(query): Answer questions about rules, leave policy, etc.
-    3. GET_LEAVE_BALANCE(employee_id): Check leave days.
-    4. SUBMIT_EXPENSE(amount, description): Claim expense.
-    5. UPDATE_ADDRESS(new_address): Change address.
-    
-    PROTOCOL:
-    - **IF USER IS UNVERIFIED**:
-      - You MUST ask for their Employee ID if they haven't provided it.
-      - If they provide something looking like an ID (e.g., "EMP001"), use TOOL:VERIFY_IDENTITY|ID
-      - Do NOT answer policy/personal questions until verified.
-    
-    - **IF USER IS VERIFIED**:
-      - If question -> TOOL:SEARCH_POLICY|query
-      - If personal data -> TOOL:GET_LEAVE_BALANCE
-      - If action -> TOOL:SUBMIT_EXPENSE or TOOL:UPDATE_ADDRESS
-      - If small talk -> Reply normally.
-    
-    Output ONLY the tool command if a tool is needed.
-    """
-    
-    # 1. Intent Classification
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"User: {user_msg}"}
-            ],
-            temperature=0,
-            max_tokens=100
-        )
-        response_text = completion.choices[0].message.content.strip()
-        
-    except Exception as e:
-        return {"response": "I'm having trouble connecting to my brain right now. Please try again."}
-        
-    # 2. Execute Tool
-    tool_response = None
-    final_response = response_text
-    verified_id_flag = None
-    
-    # Robust Parsing: Check for "TOOL:" prefix OR Regex for function call style
-    import re
-    
-    command = None
-    args = []
-    
-    if response_text.startswith("TOOL:"):
-        parts = response_text.split("|")
-        command = parts[0].replace("TOOL:", "").strip()
-        args = parts[1:]
-    elif "(" in response_text and ")" in response_text:
-        # Fallback: Generic Function Call Parser
-        # Matches: COMMAND(arg1, "arg2")
-        try:
-            # 1. Extract Command Name
-            cmd_match = re.match(r'([A-Z_]+)\s*\(', response_text)
-            if cmd_match:
-                command = cmd_match.group(1)
-                
-                # 2. Extract Content inside parens
-                # Find content between first ( and last )
-                start_idx = response_text.find("(")
-                end_idx = response_text.rfind(")")
-                if start_idx != -1 and end_idx != -1:
-                    params_str = response_text[start_idx+1:end_idx]
-                    
-                    # 3. Simple Argument Splitter (handling quotes is hard with simple split, but let's try)
-                    # For now, simplistic splitting by comma if not in quotes
-                    # Or just regex extract args? 
-                    # Let's try a regex that grabs non-comma stuff or quoted stuff
-                    raw_args = re.findall(r'(?:[^,"]|"(?:\\.|[^"])*")+', params_str)
-                    args = []
-                    for arg in raw_args:
-                        clean_arg = arg.strip()
-                        # Remove key= if present (kwarg to positional)
-                        if "=" in clean_arg:
-                            clean_arg = clean_arg.split("=", 1)[1].strip()
-                        # Remove quotes
-                        clean_arg = clean_arg.strip('"').strip("'")
-                        if clean_arg:
-                            args.append(clean_arg)
-        except Exception as e:
-            print(f"Parsing Error: {e}")
-    
-    if command:
-        if command == "VERIFY_IDENTITY":
-             eid = args[0] if args else user_msg
-             # Extra cleanup just in case
-             eid = eid.strip().strip('"').strip("'")
-             
-             res = await verify_identity(eid)
-             if res["valid"]:
-                 tool_response = f"IDENTITY VERIFIED: Name={res['name']}, Role={res['role']}. WELCOME THEM."
-                 verified_id_flag = eid
-             else:
-                 tool_response = f"ERROR: Employee ID {eid} not found. Ask them to check and try again."
-        
-        elif command == "SEARCH_POLICY":
-            query = args[0] if args else user_msg
-            tool_data = await search_knowledge_base(query)
-            tool_response = f"POLICY CONTEXT:\n{tool_data}"
-            
-        elif command == "GET_LEAVE_BALANCE":
-            target_id = emp_id or "unknown"
-            balance = await get_leave_balance(target_id)
-            tool_response = f"LEAVE BALANCE: {balance}"
-            
-        elif command == "SUBMIT_EXPENSE":
-            if not emp_id:
-                tool_response = "ERROR: User must verify identity first."
-            else:
-                try:
-                    amount = args[0]
-                    desc = args[1] if len(args) > 1 else "Expense"
-                    res = await submit_expense(emp_id, float(amount), desc)
-                    tool_response = f"ACTION RESULT: {res}"
-                except:
-                   tool_response = "Error: Invalid format."
-                
-        elif command == "UPDATE_ADDRESS":
-             if not emp_id:
-                  tool_response = "ERROR: User must verify identity first."
-             else:
-                  addr = args[0] if args else ""
-                  res = await update_address(emp_id, addr)
-                  tool_response = f"ACTION RESULT: {res}"
-
-        elif command == "ADD_DEPENDENT":
-             if not emp_id:
-                  tool_response = "ERROR: User must verify identity first."
-             else:
-                  name = args[0] if args else "Unknown"
-                  relation = args[1] if len(args) > 1 else "Dependent"
-                  from services.chat_tools import add_dependent
-                  res = await add_dependent(emp_id, name, relation)
-                  tool_response = f"ACTION RESULT: {res}"
-            
-        # 3. Final Synthesis
-        if tool_response:
-            synthesis_prompt = f"""
-            User Input: {user_msg}
-            Tool Result: {tool_response}
-            
-            Task: Respond to the user based on the Tool Result.
-            
-            GUIDELINES:
-            - **Natural Language ONLY**: Never output raw JSON, dictionaries, or lists (e.g., do NOT say "annual: 0").
-            - **Friendly & Professional**: Use the user's name if known.
-            - **Context**:
-                - If checking leave: Say "You have X days of annual leave and Y days of sick leave."
-                - If verified: "Welcome back, [Name]. I've verified your identity."
-                - If verification failed: "I couldn't verify that ID. Please check it and try again."
-            - **Be Concise**: One or two sentences is usually enough.
-            """
-            
-            synth_completion = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a helpful HR Assistant."},
-                    {"role": "user", "content": synthesis_prompt}
-                ],
-                temperature=0.3
-            )
-            final_response = synth_completion.choices[0].message.content.strip()
+    from services.chat_service import chat_events
 
-    return {
-        "response": final_response, 
-        "intent_debug": response_text,
-        "verified_employee_id": verified_id_flag
-    }
-    # Create Equity Record
-    grant = EquityGrant(
-        employee_id=request.employee_id,
-        vesting_start_date=datetime.strptime(request.vesting_start_date, "%Y-%m-%d"),
-        number_of_options=request.number_of_options,
-        vesting_schedule=json.dumps(request.vesting_schedule),
-        status="granted"
-    )
-    await grant.create()
-    
-    # Generate PDF (Simplistic text generation for now)
-    from services.pdf_gen_service import generate_contract_pdf
-    
-    text = f"""
-    EQUITY OPTION GRANT LETTER
-    
-    Date: {datetime.utcnow().strftime('%Y-%m-%d')}
-    To Employee ID: {request.employee_id}
-    
-    We are pleased to grant you {request.number_of_options} stock options.
-    
-    Vesting Start Date: {request.vesting_start_date}
-    Vesting Schedule: {request.vesting_schedule.get('details', 'Standard Standard')}
-    
-    This grant is subject to the terms of the Company Stock Option Plan.
+    result = {}
+    async for event in chat_events(request.message, request.employee_id, request.session_id):
+        if event["event"] == "done":
+            result = event["data"]
+    return result
+
+@app.post("/chat/stream", tags=["Conversational HR"])
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Same as /chat as Server-Sent Events: `status`/`intent`/`tool` events while the turn is processed,
+    `token` events as the reply is generated, then `done` with the /chat response body.
     """
-    
-    pdf_buffer = generate_contract_pdf(text)
-    
     from fastapi.responses import StreamingResponse
+    from services.chat_service import chat_events
+
+    async def sse():
+        async for event in chat_events(request.message, request.employee_id, request.session_id, stream=True):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
     return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": f"attachment; filename=Grant_{request.employee_id}.pdf"}
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+@app.get("/chat/router/metrics", tags=["Conversational HR"])
+async def chat_router_metrics():
+    """Fast-path routing hit rate: messages answered without any LLM call vs. sent to the classifier"""
+    from services.intent_router import router_metrics
+    return router_metrics()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # Multi-worker production server; `python serve.py --reload` for development
+    from serve import main
+    main()
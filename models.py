@@ -1,6 +1,7 @@
 from typing import Optional, List, Dict, Any
-from beanie import Document, Link
-from pydantic import Field
+from beanie import Document, Link, Indexed, PydanticObjectId, before_event, Insert, Replace, Save, SaveChanges
+from pymongo import IndexModel, ASCENDING
+from pydantic import BaseModel, Field
 from datetime import datetime
 import json
 
@@ -15,12 +16,22 @@ class PDFSource(Document):
     class Settings:
         name = "pdf_sources"
 
+class VestingSchedule(BaseModel):
+    cliff_months: int = Field(default=12, ge=0)
+    duration_months: int = Field(default=48, gt=0)
+    frequency_months: int = Field(default=1, gt=0) # 1 = monthly, 3 = quarterly, 12 = annually
+    acceleration: str = "none" # none, single_trigger, double_trigger
+    acceleration_percent: float = Field(default=100.0, ge=0, le=100) # share of unvested options that vests on trigger
+    acceleration_date: Optional[datetime] = None # set once the trigger event(s) happened
+    details: Optional[str] = None # free text for the letter, e.g. "4 year vesting, 1 year cliff"
+
 class EquityGrant(Document):
     employee_id: str
     grant_date: datetime = Field(default_factory=datetime.utcnow)
     vesting_start_date: datetime
     number_of_options: int
     vesting_schedule: str # JSON string describing the schedule
+    vesting: VestingSchedule = Field(default_factory=VestingSchedule) # structured schedule used for calculations
     status: str = "draft" # draft, granted, exercised, cancelled
     
     class Settings:
@@ -32,11 +43,23 @@ class Clause(Document):
     country: Optional[str] = None
     variables: str = Field(default="{}")
     page_number: Optional[int] = None
+    version: int = 1 # Bump when the clause text changes so cached templates are invalidated
     
     source_id: Optional[str] = None
     
+    # Near-duplicate detection (see services/dedup_service.py)
+    minhash: Optional[List[int]] = None
+    lsh_buckets: List[str] = Field(default_factory=list)
+    duplicate_of: Optional[str] = None # id of the original clause if this is a near-duplicate
+    
     class Settings:
         name = "clauses"
+        indexes = [
+            "lsh_buckets",
+            # Clause sets of a legal template (fingerprint + selection): law by country, policy by source
+            IndexModel([("country", ASCENDING), ("duplicate_of", ASCENDING)], name="country_duplicate_of"),
+            IndexModel([("source_id", ASCENDING), ("duplicate_of", ASCENDING)], name="source_id_duplicate_of"),
+        ]
 
     @property
     def variables_dict(self) -> Dict[str, Any]:
@@ -46,24 +69,54 @@ class Clause(Document):
     def variables_dict(self, value: Dict[str, Any]):
         self.variables = json.dumps(value)
 
+class ClauseVersionView(BaseModel):
+    """Projection used to fingerprint a clause set without loading clause text"""
+    id: PydanticObjectId = Field(alias="_id")
+    version: int = 1
+
+class ClauseSignatureView(BaseModel):
+    """Projection used for LSH candidate lookup"""
+    id: PydanticObjectId = Field(alias="_id")
+    minhash: Optional[List[int]] = None
+    lsh_buckets: List[str] = Field(default_factory=list)
+
 class Contract(Document):
     contract_type: str
     status: str = "draft"
     created_at: datetime = Field(default_factory=datetime.utcnow)
     company_id: Optional[str] = None
     candidate_name: Optional[str] = None
+    employee_id: Optional[str] = None
     content: str
     
     # Versioning
     version: int = 1
     parent_contract_id: Optional[str] = None
+    parent_id: Optional[Indexed(PydanticObjectId)] = None # ObjectId mirror of parent_contract_id, used by $graphLookup
     is_active: bool = True
+    # Delta storage: versions between snapshots keep content="" and a diff against the parent
+    delta: Optional[str] = None # JSON diff ops, None means `content` is a full snapshot
+    snapshot_id: Optional[Indexed(str)] = None # nearest full snapshot this delta chain starts from
+    versions_since_snapshot: int = 0
+    
+    # Template reuse (legal contracts): hash of input clause ids/versions + requirements
+    country: Optional[str] = None
+    fingerprint: Optional[Indexed(str)] = None
+    compiled_template: Optional[str] = None # JSON: blocks pre-split into literal segments + placeholder slots
     
     class Settings:
         name = "contracts"
 
+def normalize_employee_id(value: Optional[str]) -> Optional[str]:
+    """Lookup key for an employee id: quotes and all whitespace removed, lower-cased ("EMP 001" -> "emp001")"""
+    if value is None:
+        return None
+    key = "".join(str(value).split()).strip('"\'`').lower()
+    return key or None
+
 class Employee(Document):
     employee_id: Optional[str] = None # Internal ID or Employee Number from Excel
+    employee_id_key: Optional[str] = None # normalize_employee_id(employee_id), unique
     name: str
     role: Optional[str] = None
     email: Optional[str] = None
@@ -75,6 +128,19 @@ class Employee(Document):
     
     class Settings:
         name = "employees"
+        indexes = [
+            # Partial: employees imported without an id don't collide on null
+            IndexModel(
+                [("employee_id_key", ASCENDING)],
+                name="employee_id_key_unique",
+                unique=True,
+                partialFilterExpression={"employee_id_key": {"$type": "string"}}
+            ),
+        ]
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def set_employee_id_key(self):
+        self.employee_id_key = normalize_employee_id(self.employee_id)
 
     @property
     def additional_data_dict(self) -> Dict[str, Any]:
@@ -82,3 +148,25 @@ class Employee(Document):
              return json.loads(self.additional_data)
         except:
              return {}
+
+class LeaveBalance(Document):
+    employee_id: str
+    employee_id_key: Indexed(str, unique=True) # normalize_employee_id(employee_id)
+    annual: float = 0 # Days
+    sick: float = 0   # Days
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "leave_balances"
+
+class ExpenseClaim(Document):
+    claim_id: Indexed(str, unique=True) # Assigned on submit, so re-flushing a batch never duplicates claims
+    employee_id: Indexed(str)
+    amount: float
+    currency: str = "AED"
+    description: str
+    status: str = "Pending Approval" # Pending Approval, Approved, Rejected, Paid
+    submitted_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "expense_claims"
@@ -16,6 +16,6 @@ source venv/bin/activate
 echo "Installing dependencies..."
 pip install -r requirements.txt
 
-# Run the application
+# Run the application (one worker per CPU; pass --reload for development, --workers N to override)
 echo "Starting FastAPI server..."
-python3 main.py
+exec python3 serve.py "$@"
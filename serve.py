@@ -0,0 +1,109 @@
+"""
+Production launcher: several uvicorn worker processes behind one socket, with uvloop and httptools
+when installed, and graceful shutdown (in-flight requests finish, queued expense claims are written,
+the PDF pool and Mongo client are closed).
+
+Every worker runs the app's lifespan on its own, so it gets its own Mongo connection pool, PDF render
+pool, caches and warm-up. What has to be consistent across workers is shared:
+- chat session ids are signed with one CHAT_SESSION_SECRET (generated here if not set)
+- /metrics adds up all workers through METRICS_MULTIPROC_DIR
+- the profiling sample rate lives in a file under PROFILE_DIR
+
+Usage:
+    python serve.py                        # WEB_CONCURRENCY or one worker per CPU, port 8000
+    python serve.py --workers 4 --port 8080
+    python serve.py --reload               # development: one process, restarts on code changes
+
+Settings can also come from the environment: HOST, PORT, WEB_CONCURRENCY, GRACEFUL_TIMEOUT, KEEP_ALIVE,
+MAX_REQUESTS, LOG_LEVEL.
+"""
+import os
+import sys
+import secrets
+import argparse
+from importlib.util import find_spec
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+def clear_metrics_snapshots(metrics_dir: str):
+    """Removes only the workers' snapshot files (<pid>.json, *.tmp), the directory may hold other things"""
+    for entry in os.scandir(metrics_dir):
+        name, ext = os.path.splitext(entry.name)
+        if entry.is_file() and ((ext == ".json" and name.isdigit()) or ext == ".tmp"):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def prepare_worker_env(workers: int):
+    """Environment the worker processes inherit; set before uvicorn spawns them"""
+    # Sessions issued by one worker must verify in the others
+    os.environ.setdefault("CHAT_SESSION_SECRET", secrets.token_urlsafe(32))
+
+    # Split the PDF render processes between the workers instead of min(4, CPUs) each
+    if "PDF_WORKERS" not in os.environ:
+        os.environ["PDF_WORKERS"] = str(max(1, min(4, (os.cpu_count() or 1) // workers)))
+
+    if workers > 1:
+        # Snapshots of the previous run could belong to reused pids
+        metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join("cache", "metrics"))
+        os.makedirs(metrics_dir, exist_ok=True)
+        clear_metrics_snapshots(metrics_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--reload", action="store_true", help="development mode: single process, auto-reload")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE", "5")))
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "0")),
+                        help="restart a worker after this many requests (0 = never)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+
+    # uploads/, cache/ and .env are relative to the project root
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+
+    import uvicorn
+
+    if args.reload:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True, log_level=args.log_level)
+        return
+
+    workers = max(1, args.workers or default_workers())
+    prepare_worker_env(workers)
+
+    loop = "uvloop" if find_spec("uvloop") else "asyncio"
+    http = "httptools" if find_spec("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} (loop={loop}, http={http}, "
+          f"pdf_workers={os.environ['PDF_WORKERS']} each)")
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keep_alive,
+        limit_max_requests=args.max_requests or None,
+        # Spread restarts so the workers don't all recycle at once
+        limit_max_requests_jitter=args.max_requests // 10,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
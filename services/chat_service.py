@@ -0,0 +1,195 @@
+import asyncio
+import time
+from typing import Dict, Any, AsyncIterator, Optional
+
+from services.chat_tools import run_tool
+from services.intent_router import route_message, fast_path_reply, record_fast_path_latency, parse_tool_command
+from services.chat_session_service import get_session, create_session, session_employee_id, UNVERIFIED_SYSTEM_PROMPT
+from services.metrics_service import record_llm_tokens
+
+CHAT_MODEL = "llama-3.1-8b-instant"
+
+SYNTHESIS_PROMPT = """
+            User Input: {user_msg}
+            Tool Result: {tool_response}
+
+            Task: Respond to the user based on the Tool Result.
+
+            GUIDELINES:
+            - **Natural Language ONLY**: Never output raw JSON, dictionaries, or lists (e.g., do NOT say "annual: 0").
+            - **Friendly & Professional**: Use the user's name if known.
+            - **Context**:
+                - If checking leave: Say "You have X days of annual leave and Y days of sick leave."
+                - If verified: "Welcome back, [Name]. I've verified your identity."
+                - If verification failed: "I couldn't verify that ID. Please check it and try again."
+            - **Be Concise**: One or two sentences is usually enough.
+            """
+
+CONNECTION_ERROR_REPLY = "I'm having trouble connecting to my brain right now. Please try again."
+
+
+def _event(event: str, **data) -> Dict[str, Any]:
+    return {"event": event, "data": data}
+
+
+async def _synthesis_tokens(user_msg: str, tool_response: str, stream: bool) -> AsyncIterator[str]:
+    """Synthesis reply, token by token when streaming (read with the async client, no thread per stream)"""
+    from services.llm_service import create_completion, create_completion_async
+
+    kwargs = dict(
+        model=CHAT_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful HR Assistant."},
+            {"role": "user", "content": SYNTHESIS_PROMPT.format(user_msg=user_msg, tool_response=tool_response)}
+        ],
+        temperature=0.3
+    )
+    if not stream:
+        completion = await asyncio.to_thread(create_completion, "chat_synthesis", **kwargs)
+        yield completion.choices[0].message.content.strip()
+        return
+
+    # Closing the stream releases the connection if the client goes away mid-reply
+    async with await create_completion_async("chat_synthesis", stream=True, **kwargs) as chunks:
+        async for chunk in chunks:
+            # Groq sends the usage with the last chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                record_llm_tokens(CHAT_MODEL, "chat_synthesis", x_groq.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+async def _restore_session(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Session issued by another worker, before a restart or whose cached context expired: rebuild it from the employee record"""
+    employee_id = session_employee_id(session_id)
+    if not employee_id:
+        return None
+    from services.employee_service import find_employee
+    emp_record = await find_employee(employee_id)
+    if not emp_record:
+        return None
+    create_session(
+        emp_record.employee_id, emp_record.name, emp_record.role,
+        emp_record.additional_data_dict.get('Department', 'Unknown'),
+        session_id=session_id
+    )
+    return get_session(session_id)
+
+
+async def chat_events(message: str, employee_id: Optional[str] = None, session_id: Optional[str] = None,
+                      stream: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """
+    One chat turn as a sequence of events:
+    status (pipeline stage), intent, tool, token (reply text), and finally done with the response metadata.
+    With stream=False the reply comes as a single token event.
+    """
+    from services.llm_service import create_completion  # Re-use the Groq client
+
+    user_msg = message
+    emp_id = employee_id
+    request_session_id = session_id
+    session_id = None
+
+    # Context Builder: verified sessions carry the employee context and the rendered prompt
+    system_prompt = UNVERIFIED_SYSTEM_PROMPT
+    verified = False
+    session = get_session(request_session_id) or await _restore_session(request_session_id)
+    if session and (not emp_id or emp_id == session["employee_id"]):
+        emp_id = session["employee_id"]
+        session_id = request_session_id
+        system_prompt = session["system_prompt"]
+        verified = True
+    elif emp_id:
+        from services.employee_service import find_employee
+        # No session yet: fetch details once, later turns reuse the session
+        emp_record = await find_employee(emp_id)
+        if emp_record:
+            emp_id = emp_record.employee_id
+            session_id = create_session(
+                emp_id, emp_record.name, emp_record.role,
+                emp_record.additional_data_dict.get('Department', 'Unknown')
+            )
+            system_prompt = get_session(session_id)["system_prompt"]
+            verified = True
+
+    verified_id_flag = None
+
+    # 0. Fast path: obvious intents skip both LLM calls
+    started = time.perf_counter()
+    route = route_message(user_msg, verified=verified)
+    if route:
+        yield _event("intent", command=route.command, fast_path=True)
+        tool_message, result = await run_tool(route.command, route.args, user_msg, emp_id)
+        if route.command == "VERIFY_IDENTITY" and result["valid"]:
+            verified_id_flag = result["employee_id"]
+            session_id = create_session(result["employee_id"], result["name"], result["role"], result["department"])
+        final_response = fast_path_reply(route.command, result, tool_message)
+        record_fast_path_latency(started)
+        yield _event("tool", command=route.command, status="done")
+        yield _event("token", text=final_response)
+        yield _event("done",
+                     response=final_response,
+                     intent_debug=f"FAST_PATH:{route.command}|" + "|".join(route.args),
+                     verified_employee_id=verified_id_flag,
+                     session_id=session_id)
+        return
+
+    # 1. Intent Classification
+    yield _event("status", stage="classifying")
+    try:
+        completion = await asyncio.to_thread(
+            create_completion,
+            "chat_intent",
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"User: {user_msg}"}
+            ],
+            temperature=0,
+            max_tokens=100
+        )
+        response_text = completion.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Chat classification error: {e}")
+        yield _event("token", text=CONNECTION_ERROR_REPLY)
+        yield _event("done", response=CONNECTION_ERROR_REPLY, intent_debug=None,
+                     verified_employee_id=None, session_id=session_id)
+        return
+
+    # 2. Execute Tool
+    final_response = response_text
+    command, args = parse_tool_command(response_text)
+    tool_response = None
+    if command:
+        yield _event("intent", command=command, fast_path=False)
+        yield _event("tool", command=command, status="running")
+        tool_response, result = await run_tool(command, args, user_msg, emp_id)
+        if command == "VERIFY_IDENTITY" and result["valid"]:
+            verified_id_flag = result["employee_id"]
+            session_id = create_session(result["employee_id"], result["name"], result["role"], result["department"])
+        yield _event("tool", command=command, status="done")
+
+    # 3. Final Synthesis
+    if tool_response:
+        yield _event("status", stage="responding")
+        parts = []
+        try:
+            async for token in _synthesis_tokens(user_msg, tool_response, stream):
+                parts.append(token)
+                yield _event("token", text=token)
+            final_response = "".join(parts).strip()
+        except Exception as e:
+            print(f"Chat synthesis error: {e}")
+            final_response = "".join(parts).strip() or CONNECTION_ERROR_REPLY
+            if not parts:
+                yield _event("token", text=CONNECTION_ERROR_REPLY)
+    else:
+        # Small talk: the classifier output is the reply
+        yield _event("token", text=final_response)
+
+    yield _event("done",
+                 response=final_response,
+                 intent_debug=response_text,
+                 verified_employee_id=verified_id_flag,
+                 session_id=session_id)
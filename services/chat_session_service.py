@@ -0,0 +1,153 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+from typing import Dict, Any, Optional, Set
+
+from services.cache_service import TTLCache
+
+SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "10000"))
+# How long a worker trusts its cached context before rebuilding it from the employee record. A re-import
+# only clears the contexts of the worker that handled it, so this bounds how stale the others can be.
+SESSION_CONTEXT_TTL_SECONDS = int(os.getenv("CHAT_SESSION_CONTEXT_TTL_SECONDS", "60"))
+
+# Session ids are signed tokens (employee id + expiry), so every server worker accepts them.
+# serve.py shares one secret between its workers; set it explicitly to keep sessions across restarts/hosts.
+SESSION_SECRET = (os.getenv("CHAT_SESSION_SECRET") or secrets.token_urlsafe(32)).encode()
+
+# session_id -> verified employee context + pre-rendered system prompt (per worker; a worker that
+# hasn't seen a session yet, or whose context is older than SESSION_CONTEXT_TTL_SECONDS, rebuilds it
+# from the employee record)
+_sessions = TTLCache(max_size=SESSION_MAX, ttl_seconds=min(SESSION_CONTEXT_TTL_SECONDS, SESSION_TTL_SECONDS))
+# employee_id -> session ids, so a re-import can drop stale contexts (of this worker)
+_sessions_by_employee: Dict[str, Set[str]] = {}
+
+SYSTEM_PROMPT_TEMPLATE = """
+    You are an intelligent, friendly, and concise HR Assistant. 
+    Your goal is to help employees with questions and tasks quickly and efficiently.
+    
+    USER CONTEXT:
+    {user_context}
+    
+    TONE & STYLE:
+    - distinct, modern, and professional but approachable.
+    - NO "Dear User" or "Best Regards". Do NOT write like an email.
+    - Be concise. Get straight to the answer.
+    
+    TOOLS:
+    1. VERIFY_IDENTITY(employee_id): **CRITICAL**: Use this if the user is UNVERIFIED and provides an ID.
+    2. SEARCH_POLICY(query): Answer questions about rules, leave policy, etc.
+    3. GET_LEAVE_BALANCE(employee_id): Check leave days.
+    4. SUBMIT_EXPENSE(amount, description): Claim expense.
+    5. UPDATE_ADDRESS(new_address): Change address.
+    
+    PROTOCOL:
+    - **IF USER IS UNVERIFIED**:
+      - You MUST ask for their Employee ID if they haven't provided it.
+      - If they provide something looking like an ID (e.g., "EMP001"), use TOOL:VERIFY_IDENTITY|ID
+      - Do NOT answer policy/personal questions until verified.
+    
+    - **IF USER IS VERIFIED**:
+      - If question -> TOOL:SEARCH_POLICY|query
+      - If personal data -> TOOL:GET_LEAVE_BALANCE
+      - If action -> TOOL:SUBMIT_EXPENSE or TOOL:UPDATE_ADDRESS
+      - If small talk -> Reply normally.
+    
+    Output ONLY the tool command if a tool is needed.
+    """
+
+UNVERIFIED_CONTEXT = "Status: UNVERIFIED - UNKNOWN USER"
+
+# Rendered once, every unverified turn uses the same prompt
+UNVERIFIED_SYSTEM_PROMPT = SYSTEM_PROMPT_TEMPLATE.format(user_context=UNVERIFIED_CONTEXT)
+
+
+def render_system_prompt(employee_id: str, name: str, role: Optional[str], department: Optional[str]) -> str:
+    user_context = f"""
+            Status: VERIFIED
+            Employee ID: {employee_id}
+            Name: {name}
+            Role: {role}
+            Department: {department or 'Unknown'}
+            """
+    return SYSTEM_PROMPT_TEMPLATE.format(user_context=user_context)
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest()[:18])
+
+
+def _issue_token(employee_id: str, expires_at: int) -> str:
+    payload = _b64(json.dumps({"e": employee_id, "x": expires_at, "n": secrets.token_hex(4)}).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def _token_claims(session_id: str) -> Optional[Dict[str, Any]]:
+    payload, _, signature = session_id.partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except ValueError:
+        return None
+    return claims if claims.get("x", 0) > time.time() else None
+
+
+def session_employee_id(session_id: Optional[str]) -> Optional[str]:
+    """Employee id of a valid, unexpired session token (issued by any worker), else None"""
+    if not session_id:
+        return None
+    claims = _token_claims(session_id)
+    return claims["e"] if claims else None
+
+
+def create_session(employee_id: str, name: str, role: Optional[str], department: Optional[str],
+                   session_id: Optional[str] = None) -> str:
+    """
+    Caches the verified employee context and its system prompt, returns the new session id.
+    Pass `session_id` to cache the context of an existing session issued by another worker.
+    """
+    if session_id is None:
+        expires_at = int(time.time()) + SESSION_TTL_SECONDS
+        session_id = _issue_token(employee_id, expires_at)
+    else:
+        expires_at = _token_claims(session_id)["x"]
+    _sessions.set(session_id, {
+        "employee_id": employee_id,
+        "name": name,
+        "role": role,
+        "department": department,
+        "system_prompt": render_system_prompt(employee_id, name, role, department),
+        "expires_at": expires_at,
+    })
+    # Forget ids of sessions that already expired or were evicted
+    live = {sid for sid in _sessions_by_employee.get(employee_id, set()) if _sessions.get(sid) is not None}
+    live.add(session_id)
+    _sessions_by_employee[employee_id] = live
+    return session_id
+
+
+def get_session(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not session_id:
+        return None
+    session = _sessions.get(session_id)
+    if session is not None and session["expires_at"] <= time.time():
+        return None
+    return session
+
+
+def invalidate_employee(employee_id: str):
+    """
+    Drops this worker's cached contexts of an employee (e.g. their record was re-imported).
+    Other workers rebuild theirs once they are older than SESSION_CONTEXT_TTL_SECONDS.
+    """
+    for session_id in _sessions_by_employee.pop(employee_id, set()):
+        _sessions.pop(session_id)
@@ -1,70 +1,108 @@
 
-from typing import Dict, Any
-
-# Mock Database for HRIS Data
-MOCK_LEAVE_BALANCES = {
-    "emp_001": {"annual": 25, "sick": 10},
-    "emp_002": {"annual": 5, "sick": 2}
-}
-
-MOCK_EXPENSES = []
+from typing import List, Dict, Any, Optional, Tuple
 
 async def get_leave_balance(employee_id: str) -> Dict[str, int]:
     """Returns the leave balance for an employee"""
-    # Normalize ID to match mock keys
-    key = employee_id.strip().lower()
-    return MOCK_LEAVE_BALANCES.get(key, {"annual": 0, "sick": 0})
+    from services.hris_service import get_leave_balance as cached_leave_balance
+    return await cached_leave_balance(employee_id)
 
 async def submit_expense(employee_id: str, amount: float, description: str) -> str:
-    """Submits an expense claim"""
-    MOCK_EXPENSES.append({
-        "employee_id": employee_id,
-        "amount": amount,
-        "description": description,
-        "status": "Pending Approval"
-    })
-    return f"Expense claim for AED {amount} received. Status: Pending Approval."
+    """Submits an expense claim (queued, written to the database in the background)"""
+    from services.hris_service import submit_expense_claim
+    await submit_expense_claim(employee_id, amount, description)
+    return f"Expense claim for AED {amount} received (queued, saved in the background). Status: Pending Approval."
 
 async def update_address(employee_id: str, new_address: str) -> str:
     """Updates the employee's address"""
     # In a real app, update Employee model
     return f"Address updated to: {new_address}"
 
+def _identity(employee) -> Dict[str, Any]:
+    return {
+        "valid": True,
+        "employee_id": employee.employee_id,
+        "name": employee.name,
+        "role": employee.role,
+        "department": employee.additional_data_dict.get("Department", "Unknown")
+    }
+
 async def verify_identity(employee_id: str) -> Dict[str, Any]:
-    """Verifies if an employee ID exists in the database"""
-    from models import Employee
-    import re
-    
-    # 1. Clean the input ID
-    # Remove quotes, spaces, invisible chars
-    clean_id = employee_id.strip().strip('"').strip("'")
-    
-    print(f"DEBUG: verify_identity called. Original: '{employee_id}', Cleaned: '{clean_id}'")
-    
-    # 2. Try Exact Match
-    employee = await Employee.find_one(Employee.employee_id == clean_id)
-    
-    # 3. Try Case-Insensitive Match if not found
-    if not employee:
-        print(f"DEBUG: Exact match failed for '{clean_id}'. Trying case-insensitive.")
-        # Beanie/MongoDB regex for case insensitive
-        employee = await Employee.find_one({"employee_id": {"$regex":f"^{re.escape(clean_id)}$", "$options": "i"}})
-        
+    """Verifies if an employee ID exists in the database (case, whitespace and quotes are ignored)"""
+    from services.employee_service import find_employee
+
+    employee = await find_employee(employee_id)
     if employee:
-        print(f"DEBUG: Found employee: {employee.name}")
-        return {
-            "valid": True,
-            "name": employee.name,
-            "role": employee.role,
-            "department": "Unknown" 
-        }
-        
-    print(f"DEBUG: Verification FAILED for '{clean_id}'")
+        return _identity(employee)
+
+    clean_id = employee_id.strip().strip('"').strip("'")
     return {"valid": False, "error": f"Employee ID {clean_id} not found"}
 
+async def verify_identities(employee_ids: List[str]) -> List[Dict[str, Any]]:
+    """Bulk verify_identity (kiosk / batch flows), one query for all ids, results in input order"""
+    from services.employee_service import find_employees
+    from models import normalize_employee_id
+
+    found = await find_employees(employee_ids)
+    results = []
+    for employee_id in employee_ids:
+        employee = found.get(normalize_employee_id(employee_id))
+        if employee:
+            results.append({"input": employee_id, **_identity(employee)})
+        else:
+            results.append({"input": employee_id, "valid": False, "error": f"Employee ID {employee_id} not found"})
+    return results
+
 async def add_dependent(employee_id: str, name: str, relation: str) -> str:
     """
     Mock workflow: Adds a dependent and routes to benefits provider.
     """
     # In real app: Update DB, Email Benefits Provider, etc.
     return f"Request to add {name} ({relation}) has been initiated. I've sent the details to our insurance provider. You will receive a confirmation email shortly."
+
+
+async def run_tool(command: str, args: List[str], user_msg: str, employee_id: Optional[str]) -> Tuple[Optional[str], Any]:
+    """
+    Executes a chat tool command (from the fast-path router or the LLM classifier).
+    Returns (tool_response for the synthesis prompt, raw tool result); (None, None) for unknown commands.
+    """
+    if command == "VERIFY_IDENTITY":
+        eid = args[0] if args else user_msg
+        # Extra cleanup just in case
+        eid = eid.strip().strip('"').strip("'")
+        res = await verify_identity(eid)
+        if res["valid"]:
+            return f"IDENTITY VERIFIED: Name={res['name']}, Role={res['role']}. WELCOME THEM.", res
+        return f"ERROR: Employee ID {eid} not found. Ask them to check and try again.", res
+
+    if command == "SEARCH_POLICY":
+        from services.rag_service import search_knowledge_base
+        query = args[0] if args else user_msg
+        tool_data = await search_knowledge_base(query)
+        return f"POLICY CONTEXT:\n{tool_data}", tool_data
+
+    if command == "GET_LEAVE_BALANCE":
+        balance = await get_leave_balance(employee_id or "unknown")
+        return f"LEAVE BALANCE: {balance}", balance
+
+    if command not in ("SUBMIT_EXPENSE", "UPDATE_ADDRESS", "ADD_DEPENDENT"):
+        return None, None
+    if not employee_id:
+        return "ERROR: User must verify identity first.", None
+
+    if command == "SUBMIT_EXPENSE":
+        from services.hris_service import ExpenseQueueFull
+        try:
+            amount = args[0]
+            desc = args[1] if len(args) > 1 else "Expense"
+            res = await submit_expense(employee_id, float(amount), desc)
+        except ExpenseQueueFull:
+            return "Error: Expense claims can't be accepted right now, please try again in a few minutes.", None
+        except Exception:
+            return "Error: Invalid format.", None
+    elif command == "UPDATE_ADDRESS":
+        res = await update_address(employee_id, args[0] if args else "")
+    else:
+        name = args[0] if args else "Unknown"
+        relation = args[1] if len(args) > 1 else "Dependent"
+        res = await add_dependent(employee_id, name, relation)
+    return f"ACTION RESULT: {res}", res
@@ -0,0 +1,114 @@
+import os
+import json
+from typing import List, Dict, Any
+
+# Rough token estimate (same ~4 chars/token rule of thumb used for chunking in llm_service)
+CHARS_PER_TOKEN = 4
+
+# Max clauses kept per clause type and total prompt budget for the clause list
+CLAUSE_TOP_K = int(os.getenv("CLAUSE_TOP_K", "3"))
+CLAUSE_TOKEN_BUDGET = int(os.getenv("CLAUSE_TOKEN_BUDGET", "3000"))
+# Single clauses longer than this are cut, one runaway article shouldn't eat the budget
+CLAUSE_MAX_CHARS = int(os.getenv("CLAUSE_MAX_CHARS", "1500"))
+
+# Contract section each clause type feeds, with keywords used to rank clauses inside a type.
+# Order matters: it's the order sections get their first clause when filling the budget.
+SECTION_KEYWORDS = {
+    "compensation": ["basic salary", "allowance", "wage", "remuneration", "payment"],
+    "probation": ["probation", "six months", "trial"],
+    "working_hours": ["working hours", "rest day", "overtime", "hours per"],
+    "leave": ["annual leave", "sick leave", "days", "holiday"],
+    "termination": ["notice", "terminate", "termination", "gratuity", "end of service"],
+    "duties": ["duties", "responsibilit", "job", "workplace"],
+    "non_compete": ["non-compete", "competition", "two years", "competitor"],
+    "confidentiality": ["confidential", "secret", "disclose"],
+    "general": ["employer", "employee", "contract", "term"],
+}
+
+# Fewer catch-all clauses, they are rarely specific enough to be useful
+TYPE_TOP_K_OVERRIDES = {"general": 2}
+
+# Clause fields the pre-selection prompt serialized; fields added since (version, minhash,
+# lsh_buckets, duplicate_of) were never sent and must not inflate the baseline
+LEGACY_PROMPT_FIELDS = {"id", "text", "clause_type", "country", "variables", "page_number", "source_id"}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _score_clause(text: str, clause_type: str, origin: str) -> float:
+    """Keyword density for the clause's section, with law ranked above policy (law overrides policy)"""
+    text_lower = text.lower()
+    keywords = SECTION_KEYWORDS.get(clause_type, SECTION_KEYWORDS["general"])
+    hits = sum(text_lower.count(k) for k in keywords)
+    # Normalise by length so long articles that mention everything don't always win
+    density = hits / (1 + len(text_lower) / 500)
+    return density + (1.0 if origin == "law" else 0.0)
+
+
+def select_clauses_for_assembly(law_clauses: list, policy_clauses: list,
+                                top_k: int = None, token_budget: int = None) -> Dict[str, Any]:
+    """
+    Pre-selects clauses before LLM assembly.
+    - Groups clauses by clause_type, keeps the top-k per type
+    - Strips fields the model doesn't need (ids, source_id, empty variables)
+    - Fills the token budget round-robin across types so every section gets its best clause first
+    Returns the compact clause list plus prompt token stats.
+    """
+    top_k = top_k or CLAUSE_TOP_K
+    token_budget = token_budget or CLAUSE_TOKEN_BUDGET
+
+    # Baseline: what the old prompt would have contained (model dumps of the fields it had)
+    raw = [c.model_dump(mode="json", include=LEGACY_PROMPT_FIELDS) for c in law_clauses + policy_clauses]
+    tokens_before = estimate_tokens(json.dumps(raw))
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for origin, clauses in (("law", law_clauses), ("policy", policy_clauses)):
+        for c in clauses:
+            text = c.text.strip()
+            if not text:
+                continue
+            groups.setdefault(c.clause_type or "general", []).append({
+                "score": _score_clause(text, c.clause_type, origin),
+                "clause": {"type": c.clause_type, "source": origin, "text": text[:CLAUSE_MAX_CHARS]},
+            })
+
+    ranked: Dict[str, List[Dict[str, Any]]] = {}
+    for clause_type, items in groups.items():
+        items.sort(key=lambda i: i["score"], reverse=True)
+        k = min(top_k, TYPE_TOP_K_OVERRIDES.get(clause_type, top_k))
+        ranked[clause_type] = [i["clause"] for i in items[:k]]
+
+    # Section order first, then any unknown types
+    type_order = [t for t in SECTION_KEYWORDS if t in ranked] + [t for t in ranked if t not in SECTION_KEYWORDS]
+
+    selected = []
+    used_tokens = 0
+    for rank in range(top_k):
+        for clause_type in type_order:
+            if rank >= len(ranked[clause_type]):
+                continue
+            clause = ranked[clause_type][rank]
+            cost = estimate_tokens(json.dumps(clause))
+            if used_tokens + cost > token_budget:
+                continue
+            selected.append(clause)
+            used_tokens += cost
+
+    tokens_after = estimate_tokens(json.dumps(selected))
+    return {
+        "clauses": selected,
+        "stats": {
+            "input_clauses": len(raw),
+            "selected_clauses": len(selected),
+            "prompt_tokens_before": tokens_before,
+            "prompt_tokens_after": tokens_after,
+            "prompt_tokens_saved": max(tokens_before - tokens_after, 0),
+        },
+    }
+
+
+def selection_settings() -> Dict[str, int]:
+    """Current selection knobs, part of the template fingerprint so changing them rebuilds templates"""
+    return {"top_k": CLAUSE_TOP_K, "token_budget": CLAUSE_TOKEN_BUDGET, "max_chars": CLAUSE_MAX_CHARS}
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+from typing import Dict, Any, Iterable, List, Optional, Tuple, AsyncIterator
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from pymongo.errors import BulkWriteError
+from models import Clause, Contract, Employee, normalize_employee_id
+from services.template_service import (
+    get_compiled_template, referenced_clause_ids, build_candidate_variables, render_employment_clauses
+)
+from services.versioning_service import load_contract_content
+
+
+def compute_clause_fingerprint(clause_versions: Iterable[Tuple[str, int]], requirements: Dict[str, Any]) -> str:
+    """
+    Builds a stable fingerprint for a legal contract template.
+    Input is the (clause_id, version) pairs the template was assembled from plus the requirements,
+    so the same corpus + requirements always map to the same hash (order independent).
+    """
+    payload = {
+        "clauses": sorted(f"{clause_id}:{version}" for clause_id, version in clause_versions),
+        "requirements": requirements,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def fetch_clauses_by_ids(clause_ids: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Resolves clause ids with a single $in query.
+    Returns an id -> Clause map and the ids that could not be found (including malformed ids).
+    """
+    wanted = list(dict.fromkeys(str(cid) for cid in clause_ids))
+    object_ids = []
+    for cid in wanted:
+        try:
+            object_ids.append(PydanticObjectId(cid))
+        except Exception:
+            pass
+
+    clause_map: Dict[str, Any] = {}
+    if object_ids:
+        clauses = await Clause.find(In(Clause.id, object_ids)).to_list()
+        clause_map = {str(c.id): c for c in clauses}
+
+    missing = [cid for cid in wanted if cid not in clause_map]
+    return clause_map, missing
+
+
+async def load_compiled_template(contract: Contract) -> List[Dict[str, Any]]:
+    """
+    Compiled blocks of a legal contract. Compiled once at creation; older contracts
+    (and amended versions) are compiled and stored on first use.
+    """
+    if contract.compiled_template:
+        return get_compiled_template(contract)
+    compiled = get_compiled_template(contract, await load_contract_content(contract))
+    contract.compiled_template = json.dumps(compiled)
+    await contract.save()
+    return compiled
+
+
+# Employee fields that can be used to select employees for batch generation
+EMPLOYEE_FILTER_FIELDS = {"employee_id", "name", "role", "email", "nationality", "start_date"}
+
+
+def employee_to_candidate(employee: Employee) -> Dict[str, Any]:
+    """Candidate variables for an Employee record (extra spreadsheet columns become snake_case keys)"""
+    candidate = {
+        k: v for k, v in {
+            "employee_id": employee.employee_id,
+            "name": employee.name,
+            "role": employee.role,
+            "email": employee.email,
+            "salary": employee.salary,
+            "start_date": employee.start_date,
+            "nationality": employee.nationality,
+            "passport_number": employee.passport_number,
+        }.items() if v is not None
+    }
+    for k, v in employee.additional_data_dict.items():
+        candidate.setdefault(k.strip().lower().replace(" ", "_"), v)
+    return candidate
+
+
+def _insert_chunk(chunk: List[Contract]) -> asyncio.Task:
+    # Unordered, so one rejected contract doesn't stop the rest of the chunk from being written
+    return asyncio.create_task(Contract.insert_many(chunk, ordered=False))
+
+
+def _failed(result: Dict[str, Any], error: Any) -> Dict[str, Any]:
+    return {"employee_id": result["employee_id"], "status": "failed", "error": f"Insert failed: {error}"}
+
+
+async def _finish_chunk(task: asyncio.Task, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Waits for a chunk insert. Employees whose contract was rejected are reported as failed;
+    if the insert failed outright every employee in the chunk is.
+    """
+    try:
+        await task
+        return results
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if not write_errors:
+            # Write concern error: the contracts may not have been written
+            return [_failed(r, e) for r in results]
+        errors = {err["index"]: err.get("errmsg") for err in write_errors}
+        return [_failed(r, errors[i]) if i in errors else r for i, r in enumerate(results)]
+    except Exception as e:
+        return [_failed(r, e) for r in results]
+
+
+async def generate_employment_contracts_batch(
+    legal_contract: Contract,
+    employee_ids: Optional[List[str]] = None,
+    employee_filter: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 200
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Renders employment contracts for many employees from one legal template.
+    The template and its clauses are loaded once, employees are streamed from the DB,
+    and each chunk is bulk inserted while the next chunk is being rendered.
+    Yields one result per employee, then a summary.
+    """
+    compiled = await load_compiled_template(legal_contract)
+    clause_map, missing_clause_ids = await fetch_clauses_by_ids(referenced_clause_ids(compiled))
+
+    query: Dict[str, Any] = dict(employee_filter or {})
+    # Ids are matched on the normalised key, like find_employees ("emp002" finds "EMP 002")
+    id_conditions = []
+    if "employee_id" in query:
+        id_conditions.append({"employee_id_key": normalize_employee_id(query.pop("employee_id"))})
+    if employee_ids is not None:
+        id_conditions.append(
+            {"employee_id_key": {"$in": [k for k in (normalize_employee_id(e) for e in employee_ids) if k]}}
+        )
+    # Both given: an employee must match the filter's id and be in the list
+    if len(id_conditions) == 1:
+        query.update(id_conditions[0])
+    elif id_conditions:
+        query["$and"] = id_conditions
+
+    generated = 0
+    failed = 0
+    seen_keys = set()
+    # (insert task, results) of the chunk currently being written
+    pending: Optional[Tuple[asyncio.Task, List[Dict[str, Any]]]] = None
+    chunk: List[Contract] = []
+    chunk_results: List[Dict[str, Any]] = []
+
+    async for employee in Employee.find(query):
+        seen_keys.add(employee.employee_id_key)
+        try:
+            candidate = employee_to_candidate(employee)
+            final_vars = build_candidate_variables(legal_contract.company_id, candidate)
+            final_clauses = render_employment_clauses(compiled, clause_map, final_vars, candidate)
+            contract = Contract(
+                id=PydanticObjectId(),
+                contract_type="employment",
+                company_id=legal_contract.company_id,
+                candidate_name=candidate.get("name"),
+                employee_id=employee.employee_id,
+                content=json.dumps(final_clauses),
+                status="generated"
+            )
+        except Exception as e:
+            failed += 1
+            yield {"employee_id": employee.employee_id, "status": "failed", "error": str(e)}
+            continue
+
+        chunk.append(contract)
+        chunk_results.append({"employee_id": employee.employee_id, "status": "generated", "employment_contract_id": str(contract.id)})
+
+        if len(chunk) >= chunk_size:
+            if pending:
+                for result in await _finish_chunk(*pending):
+                    generated += result["status"] == "generated"
+                    failed += result["status"] == "failed"
+                    yield result
+            # The insert runs while the next chunk is read and rendered
+            pending = (_insert_chunk(chunk), chunk_results)
+            chunk, chunk_results = [], []
+
+    if chunk:
+        tail = (_insert_chunk(chunk), chunk_results)
+        pending_chunks = [pending, tail] if pending else [tail]
+    else:
+        pending_chunks = [pending] if pending else []
+    for task, results in pending_chunks:
+        for result in await _finish_chunk(task, results):
+            generated += result["status"] == "generated"
+            failed += result["status"] == "failed"
+            yield result
+
+    for employee_id in employee_ids or []:
+        if normalize_employee_id(employee_id) not in seen_keys:
+            failed += 1
+            error = "Employee not found or doesn't match the filter" if employee_filter else "Employee not found"
+            yield {"employee_id": employee_id, "status": "failed", "error": error}
+
+    yield {
+        "done": True,
+        "legal_contract_id": str(legal_contract.id),
+        "generated": generated,
+        "failed": failed,
+        "missing_clause_ids": missing_clause_ids
+    }
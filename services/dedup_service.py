@@ -0,0 +1,150 @@
+import os
+import re
+import random
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
+
+from beanie import PydanticObjectId
+from models import Clause, ClauseSignatureView, PDFSource
+
+# MinHash / LSH parameters.
+# 64 permutations split into 16 bands of 4 rows -> candidate pairs from roughly 0.5 Jaccard upwards,
+# the real cut-off is applied on the estimated similarity afterwards.
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+DEDUP_THRESHOLD = float(os.getenv("CLAUSE_DEDUP_THRESHOLD", "0.85"))
+# "link": store the clause but point duplicate_of at the original, "skip": don't store it, "off": disabled
+DEDUP_MODE = os.getenv("CLAUSE_DEDUP_MODE", "link").lower()
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures are persisted, so the permutations must be identical across processes/restarts
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _shingle_hashes(text: str) -> set:
+    """Word k-shingles of the normalised text, hashed to 32 bits"""
+    normalised = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+    words = normalised.split(" ")
+    if len(words) < SHINGLE_SIZE:
+        shingles = {normalised}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return {
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+        for s in shingles
+    }
+
+
+def minhash_signature(text: str) -> List[int]:
+    hashes = _shingle_hashes(text)
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_buckets(signature: List[int]) -> List[str]:
+    """One bucket key per band; clauses sharing any bucket are near-duplicate candidates"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=8).hexdigest()
+        buckets.append(f"{band}:{digest}")
+    return buckets
+
+
+def estimate_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+async def dedup_scope(source: PDFSource) -> Dict[str, Any]:
+    """
+    Clause filter of the set a new source's clauses may duplicate: law clauses of the same country,
+    or policy clauses of the same company. Selection drops duplicates, so matching across sets
+    (another country's law, a policy restating a law) would empty the set the upload belongs to.
+    """
+    if source.category == "law":
+        sources = await PDFSource.find(PDFSource.category == "law", PDFSource.country == source.country).to_list()
+        return {"country": source.country, "source_id": {"$in": [str(s.id) for s in sources]}}
+    sources = await PDFSource.find(
+        PDFSource.category == source.category, PDFSource.company_id == source.company_id
+    ).to_list()
+    return {"source_id": {"$in": [str(s.id) for s in sources]}}
+
+
+async def insert_clauses_with_dedup(clauses: List[Clause], scope: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Computes MinHash signatures for new clauses, looks up near-duplicates through the
+    persisted LSH buckets (plus earlier clauses of the same batch) and inserts them in one batch.
+    Only stored clauses matching `scope` (see dedup_scope) are candidates.
+    Duplicates above DEDUP_THRESHOLD are linked (duplicate_of) or skipped depending on DEDUP_MODE.
+    """
+    if not clauses:
+        return {"inserted": 0, "duplicates": 0}
+
+    if DEDUP_MODE == "off":
+        await Clause.insert_many(clauses)
+        return {"inserted": len(clauses), "duplicates": 0}
+
+    for clause in clauses:
+        if clause.id is None:
+            clause.id = PydanticObjectId()
+        clause.minhash = minhash_signature(clause.text)
+        clause.lsh_buckets = lsh_buckets(clause.minhash)
+
+    # One indexed query for every bucket touched by this batch
+    all_buckets = list({b for c in clauses for b in c.lsh_buckets})
+    existing = await Clause.find(
+        {**scope, "lsh_buckets": {"$in": all_buckets}, "duplicate_of": None}
+    ).project(ClauseSignatureView).to_list()
+
+    # bucket -> [(clause_id, signature)] over stored originals and this batch's originals
+    index: Dict[str, List[Tuple[str, List[int]]]] = {}
+    for e in existing:
+        for b in e.lsh_buckets:
+            index.setdefault(b, []).append((str(e.id), e.minhash))
+
+    to_insert = []
+    duplicates = 0
+    for clause in clauses:
+        best_id: Optional[str] = None
+        best_score = 0.0
+        seen = set()
+        for b in clause.lsh_buckets:
+            for candidate_id, candidate_sig in index.get(b, []):
+                if candidate_id in seen:
+                    continue
+                seen.add(candidate_id)
+                score = estimate_jaccard(clause.minhash, candidate_sig)
+                if score > best_score:
+                    best_id, best_score = candidate_id, score
+
+        if best_id and best_score >= DEDUP_THRESHOLD:
+            duplicates += 1
+            if DEDUP_MODE == "skip":
+                continue
+            clause.duplicate_of = best_id
+        else:
+            # Only originals become candidates, so chains always point at the first copy
+            for b in clause.lsh_buckets:
+                index.setdefault(b, []).append((str(clause.id), clause.minhash))
+        to_insert.append(clause)
+
+    if to_insert:
+        await Clause.insert_many(to_insert)
+
+    return {"inserted": len(to_insert), "duplicates": duplicates}
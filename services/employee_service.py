@@ -0,0 +1,44 @@
+from typing import List, Dict, Optional
+
+from beanie.operators import In
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models import Employee, normalize_employee_id
+
+
+async def find_employee(employee_id: str) -> Optional[Employee]:
+    """Employee by id, ignoring case, whitespace and quotes (one equality lookup on the unique key index)"""
+    key = normalize_employee_id(employee_id)
+    if not key:
+        return None
+    return await Employee.find_one(Employee.employee_id_key == key)
+
+
+async def find_employees(employee_ids: List[str]) -> Dict[str, Employee]:
+    """Employees for many ids in one query, keyed by normalised id"""
+    keys = {k for k in (normalize_employee_id(e) for e in employee_ids) if k}
+    if not keys:
+        return {}
+    employees = await Employee.find(In(Employee.employee_id_key, list(keys))).to_list()
+    return {e.employee_id_key: e for e in employees}
+
+
+async def backfill_employee_id_keys():
+    """Employees imported before employee_id_key existed get their key (clashing ids are reported, not merged)"""
+    collection = Employee.get_motor_collection()
+    updates = []
+    async for doc in collection.find(
+        {"employee_id": {"$type": "string"}, "employee_id_key": None}, {"employee_id": 1}
+    ):
+        key = normalize_employee_id(doc["employee_id"])
+        if key:
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"employee_id_key": key}}))
+
+    if not updates:
+        return
+    try:
+        await collection.bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        clashes = [err.get("op", {}).get("u", {}).get("$set", {}).get("employee_id_key") for err in e.details.get("writeErrors", [])]
+        print(f"employee_id_key backfill: {len(clashes)} employee ids clash with another employee: {clashes[:20]}")
@@ -0,0 +1,84 @@
+import re
+import asyncio
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Tuple
+
+from services.pdf_gen_service import PDF_WORKERS
+
+# How many PDFs are rendered/read ahead of the one being written; bounds memory to a few documents
+EXPORT_WINDOW = max(2, PDF_WORKERS)
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class _ZipSink:
+    """Write-only, non-seekable target for ZipFile. Bytes are collected until drained into the response."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def safe_filename(name: str) -> str:
+    return _UNSAFE_FILENAME.sub("_", name).strip("_") or "document"
+
+
+async def stream_zip(
+    items: AsyncIterator,
+    load: Callable[[object], Awaitable[Tuple[str, bytes]]],
+    window: int = EXPORT_WINDOW
+) -> AsyncIterator[bytes]:
+    """
+    Streams a ZIP archive. `load(item)` returns (filename, bytes) for each item.
+    Up to `window` loads run ahead while earlier entries are written, each entry is
+    sent as soon as it is written. Failed entries are listed in _errors.txt at the end.
+    """
+    sink = _ZipSink()
+    # PDFs are already compressed, storing is much cheaper than deflating
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    pending = deque()
+    errors = []
+
+    async def write_next():
+        label, task = pending.popleft()
+        try:
+            filename, data = await task
+            archive.writestr(filename, data)
+        except Exception as e:
+            errors.append(f"{label}: {e}")
+
+    try:
+        async for item in items:
+            pending.append((str(getattr(item, "id", item)), asyncio.ensure_future(load(item))))
+            if len(pending) >= window:
+                await write_next()
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+
+        while pending:
+            await write_next()
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        if errors:
+            archive.writestr("_errors.txt", "\n".join(errors))
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Client went away: don't keep rendering for nobody
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,253 @@
+import os
+import json
+import asyncio
+import secrets
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from pymongo.errors import BulkWriteError
+
+from models import LeaveBalance, ExpenseClaim, normalize_employee_id
+from services.cache_service import TTLCache
+from services.metrics_service import EXPENSE_CLAIMS, EXPENSE_FLUSH_FAILURES, EXPENSE_BUFFERED
+
+# Balances change rarely (imports, approvals); a short TTL bounds staleness across workers
+LEAVE_CACHE_TTL_SECONDS = float(os.getenv("LEAVE_CACHE_TTL_SECONDS", "60"))
+LEAVE_CACHE_MAX = int(os.getenv("LEAVE_CACHE_MAX", "10000"))
+
+# Write-behind: claims are queued in the request and inserted in batches
+EXPENSE_BATCH_SIZE = int(os.getenv("EXPENSE_BATCH_SIZE", "100"))
+EXPENSE_FLUSH_INTERVAL_SECONDS = float(os.getenv("EXPENSE_FLUSH_INTERVAL_SECONDS", "0.5"))
+# Claims queued while the database is unreachable; beyond this submit() refuses new ones
+EXPENSE_MAX_BUFFER = int(os.getenv("EXPENSE_MAX_BUFFER", "10000"))
+# Claims the database rejected, and claims still queued when shutdown gave up, one JSON per line
+EXPENSE_DEAD_LETTER_PATH = os.getenv("EXPENSE_DEAD_LETTER_PATH", "cache/expense_dead_letter.jsonl")
+EXPENSE_SHUTDOWN_RETRIES = int(os.getenv("EXPENSE_SHUTDOWN_RETRIES", "3"))
+# Queued claims only live in this process until flushed. Once flushes have failed for this many intervals,
+# submit() writes through instead, so a claim is only acknowledged after it's in the database
+EXPENSE_WRITE_THROUGH_AFTER_INTERVALS = int(os.getenv("EXPENSE_WRITE_THROUGH_AFTER_INTERVALS", "4"))
+
+EMPTY_BALANCE = {"annual": 0, "sick": 0}
+
+_leave_cache = TTLCache(max_size=LEAVE_CACHE_MAX, ttl_seconds=LEAVE_CACHE_TTL_SECONDS)
+
+
+def _balance_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Whole days read as ints ("25" rather than "25.0" in replies)
+    return {k: int(v) if float(v).is_integer() else v for k, v in ((k, doc.get(k, 0)) for k in ("annual", "sick"))}
+
+
+async def get_leave_balance(employee_id: str) -> Dict[str, Any]:
+    """Leave balance by employee id (normalised), through the per-worker read cache"""
+    key = normalize_employee_id(employee_id)
+    if not key:
+        return dict(EMPTY_BALANCE)
+
+    cached = _leave_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    doc = await LeaveBalance.get_motor_collection().find_one(
+        {"employee_id_key": key}, {"_id": 0, "annual": 1, "sick": 1}
+    )
+    balance = _balance_dict(doc) if doc else dict(EMPTY_BALANCE)
+    _leave_cache.set(key, balance)
+    return dict(balance)
+
+
+async def set_leave_balance(employee_id: str, annual: float, sick: float) -> Dict[str, Any]:
+    """Upserts a leave balance (other workers pick it up when their cached copy expires)"""
+    key = normalize_employee_id(employee_id)
+    await LeaveBalance.get_motor_collection().update_one(
+        {"employee_id_key": key},
+        {"$set": {"employee_id": employee_id, "annual": annual, "sick": sick, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    balance = _balance_dict({"annual": annual, "sick": sick})
+    _leave_cache.set(key, balance)
+    return dict(balance)
+
+
+class ExpenseQueueFull(Exception):
+    """
+    submit() can't accept the claim: the write-behind buffer is at EXPENSE_MAX_BUFFER, or flushes have been
+    failing and the write-through failed too (the database has been unreachable for a while)
+    """
+
+
+def _dead_letter(claims: List[ExpenseClaim], reason: str):
+    """Appends claims that won't be written to EXPENSE_DEAD_LETTER_PATH so they can be replayed by hand"""
+    print(f"Expense claims not written ({reason}): {[c.claim_id for c in claims]}")
+    EXPENSE_CLAIMS.inc(len(claims), outcome="dead_lettered")
+    try:
+        os.makedirs(os.path.dirname(EXPENSE_DEAD_LETTER_PATH) or ".", exist_ok=True)
+        with open(EXPENSE_DEAD_LETTER_PATH, "a") as f:
+            for claim in claims:
+                f.write(json.dumps({"reason": reason, "claim": claim.model_dump(mode="json", exclude={"id", "revision_id"})}) + "\n")
+    except OSError as e:
+        print(f"Could not write expense dead letters to {EXPENSE_DEAD_LETTER_PATH}: {e}")
+
+
+class ExpenseWriter:
+    """
+    Write-behind queue for expense claims. submit() only appends to a buffer, a background task
+    inserts the buffer in batches (when it reaches EXPENSE_BATCH_SIZE or every flush interval).
+    Each claim carries a unique claim_id, so retrying a partly inserted batch is idempotent.
+    Claims the database rejects (anything but a duplicate key) are dead-lettered instead of retried.
+    Queued claims are lost if the process dies before they're flushed; while flushes keep failing
+    (EXPENSE_WRITE_THROUGH_AFTER_INTERVALS) new claims are written through rather than queued.
+    One writer per worker process; they all write to the same collection.
+    """
+
+    def __init__(self, batch_size: int = EXPENSE_BATCH_SIZE, interval: float = EXPENSE_FLUSH_INTERVAL_SECONDS,
+                 max_buffer: int = EXPENSE_MAX_BUFFER):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self._buffer: List[ExpenseClaim] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # monotonic time of the first failed flush since the last successful one
+        self._failing_since: Optional[float] = None
+        self.flushed = 0
+        self.dead_lettered = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background task and writes out everything still buffered (dead-lettering what it can't)"""
+        if self._task is not None:
+            # The flag ends the loop even if the cancel is lost (Python 3.11's wait_for can turn it into a timeout)
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._stopping = False
+        failures = 0
+        while self._buffer and failures < EXPENSE_SHUTDOWN_RETRIES:
+            if not await self.flush():
+                failures += 1
+                await asyncio.sleep(0.5 * failures)
+        if self._buffer:
+            _dead_letter(self._buffer, "database unavailable at shutdown")
+            self.dead_lettered += len(self._buffer)
+            self._buffer.clear()
+            EXPENSE_BUFFERED.set(0)
+
+    @property
+    def degraded(self) -> bool:
+        """Flushes have been failing for EXPENSE_WRITE_THROUGH_AFTER_INTERVALS intervals"""
+        return (
+            self._failing_since is not None
+            and time.monotonic() - self._failing_since >= EXPENSE_WRITE_THROUGH_AFTER_INTERVALS * self.interval
+        )
+
+    async def submit(self, claim: ExpenseClaim):
+        if not self.running:
+            # No background writer (scripts, tests): write through
+            await claim.insert()
+            self.flushed += 1
+            EXPENSE_CLAIMS.inc(outcome="written_through")
+            return
+        if self.degraded:
+            # Don't acknowledge claims that would only exist in memory; fails fast while the database is down
+            try:
+                await claim.insert()
+            except Exception as e:
+                raise ExpenseQueueFull(f"expense claims can't be written: {e}") from e
+            self.flushed += 1
+            EXPENSE_CLAIMS.inc(outcome="written_through")
+            return
+        if len(self._buffer) >= self.max_buffer:
+            raise ExpenseQueueFull(f"{len(self._buffer)} expense claims are waiting to be written")
+        self._buffer.append(claim)
+        EXPENSE_CLAIMS.inc(outcome="queued")
+        EXPENSE_BUFFERED.set(len(self._buffer))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self, employee_id: Optional[str] = None) -> List[ExpenseClaim]:
+        return [c for c in self._buffer if employee_id is None or c.employee_id == employee_id]
+
+    async def flush(self) -> bool:
+        """
+        Inserts up to one batch. Returns False (and keeps the claims queued) if the write failed as a whole,
+        e.g. the database is unreachable; claims rejected one by one are dead-lettered and not retried.
+        """
+        if not self._buffer:
+            return True
+        batch = self._buffer[:self.batch_size]
+        try:
+            await ExpenseClaim.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if not write_errors:
+                # Write concern not satisfied: the inserts may not be durable yet, retry (claim_ids make it idempotent)
+                return self._flush_failed("write_concern")
+            # Duplicate claim_ids were already written by an earlier attempt; anything else won't succeed on retry
+            rejected = [err for err in write_errors if err.get("code") != 11000]
+            if rejected:
+                _dead_letter([batch[err["index"]] for err in rejected], f"rejected: {rejected[0].get('errmsg')}")
+                self.dead_lettered += len(rejected)
+                self.flushed -= len(rejected)
+        except Exception:
+            return self._flush_failed("unavailable")
+        del self._buffer[:len(batch)]
+        self.flushed += len(batch)
+        self._failing_since = None
+        EXPENSE_CLAIMS.inc(len(batch), outcome="written")
+        EXPENSE_BUFFERED.set(len(self._buffer))
+        return True
+
+    def _flush_failed(self, reason: str) -> bool:
+        EXPENSE_FLUSH_FAILURES.inc(reason=reason)
+        if self._failing_since is None:
+            self._failing_since = time.monotonic()
+        return False
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while len(self._buffer) >= self.batch_size:
+                if not await self.flush():
+                    break
+            await self.flush()
+
+
+expense_writer = ExpenseWriter()
+
+
+async def submit_expense_claim(employee_id: str, amount: float, description: str) -> ExpenseClaim:
+    claim = ExpenseClaim(
+        claim_id=secrets.token_hex(8),
+        employee_id=employee_id,
+        amount=amount,
+        description=description,
+    )
+    await expense_writer.submit(claim)
+    return claim
+
+
+async def list_expense_claims(employee_id: str) -> List[Dict[str, Any]]:
+    """Stored claims plus the ones this worker hasn't flushed yet, newest first"""
+    stored = await ExpenseClaim.find(ExpenseClaim.employee_id == employee_id).sort("-submitted_at").to_list()
+    stored_ids = {c.claim_id for c in stored}
+    pending = [c for c in expense_writer.pending(employee_id) if c.claim_id not in stored_ids]
+    claims = sorted(pending, key=lambda c: c.submitted_at, reverse=True) + stored
+    return [c.model_dump(exclude={"id", "revision_id"}) for c in claims]
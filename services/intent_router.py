@@ -0,0 +1,206 @@
+import os
+import re
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, NamedTuple
+
+# Routes below this confidence go to the LLM classifier (set above 1 to disable the fast path)
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("CHAT_FASTPATH_MIN_CONFIDENCE", "0.8"))
+
+# A bare employee id, optionally introduced: "EMP001", "my id is emp_001", "ID: E-1234."
+_EMPLOYEE_ID = re.compile(
+    r"^\s*(?:(?:my\s+)?(?:employee\s+)?id\s*(?:is|:|=)?\s*|it'?s\s+|i\s*am\s+|i'm\s+)?"
+    r"[\"'`]?([A-Za-z]{1,5}[-_]?\d{1,8})[\"'`]?\s*[.!]?\s*$",
+    re.IGNORECASE
+)
+
+_LEAVE = re.compile(r"\b(?:leaves?|vacation|holidays?|pto|days?\s+off|time\s+off|annual|sick\s+days?)\b", re.IGNORECASE)
+_BALANCE = re.compile(r"\b(?:balance|left|remaining|how\s+many|do\s+i\s+have|have\s+i\s+got|check)\b", re.IGNORECASE)
+
+_EXPENSE = re.compile(r"\b(?:expenses?|reimburse\w*|claim)\b", re.IGNORECASE)
+# Only amounts with a currency marker count; "3 nights", "2 taxi rides" are not amounts
+_AMOUNT = re.compile(
+    r"(?:aed|usd|dhs?|\$)\s*(\d+(?:[.,]\d{1,2})?)|(\d+(?:[.,]\d{1,2})?)\s*(?:aed|usd|dirhams?|dhs?)\b",
+    re.IGNORECASE
+)
+_EXPENSE_DESC = re.compile(r"\bfor\s+(?:an?\s+|the\s+|my\s+)?(.+?)\s*[.!]?\s*$", re.IGNORECASE)
+
+# A command, not a mention: "change my address to ...", "set address: ...", "my new address is ..."
+_ADDRESS = re.compile(
+    r"^\s*(?:please\s+)?(?:(?:update|change|set)\s+(?:my\s+)?(?:home\s+|postal\s+|mailing\s+)?address\s*(?:to\b|:)"
+    r"|(?:my\s+)?new\s+address\s+is\b:?)\s*(.+?)\s*[.!]?\s*$",
+    re.IGNORECASE
+)
+
+# Write actions are only fast-pathed for plain requests; questions, negations and complaints
+# ("did my claim go through?", "new address is not showing") go to the LLM
+_QUESTION = re.compile(
+    r"\?|^\s*(?:did|do|does|can|could|is|are|was|were|will|would|should|has|have|what|where|when|how|why|which|who)\b",
+    re.IGNORECASE
+)
+_NEGATION = re.compile(
+    r"\b(?:not|never|no\s+longer|didn'?t|don'?t|doesn'?t|isn'?t|wasn'?t|haven'?t|hasn'?t|can'?t|cannot|won'?t|wrong)\b",
+    re.IGNORECASE
+)
+
+# Questions about rules rather than the user's own data belong to policy search (LLM path)
+_POLICY = re.compile(
+    r"\b(?:policy|policies|rules?|entitled|allowed|eligible|how\s+does|how\s+do|what\s+is\s+the|carry\s+over|law)\b",
+    re.IGNORECASE
+)
+
+
+class Route(NamedTuple):
+    command: str
+    args: List[str]
+    confidence: float
+
+
+_stats: Counter = Counter()
+_fast_path_ms = 0.0
+
+
+def _route(message: str, verified: bool) -> Optional[Route]:
+    text = message.strip()
+    if not text or len(text) > 300:
+        return None
+
+    if not verified:
+        match = _EMPLOYEE_ID.match(text)
+        if match:
+            return Route("VERIFY_IDENTITY", [match.group(1)], 0.95)
+        # Anything else needs the LLM to ask for an id
+        return None
+
+    if _POLICY.search(text):
+        return None
+
+    plain_request = not _QUESTION.search(text) and not _NEGATION.search(text)
+
+    address = _ADDRESS.match(text)
+    if address and address.group(1):
+        if plain_request:
+            return Route("UPDATE_ADDRESS", [address.group(1)], 0.9)
+        return Route("UPDATE_ADDRESS", [], 0.3)
+
+    if _EXPENSE.search(text):
+        if not plain_request:
+            return Route("SUBMIT_EXPENSE", [], 0.3)
+        amounts = [a or b for a, b in _AMOUNT.findall(text)]
+        description = _EXPENSE_DESC.search(text)
+        if len(amounts) == 1 and description:
+            return Route("SUBMIT_EXPENSE", [amounts[0].replace(",", "."), description.group(1)], 0.85)
+        # No amount with a currency, or several: let the LLM sort it out
+        return Route("SUBMIT_EXPENSE", [], 0.3)
+
+    if _LEAVE.search(text):
+        if _BALANCE.search(text):
+            return Route("GET_LEAVE_BALANCE", [], 0.9)
+        return Route("GET_LEAVE_BALANCE", [], 0.5)
+
+    return None
+
+
+def route_message(message: str, verified: bool) -> Optional[Route]:
+    """
+    Rule-based intent for common chat messages, None when the LLM classifier should decide.
+    `verified`: whether the sender already has a verified employee context.
+    """
+    route = _route(message, verified)
+    _stats["messages"] += 1
+    if route is None or route.confidence < FAST_PATH_MIN_CONFIDENCE:
+        _stats["llm_fallback"] += 1
+        if route is not None:
+            _stats["low_confidence"] += 1
+        return None
+    _stats[f"fast_path:{route.command}"] += 1
+    return route
+
+
+def record_fast_path_latency(started: float):
+    global _fast_path_ms
+    _fast_path_ms += (time.perf_counter() - started) * 1000
+
+
+FAILED_ACTION_REPLY = "Sorry, I couldn't complete that. Please try again."
+# run_tool messages that read badly as a reply
+_FAILED_TOOL_REPLIES = {
+    "Error: Invalid format.": "I couldn't read that expense claim. Please include the amount and what it was for.",
+}
+
+
+def fast_path_reply(command: str, result: Any, tool_message: Optional[str] = None) -> str:
+    """Templated replies in place of the LLM synthesis call (`tool_message`: run_tool's message)"""
+    if result is None:
+        # The tool failed (bad arguments, not verified, ...); its message says why
+        if tool_message in _FAILED_TOOL_REPLIES:
+            return _FAILED_TOOL_REPLIES[tool_message]
+        if tool_message:
+            return re.sub(r"^(ERROR|Error):\s*", "", tool_message) or FAILED_ACTION_REPLY
+        return FAILED_ACTION_REPLY
+    if command == "VERIFY_IDENTITY":
+        if result.get("valid"):
+            return f"Welcome back, {result['name']}. I've verified your identity."
+        return "I couldn't verify that ID. Please check it and try again."
+    if command == "GET_LEAVE_BALANCE":
+        return (f"You have {result.get('annual', 0)} days of annual leave "
+                f"and {result.get('sick', 0)} days of sick leave.")
+    # Action tools already answer in plain language
+    return str(result)
+
+
+def router_metrics() -> Dict[str, Any]:
+    """Routing hit rate since process start (per worker)"""
+    messages = _stats["messages"]
+    fast = sum(v for k, v in _stats.items() if k.startswith("fast_path:"))
+    return {
+        "messages": messages,
+        "fast_path": fast,
+        "llm_fallback": _stats["llm_fallback"],
+        "low_confidence": _stats["low_confidence"],
+        "hit_rate": round(fast / messages, 4) if messages else 0.0,
+        "by_intent": {k.split(":", 1)[1]: v for k, v in _stats.items() if k.startswith("fast_path:")},
+        "avg_fast_path_ms": round(_fast_path_ms / fast, 3) if fast else 0.0,
+        "min_confidence": FAST_PATH_MIN_CONFIDENCE,
+        "worker_pid": os.getpid(),
+    }
+
+
+def parse_tool_command(response_text: str):
+    """
+    (command, args) from the LLM classifier output, (None, []) for a plain reply.
+    Accepts "TOOL:COMMAND|arg|arg" or function call style COMMAND(arg1, "arg2").
+    """
+    command = None
+    args: List[str] = []
+
+    if response_text.startswith("TOOL:"):
+        parts = response_text.split("|")
+        command = parts[0].replace("TOOL:", "").strip()
+        args = parts[1:]
+    elif "(" in response_text and ")" in response_text:
+        # Fallback: Generic Function Call Parser
+        try:
+            cmd_match = re.match(r'([A-Z_]+)\s*\(', response_text)
+            if cmd_match:
+                command = cmd_match.group(1)
+
+                # Content between first ( and last )
+                start_idx = response_text.find("(")
+                end_idx = response_text.rfind(")")
+                if start_idx != -1 and end_idx != -1:
+                    params_str = response_text[start_idx+1:end_idx]
+                    # Non-comma stuff or quoted stuff
+                    raw_args = re.findall(r'(?:[^,"]|"(?:\\.|[^"])*")+', params_str)
+                    for arg in raw_args:
+                        clean_arg = arg.strip()
+                        # Remove key= if present (kwarg to positional)
+                        if "=" in clean_arg:
+                            clean_arg = clean_arg.split("=", 1)[1].strip()
+                        clean_arg = clean_arg.strip('"').strip("'")
+                        if clean_arg:
+                            args.append(clean_arg)
+        except Exception as e:
+            print(f"Parsing Error: {e}")
+
+    return command, args
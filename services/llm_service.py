@@ -1,13 +1,73 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
+import time
+import threading
 
-load_dotenv()
+from services.metrics_service import record_llm_call
 
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Groq client, built on first use (the groq/httpx import is a large part of the cold start).
+    Shared by all threads of the worker, it keeps one connection pool.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                from dotenv import load_dotenv
+                load_dotenv()
+                _client = Groq(
+                    api_key=os.environ.get("GROQ_API_KEY"),
+                )
+    return _client
+
+def get_async_client():
+    """AsyncGroq client for streaming on the event loop (no thread held per chunk), built on first use"""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from groq import AsyncGroq
+                from dotenv import load_dotenv
+                load_dotenv()
+                _async_client = AsyncGroq(
+                    api_key=os.environ.get("GROQ_API_KEY"),
+                )
+    return _async_client
+
+def create_completion(operation: str, **kwargs):
+    """
+    client.chat.completions.create, recording latency and token usage under `operation`.
+    For stream=True the latency is time to the first response and tokens are recorded by the caller.
+    """
+    model = kwargs.get("model", "")
+    started = time.perf_counter()
+    try:
+        completion = get_client().chat.completions.create(**kwargs)
+    except Exception:
+        record_llm_call(model, operation, time.perf_counter() - started, status="error")
+        raise
+    usage = None if kwargs.get("stream") else getattr(completion, "usage", None)
+    record_llm_call(model, operation, time.perf_counter() - started, usage)
+    return completion
+
+async def create_completion_async(operation: str, **kwargs):
+    """create_completion on the AsyncGroq client"""
+    model = kwargs.get("model", "")
+    started = time.perf_counter()
+    try:
+        completion = await get_async_client().chat.completions.create(**kwargs)
+    except Exception:
+        record_llm_call(model, operation, time.perf_counter() - started, status="error")
+        raise
+    usage = None if kwargs.get("stream") else getattr(completion, "usage", None)
+    record_llm_call(model, operation, time.perf_counter() - started, usage)
+    return completion
 
 def extract_clauses_from_text(text: str, source_name: str):
     # Chunking logic to avoid Rate Limits (TPM)
@@ -41,7 +101,8 @@ def extract_clauses_from_text(text: str, source_name: str):
         """
         
         try:
-            completion = client.chat.completions.create(
+            completion = create_completion(
+                "clause_extraction",
                 model="llama-3.1-8b-instant",
                 messages=[
                     {"role": "system", "content": "You are a helpful legal assistant that outputs only JSON."},
@@ -69,7 +130,7 @@ def extract_clauses_from_text(text: str, source_name: str):
     return {"clauses": all_clauses}
 
 def assemble_contract_from_clauses(clauses_list: list, requirements: dict):
-    clauses_json = json.dumps(clauses_list)
+    clauses_json = json.dumps(clauses_list, separators=(",", ":"))
     requirements_json = json.dumps(requirements)
     
     prompt = f"""
@@ -109,7 +170,8 @@ def assemble_contract_from_clauses(clauses_list: list, requirements: dict):
     - If you rewrite, return the full text strings in the list.
     """
     
-    completion = client.chat.completions.create(
+    completion = create_completion(
+        "contract_assembly",
         model="llama-3.1-8b-instant",
         messages=[
             {"role": "system", "content": "You are a helpful legal assistant that outputs only JSON."},
@@ -0,0 +1,404 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple, Sequence, List, Optional
+
+from pymongo import monitoring
+
+# Default latency buckets (seconds), from fast DB calls up to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Metrics are updated from the event loop, asyncio.to_thread workers and pymongo's listener threads
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self, values=None) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._values)
+
+    @staticmethod
+    def merge(into: dict, key: Tuple[str, ...], value):
+        into[key] = into.get(key, 0) + value
+
+    def render(self, values=None) -> List[str]:
+        lines = super().render()
+        for key, value in sorted((self._values if values is None else values).items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], list]:
+        return {key: [list(counts), total] for key, (counts, total) in self._values.items()}
+
+    @staticmethod
+    def merge(into: dict, key: Tuple[str, ...], value):
+        entry = into.get(key)
+        if entry is None:
+            into[key] = [list(value[0]), value[1]]
+        elif len(entry[0]) == len(value[0]):
+            entry[0] = [a + b for a, b in zip(entry[0], value[0])]
+            entry[1] += value[1]
+
+    def render(self, values=None) -> List[str]:
+        lines = super().render()
+        for key, (counts, total) in sorted((self._values if values is None else values).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# With several server workers each process has its own registry. When METRICS_MULTIPROC_DIR is set
+# (serve.py does it), every worker writes a snapshot there and /metrics adds up all live workers,
+# so a scrape gives the same totals whichever worker answers it.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+
+
+def _snapshot() -> Dict[str, dict]:
+    with _lock:
+        return {metric.name: metric.snapshot() for metric in _registry}
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, f"{pid}.json")
+
+
+def _write_snapshot():
+    data = {name: [[list(key), value] for key, value in values.items()] for name, values in _snapshot().items()}
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=METRICS_MULTIPROC_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, _snapshot_path(os.getpid()))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _other_worker_snapshots() -> List[Dict[str, list]]:
+    snapshots = []
+    try:
+        entries = list(os.scandir(METRICS_MULTIPROC_DIR))
+    except FileNotFoundError:
+        return snapshots
+    for entry in entries:
+        name, ext = os.path.splitext(entry.name)
+        if ext != ".json" or not name.isdigit() or int(name) == os.getpid():
+            continue
+        if not _pid_alive(int(name)):
+            # Worker exited (restart, scale down); its counters go with it, Prometheus treats it as a reset
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            with open(entry.path) as f:
+                snapshots.append(json.load(f))
+        except (FileNotFoundError, ValueError):
+            continue
+    return snapshots
+
+
+def _flush_loop():
+    while not _flusher_stop.wait(METRICS_FLUSH_SECONDS):
+        try:
+            _write_snapshot()
+        except OSError as e:
+            print(f"Metrics snapshot failed: {e}")
+
+
+def start_metrics_flusher():
+    """Starts writing this worker's snapshot for the other workers (no-op unless METRICS_MULTIPROC_DIR is set)"""
+    global _flusher
+    if not METRICS_MULTIPROC_DIR or _flusher is not None:
+        return
+    _flusher_stop.clear()
+    _write_snapshot()
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_metrics_flusher():
+    global _flusher
+    if _flusher is None:
+        return
+    _flusher_stop.set()
+    _flusher.join()
+    _flusher = None
+    try:
+        os.remove(_snapshot_path(os.getpid()))
+    except FileNotFoundError:
+        pass
+
+
+def render_metrics() -> str:
+    """All metrics (of every worker with METRICS_MULTIPROC_DIR) in the Prometheus text exposition format (0.0.4)"""
+    values = _snapshot()
+    if METRICS_MULTIPROC_DIR:
+        by_name = {metric.name: metric for metric in _registry}
+        for snapshot in _other_worker_snapshots():
+            for name, entries in snapshot.items():
+                metric = by_name.get(name)
+                if metric is None:
+                    continue
+                for key, value in entries:
+                    metric.merge(values[name], tuple(key), value)
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(values[metric.name]))
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics ---
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled", ("method",))
+
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Time spent in processing stages (pdf_extraction, clause_parsing, clause_insert, pdf_render, ...)",
+    ("stage",)
+)
+
+DB_COMMANDS = Counter("mongodb_commands_total", "MongoDB commands by outcome", ("command", "collection", "status"))
+DB_LATENCY = Histogram("mongodb_command_duration_seconds", "MongoDB command latency", ("command", "collection"))
+DB_POOL_CONNECTIONS = Gauge("mongodb_pool_connections", "Pooled connections by state (open / in_use)", ("server", "state"))
+DB_POOL_WAIT = Histogram("mongodb_pool_checkout_wait_seconds", "Time waiting for a pooled connection", ("server",))
+DB_POOL_CHECKOUT_FAILURES = Counter("mongodb_pool_checkout_failures_total", "Failed connection checkouts", ("server", "reason"))
+
+LLM_REQUESTS = Counter("llm_requests_total", "LLM completion calls by outcome", ("model", "operation", "status"))
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM completion latency", ("model", "operation"))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens by direction (prompt / completion)", ("model", "operation", "direction"))
+
+PDF_CACHE = Counter("pdf_cache_requests_total", "Rendered PDF disk cache lookups", ("result",))
+
+EXPENSE_CLAIMS = Counter(
+    "expense_claims_total",
+    "Expense claims by outcome (queued / written / written_through / dead_lettered)",
+    ("outcome",)
+)
+EXPENSE_FLUSH_FAILURES = Counter("expense_flush_failures_total", "Failed expense batch writes", ("reason",))
+EXPENSE_BUFFERED = Gauge("expense_claims_buffered", "Expense claims queued in memory, not yet written")
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Times a block (sync or inside a coroutine) as stage_duration_seconds{stage=...}"""
+    with STAGE_LATENCY.time(stage=stage):
+        yield
+
+
+def record_llm_call(model: str, operation: str, seconds: float, usage=None, status: str = "ok"):
+    LLM_REQUESTS.inc(model=model, operation=operation, status=status)
+    LLM_LATENCY.observe(seconds, model=model, operation=operation)
+    record_llm_tokens(model, operation, usage)
+
+
+def record_llm_tokens(model: str, operation: str, usage):
+    """usage: the provider's usage object (prompt_tokens / completion_tokens), ignored if missing"""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, operation=operation, direction="prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, operation=operation, direction="completion")
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command the driver sends (Beanie and raw Motor calls alike)"""
+
+    def __init__(self):
+        self._started: Dict[tuple, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._started[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event, status: str):
+        collection = self._started.pop((event.connection_id, event.request_id), "")
+        DB_COMMANDS.inc(command=event.command_name, collection=collection, status=status)
+        DB_LATENCY.observe(event.duration_micros / 1e6, command=event.command_name, collection=collection)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Connection pool usage per server, for /metrics and /health/db (the driver has no public pool stats)"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _server(self, event) -> Dict[str, int]:
+        server = "%s:%s" % event.address
+        with _lock:
+            stats = self._stats.get(server)
+            if stats is None:
+                stats = self._stats[server] = {"open": 0, "in_use": 0, "checkouts": 0, "checkout_failures": 0, "pool_cleared": 0}
+        return stats
+
+    def _change(self, event, field: str, amount: int = 1):
+        stats = self._server(event)
+        with _lock:
+            stats[field] += amount
+        if field in ("open", "in_use"):
+            DB_POOL_CONNECTIONS.inc(amount, server="%s:%s" % event.address, state=field)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with _lock:
+            return {server: dict(stats) for server, stats in self._stats.items()}
+
+    def connection_created(self, event):
+        self._change(event, "open")
+
+    def connection_closed(self, event):
+        self._change(event, "open", -1)
+
+    def connection_checked_out(self, event):
+        self._change(event, "in_use")
+        self._change(event, "checkouts")
+        # duration (checkout wait) was added in pymongo 4.7
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            DB_POOL_WAIT.observe(duration, server="%s:%s" % event.address)
+
+    def connection_checked_in(self, event):
+        self._change(event, "in_use", -1)
+
+    def connection_check_out_failed(self, event):
+        self._change(event, "checkout_failures")
+        DB_POOL_CHECKOUT_FAILURES.inc(server="%s:%s" % event.address, reason=str(event.reason))
+
+    def pool_cleared(self, event):
+        self._change(event, "pool_cleared")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def route_label(request) -> str:
+    """Route template ("/contracts/{contract_id}/pdf") rather than the raw path, to keep label cardinality bounded"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Optional, Tuple
+
+from services.pdf_gen_service import render_contract_pdf_async
+from services.metrics_service import PDF_CACHE
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "cache/pdf")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bump when the PDF layout changes so cached files and ETags are invalidated
+RENDERER_VERSION = "1"
+
+
+def contract_pdf_text(content: str) -> str:
+    """Contract content is stored as a JSON list of blocks, join them (plain text as fallback)"""
+    try:
+        clauses = json.loads(content)
+        return "\n\n".join(clauses)
+    except Exception:
+        return content
+
+
+def pdf_content_hash(text: str, title: str = "Employment Contract") -> str:
+    digest = hashlib.sha256()
+    for part in (RENDERER_VERSION, title, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def etag_for(content_hash: str) -> str:
+    """Strong ETag: same hash means byte-identical PDF"""
+    return f'"{content_hash}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cache_path(contract_id: str, content_hash: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{contract_id}-{content_hash[:32]}.pdf")
+
+
+def _evict(keep_path: str):
+    """Drops least recently used files (by mtime, touched on hits) until the cache fits its size budget"""
+    try:
+        entries = []
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+async def get_contract_pdf(contract_id: str, text: str, title: str = "Employment Contract") -> Tuple[bytes, str]:
+    """
+    Returns (pdf bytes, content_hash), rendering into the disk cache on a miss.
+    Keyed by contract id + content hash, so a changed contract never serves a stale file.
+    Returns bytes rather than the cache path: another request's eviction may unlink the file
+    before a response would get to read it (a file that vanished between lookup and read is a miss).
+    """
+    content_hash = pdf_content_hash(text, title)
+    path = _cache_path(contract_id, content_hash)
+
+    try:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except FileNotFoundError:
+            pass
+        PDF_CACHE.inc(result="hit")
+        return pdf_bytes, content_hash
+
+    PDF_CACHE.inc(result="miss")
+    pdf_bytes = await render_contract_pdf_async(text, title)
+
+    # Atomic write: concurrent requests (or workers) never see a half-written file
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+
+    _evict(keep_path=path)
+    return pdf_bytes, content_hash
@@ -1,36 +1,65 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_JUSTIFY
+import os
+import re
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 
-def generate_contract_pdf(contract_text: str, filename: str = "contract.pdf") -> BytesIO:
+from services.metrics_service import stage_timer
+
+# Number of render processes. 0 renders in a thread of the API process instead.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Markdown -> ReportLab markup, compiled once per process
+_BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+
+_styles = None
+_pool = None
+# get_pdf_pool() runs on the event loop and in the warm-up thread; without the lock both could create a pool
+_pool_lock = threading.Lock()
+
+
+def get_styles():
+    """Stylesheet with the contract styles, built once per process"""
+    global _styles
+    if _styles is None:
+        # ReportLab is imported here so API workers only load it when a PDF is rendered (or at warm-up)
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_JUSTIFY
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='Justify', alignment=TA_JUSTIFY, leading=14, spaceAfter=10))
+        styles.add(ParagraphStyle(name='SectionHeader', parent=styles['Heading2'], spaceBefore=15, spaceAfter=8))
+        _styles = styles
+    return _styles
+
+
+def render_contract_pdf_bytes(contract_text: str, title: str = "Employment Contract") -> bytes:
     """
-    Generates a PDF file from the contract text.
+    Lays out the contract text (light Markdown: #/##/### headers, - bullets, **bold**) and returns the PDF bytes.
+    Module level + bytes in/out so it can run in the process pool.
     """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    styles = get_styles()
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter,
                             rightMargin=72, leftMargin=72,
                             topMargin=72, bottomMargin=18)
-    
+
     Story = []
-    
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Justify', alignment=TA_JUSTIFY, leading=14, spaceAfter=10))
-    styles.add(ParagraphStyle(name='SectionHeader', parent=styles['Heading2'], spaceBefore=15, spaceAfter=8))
-    
+
     # Title
-    Story.append(Paragraph("Employment Contract", styles["Title"]))
+    Story.append(Paragraph(title, styles["Title"]))
     Story.append(Spacer(1, 20))
-    
+
     # Content - splitting by newlines for paragraphs
-    lines = contract_text.split('\n')
-    
-    for line in lines:
+    for line in contract_text.split('\n'):
         line = line.strip()
         if not line:
             continue
-            
+
         if line.startswith('# '):
             # Header 1 (Title - already handled really, but just in case)
             Story.append(Paragraph(line[2:], styles["Heading1"]))
@@ -46,11 +75,62 @@ def generate_contract_pdf(contract_text: str, filename: str = "contract.pdf") ->
         else:
             # Normal paragraph
             # Bold support: **text** -> <b>text</b>
-            import re
-            formatted_line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', line)
-            p = Paragraph(formatted_line, styles["Justify"])
-            Story.append(p)
-            
+            formatted_line = _BOLD_PATTERN.sub(r'<b>\1</b>', line)
+            Story.append(Paragraph(formatted_line, styles["Justify"]))
+
     doc.build(Story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+
+def generate_contract_pdf(contract_text: str, filename: str = "contract.pdf", title: str = "Employment Contract") -> BytesIO:
+    """
+    Generates a PDF file from the contract text (synchronous, in the calling process).
+    """
+    return BytesIO(render_contract_pdf_bytes(contract_text, title))
+
+
+def get_pdf_pool():
+    """Process pool for ReportLab layout, created on first use"""
+    global _pool
+    if _pool is None and PDF_WORKERS > 0:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that already runs an event loop and Mongo client threads is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=get_styles
+                )
+    return _pool
+
+
+async def render_contract_pdf_async(contract_text: str, title: str = "Employment Contract") -> bytes:
+    """Renders off the event loop so PDF downloads don't block other requests"""
+    with stage_timer("pdf_render"):
+        pool = get_pdf_pool()
+        if pool is None:
+            return await asyncio.to_thread(render_contract_pdf_bytes, contract_text, title)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, render_contract_pdf_bytes, contract_text, title)
+
+
+def _warm_worker():
+    get_styles()  # Already built by the initializer; returns nothing because stylesheets don't pickle
+
+
+def warm_pdf_pool():
+    """Starts the render processes and builds their stylesheets, so the first download doesn't pay for it"""
+    pool = get_pdf_pool()
+    if pool is None:
+        return
+    # One task per worker; the executor spawns a process for each one it can't hand to an idle worker
+    for future in [pool.submit(_warm_worker) for _ in range(PDF_WORKERS)]:
+        future.result()
+
+
+def shutdown_pdf_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
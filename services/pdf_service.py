@@ -1,7 +1,7 @@
-from pypdf import PdfReader
 from io import BytesIO
 
 def extract_text_from_pdf(file_content: bytes) -> str:
+    from pypdf import PdfReader  # Imported on first upload, not at startup
     reader = PdfReader(BytesIO(file_content))
     text = ""
     for page in reader.pages:
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import tempfile
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+# Profiling is off unless a token is configured; the X-Profile header and admin endpoints must present it
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "cache/profiles")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# Profiled requests at the same time per worker, each one runs a sampler thread
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+
+# Sampling rate set through the admin endpoint, in a file so every worker picks it up
+_SETTINGS_FILE = os.path.join(PROFILE_DIR, "_settings.json")
+_settings = {"sample_rate": float(os.getenv("PROFILE_SAMPLE_RATE", "0")), "top_n": PROFILE_TOP_N}
+_settings_checked = 0.0
+_settings_mtime = None
+
+_active = threading.Semaphore(PROFILE_MAX_CONCURRENT)
+
+
+def token_valid(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and secrets.compare_digest(token, PROFILING_TOKEN)
+
+
+def get_settings() -> Dict[str, Any]:
+    """Current settings, re-read from the shared file at most once a second"""
+    global _settings_checked, _settings_mtime
+    now = time.monotonic()
+    if now - _settings_checked >= 1.0:
+        _settings_checked = now
+        try:
+            mtime = os.path.getmtime(_SETTINGS_FILE)
+            if mtime != _settings_mtime:
+                with open(_SETTINGS_FILE) as f:
+                    _settings.update(json.load(f))
+                _settings_mtime = mtime
+        except (FileNotFoundError, ValueError):
+            pass
+    return dict(_settings)
+
+
+def update_settings(sample_rate: float, top_n: Optional[int] = None) -> Dict[str, Any]:
+    global _settings_checked
+    _settings["sample_rate"] = sample_rate
+    if top_n is not None:
+        _settings["top_n"] = top_n
+    _write_atomic(_SETTINGS_FILE, json.dumps(_settings))
+    _settings_checked = 0.0
+    return dict(_settings)
+
+
+def should_profile(header_token: Optional[str]) -> bool:
+    if not PROFILING_TOKEN:
+        return False
+    if header_token is not None:
+        return token_valid(header_token)
+    rate = get_settings()["sample_rate"]
+    return rate > 0 and random.random() < rate
+
+
+_CWD = os.getcwd() + os.sep
+_SITE_PACKAGES = "site-packages" + os.sep
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Paths relative to the project / site-packages keep the stacks readable
+    idx = filename.rfind(_SITE_PACKAGES)
+    if idx != -1:
+        filename = filename[idx + len(_SITE_PACKAGES):]
+    elif filename.startswith(_CWD):
+        filename = filename[len(_CWD):]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread (the event loop) every `interval` seconds from a background thread.
+    Cheap enough for production requests, but on a busy worker the samples include whatever
+    other requests ran on the loop at the same time.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, one "frame;frame;frame count" per line (flamegraph.pl, speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top_functions(self, n: int) -> List[Dict[str, Any]]:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for f in set(frames):
+                total[f] += count
+        samples = self.samples or 1
+        return [
+            {
+                "function": f,
+                "self_samples": own[f],
+                "self_pct": round(100 * own[f] / samples, 1),
+                "total_samples": total[f],
+                "total_pct": round(100 * total[f] / samples, 1),
+            }
+            for f, _ in sorted(total.items(), key=lambda kv: (own[kv[0]], kv[1]), reverse=True)[:n]
+        ]
+
+
+def _write_atomic(path: str, data: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _prune():
+    """Keeps the newest PROFILE_KEEP profiles"""
+    try:
+        entries = sorted(
+            (e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".json") and not e.name.startswith("_")),
+            key=lambda e: e.stat().st_mtime, reverse=True
+        )
+    except FileNotFoundError:
+        return
+    for entry in entries[PROFILE_KEEP:]:
+        for path in (entry.path, entry.path[:-len(".json")] + ".folded"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def begin_profile() -> Optional[StackSampler]:
+    """Starts sampling the calling (event loop) thread, None if too many profiles are running already"""
+    if not _active.acquire(blocking=False):
+        return None
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    return sampler
+
+
+def finish_profile(sampler: StackSampler, method: str, path: str, route: str, status: int, duration: float) -> str:
+    """Stops the sampler, stores the top functions and collapsed stacks, returns the profile id"""
+    try:
+        sampler.stop()
+    finally:
+        _active.release()
+
+    profile_id = f"{int(time.time() * 1000)}-{secrets.token_hex(4)}"
+    summary = {
+        "id": profile_id,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "pid": os.getpid(),
+        "method": method,
+        "path": path,
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration * 1000, 2),
+        "samples": sampler.samples,
+        "interval_ms": sampler.interval * 1000,
+        "top_functions": sampler.top_functions(get_settings()["top_n"]),
+    }
+    _write_atomic(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), sampler.collapsed())
+    _write_atomic(os.path.join(PROFILE_DIR, f"{profile_id}.json"), json.dumps(summary))
+    _prune()
+    return profile_id
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent profiles of all workers (without the function tables)"""
+    try:
+        entries = sorted(
+            (e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".json") and not e.name.startswith("_")),
+            key=lambda e: e.name, reverse=True
+        )[:limit]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        try:
+            with open(entry.path) as f:
+                summary = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        profiles.append(summary)
+    return profiles
+
+
+def profile_path(profile_id: str, kind: str = "json") -> Optional[str]:
+    # Ids are generated here; anything else (path separators, ..) is rejected
+    if not all(c.isalnum() or c == "-" for c in profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{kind}")
+    return path if os.path.exists(path) else None
@@ -17,7 +17,7 @@ async def search_knowledge_base(query: str, country: str = None) -> str:
     # regex pattern: (keyword1|keyword2|...)
     pattern = "|".join(keywords)
     
-    db_query = {"text": {"$regex": pattern, "$options": "i"}}
+    db_query = {"text": {"$regex": pattern, "$options": "i"}, "duplicate_of": None}
     
     if country:
         db_query["country"] = country
@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+from typing import Dict, Any, Optional
+
+# Warm-up after init_db: "background" (default) serves requests right away while it runs,
+# "blocking" finishes it before the worker reports ready, "off" leaves everything to the first requests
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+# Spawning the PDF render processes costs a few hundred ms of CPU per process
+WARMUP_PDF_POOL = os.getenv("WARMUP_PDF_POOL", "1") == "1"
+# Active legal templates compiled into the template cache
+WARMUP_TEMPLATES = int(os.getenv("WARMUP_TEMPLATES", "20"))
+
+_report: Dict[str, Any] = {"pid": os.getpid(), "steps": {}, "warmup": {}, "warmup_mode": STARTUP_WARMUP}
+_warmup_task: Optional[asyncio.Task] = None
+
+
+def record_step(name: str, started: float, section: str = "steps"):
+    _report[section][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def mark_ready(started: float):
+    """started: perf_counter() taken at the top of main.py, before the app imports"""
+    _report["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Worker {os.getpid()} ready in {_report['ready_ms']:.0f} ms: {_report['steps']}")
+
+
+def startup_report() -> Dict[str, Any]:
+    return {**_report, "steps": dict(_report["steps"]), "warmup": dict(_report["warmup"]),
+            "warmup_done": _warmup_task is None or _warmup_task.done()}
+
+
+async def _timed(name: str, coro_or_fn, *args):
+    started = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(coro_or_fn):
+            await coro_or_fn(*args)
+        else:
+            # Imports and process spawning are blocking, keep them off the event loop
+            await asyncio.to_thread(coro_or_fn, *args)
+    except Exception as e:
+        print(f"Warm-up step {name} failed: {e}")
+        _report["warmup"][name] = f"failed: {type(e).__name__}"
+        return
+    record_step(name, started, "warmup")
+
+
+def _import_heavy_modules():
+    # Lazily imported by the handlers; loading them here moves the cost off the first upload / export
+    import pypdf  # noqa: F401
+    import openpyxl  # noqa: F401
+    import numpy  # noqa: F401
+
+
+def _llm_client():
+    from services.llm_service import get_client, get_async_client
+    get_client()
+    get_async_client()
+
+
+def _pdf_styles():
+    from services.pdf_gen_service import get_styles
+    get_styles()
+
+
+def _pdf_pool():
+    from services.pdf_gen_service import warm_pdf_pool
+    warm_pdf_pool()
+
+
+async def _db_ping():
+    # Opens the first pooled connection (TLS + auth) before a request needs it
+    from database import ping_db
+    await ping_db()
+
+
+async def _legal_templates():
+    from models import Contract
+    from services.contract_service import load_compiled_template
+    contracts = await Contract.find(
+        Contract.contract_type == "legal", Contract.is_active == True
+    ).sort(-Contract.created_at).limit(WARMUP_TEMPLATES).to_list()
+    for contract in contracts:
+        await load_compiled_template(contract)
+
+
+async def warm_up():
+    await _timed("db_ping", _db_ping)
+    await _timed("imports", _import_heavy_modules)
+    await _timed("llm_client", _llm_client)
+    await _timed("pdf_styles", _pdf_styles)
+    if WARMUP_TEMPLATES > 0:
+        await _timed("legal_templates", _legal_templates)
+    if WARMUP_PDF_POOL:
+        await _timed("pdf_pool", _pdf_pool)
+
+
+async def start_warm_up():
+    """Runs warm_up() according to STARTUP_WARMUP"""
+    global _warmup_task
+    if STARTUP_WARMUP == "off":
+        return
+    if STARTUP_WARMUP == "blocking":
+        started = time.perf_counter()
+        await warm_up()
+        record_step("warmup", started)
+        return
+    _warmup_task = asyncio.create_task(warm_up())
+
+
+async def stop_warm_up():
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,187 @@
+import re
+import json
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Union
+
+# {key} and [Insert Key] placeholders, matched in a single pass at compile time
+_PLACEHOLDER = re.compile(r"\{([^{}\n]+)\}|\[Insert ([^\]\n]*)\]")
+
+# Filler for [Insert ...] placeholders that have no value
+BLANK = "_______________"
+
+# Defaults for the employment contract (UAE Labor Law / Best Practice)
+CONTRACT_DEFAULTS = {
+    "probation_period": "6", # Months
+    "notice_period": "30",   # Days
+    "annual_leave": "30",    # Days
+    "working_hours": "8",
+    "rest_days": "1",
+    "currency": "AED",
+    "term": "2",             # Years standard
+    "company_address": "Dubai, United Arab Emirates",
+}
+
+# Compiled segment: a literal string, or ["brace" | "insert", key, raw_placeholder]
+Segment = Union[str, List[str]]
+
+# Compiled templates by legal contract id, so hot templates skip the JSON parse as well
+_COMPILED_CACHE: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_COMPILED_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=4096)
+def _compile_text_cached(text: str, brace_only: bool) -> Tuple[Segment, ...]:
+    segments: List[Segment] = []
+    pos = 0
+    for match in _PLACEHOLDER.finditer(text):
+        brace_key, insert_key = match.group(1), match.group(2)
+        if brace_only and brace_key is None:
+            continue
+        if match.start() > pos:
+            segments.append(text[pos:match.start()])
+        if brace_key is not None:
+            segments.append(["brace", brace_key, match.group(0)])
+        else:
+            segments.append(["insert", insert_key, match.group(0)])
+        pos = match.end()
+    if pos < len(text):
+        segments.append(text[pos:])
+    return tuple(segments)
+
+
+def compile_text(text: str, brace_only: bool = False) -> List[Segment]:
+    """
+    Splits text into literal segments and placeholder slots.
+    brace_only=True only treats {key} as a slot (used for raw clause text).
+    """
+    return list(_compile_text_cached(text, brace_only))
+
+
+def compile_contract_template(contract_content: list) -> List[Dict[str, Any]]:
+    """
+    Compiles the blocks of a legal contract once.
+    Text blocks become {"segments": [...]}, clause references become {"clause_id": ..., "variables": {...}}.
+    """
+    compiled = []
+    for item in contract_content:
+        # If item is a dict with just "text" (LLM artifact), treat it as a string
+        if isinstance(item, dict) and "text" in item and not item.get("clause_id") and not item.get("id"):
+            item = item["text"]
+
+        if isinstance(item, str):
+            compiled.append({"segments": compile_text(item)})
+        elif isinstance(item, dict):
+            clause_id = item.get("clause_id") or item.get("id")
+            if clause_id:
+                compiled.append({"clause_id": str(clause_id), "variables": item.get("variables") or {}})
+    return compiled
+
+
+def get_compiled_template(contract, content: str = None) -> List[Dict[str, Any]]:
+    """
+    Compiled template for a legal contract: process cache, then the stored copy, then compile from content
+    (pass `content` for delta-stored versions whose `content` field is empty).
+    """
+    key = str(contract.id)
+    cached = _COMPILED_CACHE.get(key)
+    if cached is not None:
+        _COMPILED_CACHE.move_to_end(key)
+        return cached
+
+    if contract.compiled_template:
+        compiled = json.loads(contract.compiled_template)
+    else:
+        compiled = compile_contract_template(json.loads(content if content is not None else contract.content))
+
+    _COMPILED_CACHE[key] = compiled
+    if len(_COMPILED_CACHE) > _COMPILED_CACHE_SIZE:
+        _COMPILED_CACHE.popitem(last=False)
+    return compiled
+
+
+def referenced_clause_ids(compiled: List[Dict[str, Any]]) -> List[str]:
+    return [block["clause_id"] for block in compiled if "clause_id" in block]
+
+
+def build_candidate_variables(company_id: str, candidate_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Defaults + candidate data + computed values (end_date), computed once per candidate"""
+    defaults = {**CONTRACT_DEFAULTS, "company_name": company_id or "Employer"}
+    # Candidate overrides defaults
+    final_vars = {**defaults, **candidate_data}
+
+    if "start_date" in final_vars:
+        try:
+            # Calculate end_date based on term: same day, + term years
+            start_dt = datetime.strptime(str(final_vars["start_date"]), "%Y-%m-%d")
+            term_years = int(float(final_vars.get("term", 2)))
+            try:
+                end_dt = start_dt.replace(year=start_dt.year + term_years)
+            except ValueError: # Leap day case
+                end_dt = start_dt.replace(year=start_dt.year + term_years, day=28)
+            final_vars["end_date"] = end_dt.strftime("%Y-%m-%d")
+        except Exception as e:
+            print(f"Error computing end_date: {e}")
+            final_vars["end_date"] = "________________"
+
+    return final_vars
+
+
+def _insert_lookup(values: Dict[str, str]) -> Dict[str, str]:
+    """[Insert key] and [Insert Key Title] both resolve to key; the first key wins like sequential replaces did"""
+    lookup: Dict[str, str] = {}
+    for k, v in values.items():
+        lookup.setdefault(k, v)
+        lookup.setdefault(k.replace('_', ' ').title(), v)
+    return lookup
+
+
+def render_segments(segments: List[Segment], values: Dict[str, str], insert_values: Dict[str, str] = None) -> str:
+    """Single pass slot fill. Unknown {key} stays as-is, unknown [Insert ...] becomes a blank line"""
+    out = []
+    for seg in segments:
+        if isinstance(seg, str):
+            out.append(seg)
+        elif seg[0] == "brace":
+            out.append(values.get(seg[1], seg[2]))
+        else:
+            value = insert_values.get(seg[1]) if insert_values is not None else None
+            out.append(value if value is not None else BLANK)
+    return "".join(out)
+
+
+def render_employment_clauses(compiled: List[Dict[str, Any]], clause_map: Dict[str, Any],
+                              final_vars: Dict[str, Any], candidate_data: Dict[str, Any]) -> List[str]:
+    """Renders a compiled legal template for one candidate"""
+    values = {k: str(v) for k, v in final_vars.items()}
+    insert_values = _insert_lookup(values)
+    candidate_values = {k: str(v) for k, v in candidate_data.items()}
+
+    final_clauses = []
+    for block in compiled:
+        # CASE A: Text block (from LLM rewriting)
+        if "segments" in block:
+            final_clauses.append(render_segments(block["segments"], values, insert_values))
+            continue
+
+        # CASE B: Clause reference, rendered from the DB text to ensure integrity
+        clause_id = block["clause_id"]
+        db_clause = clause_map.get(clause_id)
+        if not db_clause:
+            final_clauses.append(f"[Clause {clause_id} missing]")
+            continue
+
+        # Clause defaults < variables resolved during assembly < candidate data
+        clause_vars = {}
+        try:
+            if db_clause.variables:
+                clause_vars = {k: str(v) for k, v in json.loads(db_clause.variables).items()}
+        except Exception:
+            pass
+        clause_vars.update({k: str(v) for k, v in block["variables"].items()})
+        clause_vars.update(candidate_values)
+
+        final_clauses.append(render_segments(compile_text(db_clause.text, brace_only=True), clause_vars))
+
+    return final_clauses
@@ -0,0 +1,217 @@
+import os
+import re
+import json
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, Union
+
+from beanie import PydanticObjectId
+from models import Contract
+
+# Every Nth version in a chain is stored in full, the ones in between as diffs against their parent
+SNAPSHOT_INTERVAL = int(os.getenv("CONTRACT_SNAPSHOT_INTERVAL", "10"))
+
+# Words and the whitespace between them; joining the tokens gives back the exact text
+_TOKEN = re.compile(r"\s+|\S+")
+
+# Versions are immutable, so rebuilt contents can be cached by id
+_CONTENT_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_CONTENT_CACHE_SIZE = 512
+
+# Delta ops: int > 0 keep n tokens, int < 0 drop n tokens, str insert text
+DeltaOp = Union[int, str]
+
+
+def make_delta(old: str, new: str) -> List[DeltaOp]:
+    old_tokens = _TOKEN.findall(old)
+    new_tokens = _TOKEN.findall(new)
+    ops: List[DeltaOp] = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if tag in ("replace", "delete"):
+            ops.append(-(i2 - i1))
+        if tag in ("replace", "insert"):
+            ops.append("".join(new_tokens[j1:j2]))
+    return ops
+
+
+def apply_delta(old: str, ops: List[DeltaOp]) -> str:
+    old_tokens = _TOKEN.findall(old)
+    out = []
+    pos = 0
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op > 0:
+            out.append("".join(old_tokens[pos:pos + op]))
+            pos += op
+        else:
+            pos -= op
+    return "".join(out)
+
+
+def _cache_content(contract_id: str, content: str):
+    _CONTENT_CACHE[contract_id] = content
+    _CONTENT_CACHE.move_to_end(contract_id)
+    if len(_CONTENT_CACHE) > _CONTENT_CACHE_SIZE:
+        _CONTENT_CACHE.popitem(last=False)
+
+
+def build_contract_version(parent: Contract, parent_content: str, new_content: str, **fields) -> Contract:
+    """
+    New version of `parent` (not yet inserted). Stored as a diff against the parent,
+    or as a full snapshot every SNAPSHOT_INTERVAL versions (or when the diff wouldn't be smaller).
+    """
+    version = Contract(
+        contract_type=parent.contract_type,
+        company_id=parent.company_id,
+        candidate_name=parent.candidate_name,
+        employee_id=parent.employee_id,
+        country=parent.country,
+        version=parent.version + 1,
+        parent_contract_id=str(parent.id),
+        parent_id=parent.id,
+        content=new_content,
+        **fields
+    )
+
+    depth = parent.versions_since_snapshot + 1
+    if depth < SNAPSHOT_INTERVAL:
+        delta = json.dumps(make_delta(parent_content, new_content), separators=(",", ":"))
+        if len(delta) < len(new_content):
+            version.content = ""
+            version.delta = delta
+            version.snapshot_id = parent.snapshot_id or str(parent.id)
+            version.versions_since_snapshot = depth
+    return version
+
+
+def _rebuild(target: Contract, by_id: Dict[str, Contract]) -> str:
+    """Walks parents from target to its snapshot, then applies the deltas forward"""
+    chain = []
+    current = target
+    while current.delta is not None:
+        cached = _CONTENT_CACHE.get(str(current.id))
+        if cached is not None:
+            content = cached
+            break
+        chain.append(current)
+        current = by_id.get(current.parent_contract_id)
+        if current is None:
+            raise ValueError(f"Version chain of contract {target.id} is broken")
+    else:
+        content = current.content
+
+    for version in reversed(chain):
+        content = apply_delta(content, json.loads(version.delta))
+        _cache_content(str(version.id), content)
+    return content
+
+
+async def load_contract_content(contract: Contract) -> str:
+    """Full text of any contract version (snapshot content, or rebuilt from its nearest snapshot)"""
+    if contract.delta is None:
+        return contract.content
+
+    cached = _CONTENT_CACHE.get(str(contract.id))
+    if cached is not None:
+        _CONTENT_CACHE.move_to_end(str(contract.id))
+        return cached
+
+    # The snapshot and every delta stored against it, in one query
+    chain_docs = await Contract.find({"$or": [
+        {"_id": PydanticObjectId(contract.snapshot_id)},
+        {"snapshot_id": contract.snapshot_id},
+    ]}).to_list()
+    by_id = {str(c.id): c for c in chain_docs}
+    by_id[str(contract.id)] = contract
+    return _rebuild(contract, by_id)
+
+
+async def hydrate_contents(contracts: List[Contract]) -> List[Contract]:
+    """Fills in `content` for delta-stored versions in a list (one query per snapshot chain)"""
+    snapshot_ids = {c.snapshot_id for c in contracts if c.delta is not None and str(c.id) not in _CONTENT_CACHE}
+    by_id: Dict[str, Contract] = {}
+    if snapshot_ids:
+        chain_docs = await Contract.find({"$or": [
+            {"_id": {"$in": [PydanticObjectId(s) for s in snapshot_ids]}},
+            {"snapshot_id": {"$in": list(snapshot_ids)}},
+        ]}).to_list()
+        by_id = {str(c.id): c for c in chain_docs}
+
+    for c in contracts:
+        if c.delta is not None:
+            by_id.setdefault(str(c.id), c)
+            c.content = _rebuild(c, by_id)
+    return contracts
+
+
+# Fields left out of the history unless content is requested
+_CONTENT_FIELDS = ("content", "delta", "compiled_template")
+
+
+async def backfill_parent_ids():
+    """Versions created before parent_id existed only have the string parent_contract_id"""
+    await Contract.get_motor_collection().update_many(
+        {"parent_contract_id": {"$ne": None}, "parent_id": None},
+        [{"$set": {"parent_id": {"$toObjectId": "$parent_contract_id"}}}]
+    )
+
+
+async def get_contract_history(contract_id: str, include_content: bool = False) -> List[Dict[str, Any]]:
+    """
+    Whole version chain of a contract (ancestors, itself and descendants) ordered by version,
+    fetched with one aggregation using $graphLookup over the indexed parent_id field.
+    """
+    pipeline = [
+        {"$match": {"_id": PydanticObjectId(contract_id)}},
+        {"$graphLookup": {
+            "from": Contract.Settings.name,
+            "startWith": "$parent_id",
+            "connectFromField": "parent_id",
+            "connectToField": "_id",
+            "as": "ancestors",
+        }},
+        {"$graphLookup": {
+            "from": Contract.Settings.name,
+            "startWith": "$_id",
+            "connectFromField": "_id",
+            "connectToField": "parent_id",
+            "as": "descendants",
+        }},
+    ]
+    if not include_content:
+        pipeline.append({"$project": {
+            f"{prefix}{field}": 0
+            for prefix in ("", "ancestors.", "descendants.")
+            for field in _CONTENT_FIELDS
+        }})
+
+    results = await Contract.aggregate(pipeline).to_list()
+    if not results:
+        return []
+
+    root = results[0]
+    docs = root.pop("ancestors") + [root] + root.pop("descendants")
+    docs.sort(key=lambda d: (d.get("version", 1), d.get("created_at")))
+
+    if include_content:
+        # The chain contains every snapshot its deltas need, rebuild in memory
+        versions = [Contract.model_validate(d) for d in docs]
+        by_id = {str(v.id): v for v in versions}
+        for v, d in zip(versions, docs):
+            d["content"] = _rebuild(v, by_id) if v.delta is not None else v.content
+            d.pop("delta", None)
+            d.pop("compiled_template", None)
+
+    history = []
+    for d in docs:
+        d["id"] = str(d.pop("_id"))
+        if d.get("parent_id") is not None:
+            d["parent_id"] = str(d["parent_id"])
+        d["storage"] = "snapshot" if d.get("versions_since_snapshot", 0) == 0 else "delta"
+        history.append(d)
+    return history
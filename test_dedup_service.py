@@ -0,0 +1,110 @@
+import pytest
+
+import services.dedup_service as dedup
+from models import Clause, PDFSource
+from services.dedup_service import (
+    DEDUP_THRESHOLD, NUM_PERM, LSH_BANDS, minhash_signature, lsh_buckets, estimate_jaccard,
+    dedup_scope, insert_clauses_with_dedup
+)
+
+CLAUSE = (
+    "The employer shall grant the employee annual leave of not less than thirty days for each year of service, "
+    "and two days for each month if the service is more than six months but less than one year. "
+    "The employee may carry over unused leave to the following year with the written approval of the employer."
+)
+# Same clause with different casing, punctuation and line breaks, and one extra word
+NEAR_DUPLICATE = CLAUSE.upper().replace(", ", "\n").replace("written approval", "written approval;") + " CONCERNED"
+# Same topic and vocabulary, different provisions
+DISTINCT = (
+    "The employee shall be entitled to sick leave of not more than ninety days for each year of service "
+    "after the probation period, the first fifteen days with full pay and the next thirty days with half pay. "
+    "The employer may request a medical report issued by a licensed health authority."
+)
+
+
+def similarity(a, b):
+    return estimate_jaccard(minhash_signature(a), minhash_signature(b))
+
+
+def shares_bucket(a, b):
+    return bool(set(lsh_buckets(minhash_signature(a))) & set(lsh_buckets(minhash_signature(b))))
+
+
+def test_signature_is_deterministic_and_normalised():
+    signature = minhash_signature(CLAUSE)
+    assert len(signature) == NUM_PERM
+    assert signature == minhash_signature(CLAUSE)
+    assert minhash_signature("Annual  leave, of THIRTY days!") == minhash_signature("annual leave of thirty days")
+    assert len(lsh_buckets(signature)) == LSH_BANDS
+
+
+def test_near_duplicate_is_above_threshold():
+    assert similarity(CLAUSE, NEAR_DUPLICATE) >= DEDUP_THRESHOLD
+    assert shares_bucket(CLAUSE, NEAR_DUPLICATE)
+
+
+def test_distinct_clause_is_below_threshold():
+    assert similarity(CLAUSE, DISTINCT) < 0.5
+    assert not shares_bucket(CLAUSE, DISTINCT)
+
+
+@pytest.mark.parametrize("text", ["Leave", "Annual leave", ""])
+def test_short_texts_have_signatures(text):
+    assert similarity(text, text) == 1.0
+
+
+def test_estimate_jaccard_of_missing_signature():
+    assert estimate_jaccard([], minhash_signature(CLAUSE)) == 0.0
+
+
+def clause(text, source):
+    return Clause(text=text, clause_type="leave", country=source.country, source_id=str(source.id))
+
+
+@pytest.fixture
+def link_mode(monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "link")
+
+
+def test_duplicates_are_linked_within_scope(run_db, link_mode):
+    async def body():
+        uae_law = await PDFSource(filename="a.pdf", category="law", country="UAE").create()
+        uae_update = await PDFSource(filename="b.pdf", category="law", country="UAE").create()
+        ksa_law = await PDFSource(filename="c.pdf", category="law", country="KSA").create()
+
+        first = await insert_clauses_with_dedup(
+            [clause(CLAUSE, uae_law), clause(NEAR_DUPLICATE, uae_law)], await dedup_scope(uae_law)
+        )
+        assert first == {"inserted": 2, "duplicates": 1}
+
+        second = await insert_clauses_with_dedup(
+            [clause(NEAR_DUPLICATE, uae_update), clause(DISTINCT, uae_update)], await dedup_scope(uae_update)
+        )
+        assert second == {"inserted": 2, "duplicates": 1}
+
+        # Another country's law is out of scope, so it keeps its own copy
+        other = await insert_clauses_with_dedup([clause(CLAUSE, ksa_law)], await dedup_scope(ksa_law))
+        assert other == {"inserted": 1, "duplicates": 0}
+
+        original = await Clause.find_one(Clause.text == CLAUSE, Clause.country == "UAE")
+        linked = await Clause.find(Clause.duplicate_of == str(original.id)).to_list()
+        # Both near-duplicates point at the first copy, not at each other
+        assert sorted(c.source_id for c in linked) == sorted([str(uae_law.id), str(uae_update.id)])
+        assert await Clause.find(Clause.duplicate_of == None).count() == 3  # noqa: E711
+
+    run_db(body)
+
+
+def test_skip_mode_drops_duplicates(run_db, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "skip")
+
+    async def body():
+        source = await PDFSource(filename="a.pdf", category="law", country="UAE").create()
+        result = await insert_clauses_with_dedup(
+            [clause(CLAUSE, source), clause(NEAR_DUPLICATE, source), clause(DISTINCT, source)],
+            await dedup_scope(source)
+        )
+        assert result == {"inserted": 2, "duplicates": 1}
+        assert sorted(c.text for c in await Clause.find_all().to_list()) == sorted([CLAUSE, DISTINCT])
+
+    run_db(body)
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from models import EquityGrant, VestingSchedule
+from services.equity_service import compute_vesting, _months_elapsed, cap_table_snapshot, grant_letter_text
+
+
+def vested(start, as_of, options=4800, cliff=12, duration=48, frequency=1,
+           acceleration_percent=0.0, acceleration_date=None):
+    """Vested options of a single grant"""
+    return int(compute_vesting(
+        start_dates=np.array([start], dtype="datetime64[D]"),
+        options=np.array([options], dtype=np.int64),
+        cliff_months=np.array([cliff], dtype=np.int64),
+        duration_months=np.array([duration], dtype=np.int64),
+        frequency_months=np.array([frequency], dtype=np.int64),
+        acceleration_percent=np.array([acceleration_percent]),
+        acceleration_dates=np.array([acceleration_date], dtype="datetime64[D]"),
+        as_of=datetime.fromisoformat(as_of),
+    )[0])
+
+
+@pytest.mark.parametrize("start, as_of, months", [
+    ("2024-01-15", "2024-02-14", 0),
+    ("2024-01-15", "2024-02-15", 1),
+    ("2024-01-31", "2024-02-29", 0),
+    ("2024-01-31", "2024-03-01", 1),
+    # Leap-day start: the month completes on the 29th, or on the 1st where the month has no 29th
+    ("2024-02-29", "2024-03-28", 0),
+    ("2024-02-29", "2024-03-29", 1),
+    ("2024-02-29", "2025-02-28", 11),
+    ("2024-02-29", "2025-03-01", 12),
+    ("2024-02-29", "2028-02-29", 48),
+    ("2024-06-01", "2024-05-01", -1),
+])
+def test_months_elapsed(start, as_of, months):
+    elapsed = _months_elapsed(np.array([start], dtype="datetime64[D]"), np.datetime64(as_of, "D"))
+    assert int(elapsed[0]) == months
+
+
+@pytest.mark.parametrize("as_of, expected", [
+    ("2024-01-01", 0),      # before the start
+    ("2025-01-14", 0),      # a day before the cliff
+    ("2025-01-15", 1200),   # cliff: the first 12 months vest at once
+    ("2025-02-15", 1300),
+    ("2027-12-15", 4700),
+    ("2028-01-15", 4800),
+    ("2030-01-01", 4800),   # never more than granted
+])
+def test_cliff_vesting(as_of, expected):
+    assert vested("2024-01-15", as_of) == expected
+
+
+@pytest.mark.parametrize("as_of, expected", [
+    ("2025-02-28", 0),
+    ("2025-03-01", 1200),
+    ("2028-02-28", 4700),
+    ("2028-02-29", 4800),
+])
+def test_cliff_vesting_from_leap_day(as_of, expected):
+    assert vested("2024-02-29", as_of) == expected
+
+
+def test_quarterly_vesting_rounds_down_to_the_last_quarter():
+    assert vested("2024-01-01", "2025-05-01", cliff=0, frequency=3) == 4800 * 15 // 48
+    assert vested("2024-01-01", "2025-04-01", cliff=0, frequency=3) == 4800 * 15 // 48
+    assert vested("2024-01-01", "2025-03-31", cliff=0, frequency=3) == 4800 * 12 // 48
+
+
+def test_acceleration_vests_share_of_unvested_options():
+    # 1200 vested at the cliff, half of the remaining 3600 accelerates once the trigger date has passed
+    assert vested("2024-01-15", "2025-01-20", acceleration_percent=50, acceleration_date="2025-01-20") == 3000
+    assert vested("2024-01-15", "2025-01-19", acceleration_percent=50, acceleration_date="2025-01-20") == 1200
+
+
+def test_cap_table_snapshot(run_db):
+    async def body():
+        await EquityGrant.insert_many([
+            EquityGrant(employee_id="E1", vesting_start_date=datetime(2024, 2, 29), number_of_options=4800,
+                        vesting_schedule="{}", status="granted"),
+            EquityGrant(employee_id="E1", vesting_start_date=datetime(2025, 1, 1), number_of_options=100,
+                        vesting_schedule="{}", status="granted"),
+            EquityGrant(employee_id="E2", vesting_start_date=datetime(2024, 1, 1), number_of_options=480,
+                        vesting_schedule="{}", vesting=VestingSchedule(cliff_months=0), status="granted"),
+            EquityGrant(employee_id="E3", vesting_start_date=datetime(2020, 1, 1), number_of_options=1000,
+                        vesting_schedule="{}", status="cancelled"),
+        ])
+        return await cap_table_snapshot(datetime(2025, 3, 1))
+
+    snapshot = run_db(body)
+    assert snapshot["grants"] == 3
+    assert snapshot["total_options"] == 5380
+    assert snapshot["by_employee"] == [
+        {"employee_id": "E1", "options": 4900, "vested": 1200, "unvested": 3700},
+        {"employee_id": "E2", "options": 480, "vested": 140, "unvested": 340},
+    ]
+    assert snapshot["vested"] == 1340
+
+
+def test_grant_letter_describes_schedule():
+    grant = EquityGrant(
+        employee_id="E1", grant_date=datetime(2024, 3, 1), vesting_start_date=datetime(2024, 2, 29),
+        number_of_options=4800, vesting_schedule="{}",
+        vesting=VestingSchedule(acceleration="double_trigger", acceleration_percent=50),
+    )
+    text = grant_letter_text(grant)
+    assert "Vesting Start Date: 2024-02-29" in text
+    assert "4 year vesting, 12 month cliff, vesting every 1 month(s)" in text
+    assert "Acceleration: double trigger, 50% of unvested options." in text
@@ -0,0 +1,78 @@
+import pytest
+
+from services.intent_router import route_message, fast_path_reply, FAST_PATH_MIN_CONFIDENCE
+
+
+def fast_path(message, verified=True):
+    """(command, args) the router acts on without the LLM, None if it defers to the LLM"""
+    route = route_message(message, verified=verified)
+    return (route.command, route.args) if route else None
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Submit an expense of 120 AED for taxi", ("SUBMIT_EXPENSE", ["120", "taxi"])),
+    ("claim 45,50 AED for lunch.", ("SUBMIT_EXPENSE", ["45.50", "lunch"])),
+    ("I want to claim $30 for parking", ("SUBMIT_EXPENSE", ["30", "parking"])),
+    ("Reimburse AED 200 for the client dinner", ("SUBMIT_EXPENSE", ["200", "client dinner"])),
+    ("Please change my address to 12 Palm Street, Dubai", ("UPDATE_ADDRESS", ["12 Palm Street, Dubai"])),
+    ("update address: Flat 2, Marina", ("UPDATE_ADDRESS", ["Flat 2, Marina"])),
+    ("My new address is Villa 4, Jumeirah.", ("UPDATE_ADDRESS", ["Villa 4, Jumeirah"])),
+    ("How many leave days do I have left?", ("GET_LEAVE_BALANCE", [])),
+    ("What is my leave balance?", ("GET_LEAVE_BALANCE", [])),
+])
+def test_fast_path_commands(message, expected):
+    assert fast_path(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    # Questions about a claim are not claims
+    "Did my expense claim for 3 nights hotel go through?",
+    "Can I claim for 2 taxi rides?",
+    "What happened to my 50 AED expense for lunch",
+    "Is my claim of 100 AED for the taxi approved?",
+    # Numbers without a currency are not amounts
+    "claim expense 50 for lunch",
+    "Expense for 3 nights hotel",
+    # Several amounts: the LLM has to pick
+    "claim 20 AED for taxi and 30 AED for lunch",
+    # Negations and complaints
+    "I didn't claim 40 AED for parking",
+    # Address questions and complaints
+    "Is the new address change applied to my file?",
+    "new address is not showing, can you check",
+    "Where do I set my new address? Is there a form",
+    "My address is wrong",
+    "Why did you change my address to the old one",
+    # Mentions of an address that aren't a command
+    "I moved, can HR send the letter to my new address",
+    # Policy questions go to policy search
+    "What is the leave policy for part-time staff?",
+    "Am I entitled to sick leave during probation?",
+])
+def test_questions_and_mentions_go_to_the_llm(message):
+    assert fast_path(message) is None
+
+
+@pytest.mark.parametrize("message, employee_id", [
+    ("EMP001", "EMP001"),
+    ("my id is emp_001", "emp_001"),
+    ("ID: E-1234.", "E-1234"),
+])
+def test_unverified_ids(message, employee_id):
+    assert fast_path(message, verified=False) == ("VERIFY_IDENTITY", [employee_id])
+
+
+def test_unverified_users_get_no_actions():
+    assert fast_path("Submit an expense of 120 AED for taxi", verified=False) is None
+    assert fast_path("How many leave days do I have left?", verified=False) is None
+
+
+def test_threshold_is_above_low_confidence_routes():
+    # The 0.3 / 0.5 "probably this intent" routes must never act on their own
+    assert FAST_PATH_MIN_CONFIDENCE > 0.5
+
+
+def test_failed_action_reply_is_never_none():
+    assert fast_path_reply("SUBMIT_EXPENSE", None, None) != "None"
+    assert fast_path_reply("SUBMIT_EXPENSE", None, "ERROR: User must verify identity first.") == "User must verify identity first."
+    assert "amount" in fast_path_reply("SUBMIT_EXPENSE", None, "Error: Invalid format.")
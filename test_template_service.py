@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.template_service import (
+    BLANK, compile_text, compile_contract_template, referenced_clause_ids,
+    build_candidate_variables, render_segments, render_employment_clauses
+)
+
+
+def render(text, values, insert_values=None):
+    return render_segments(compile_text(text), values, insert_values)
+
+
+def test_known_placeholders_are_filled():
+    values = {"name": "Aisha", "salary": "12000"}
+    text = "Employee: {name}, salary {salary}, signed by [Insert Name]."
+    assert render(text, values, {"Name": "Aisha"}) == "Employee: Aisha, salary 12000, signed by Aisha."
+
+
+def test_unknown_brace_placeholder_is_left_as_is():
+    assert render("Dear {name}, your manager is {manager}.", {"name": "Aisha"}) == "Dear Aisha, your manager is {manager}."
+
+
+@pytest.mark.parametrize("insert_values", [{}, {"Other": "x"}, None])
+def test_unknown_insert_placeholder_becomes_blank(insert_values):
+    assert render("Signed at [Insert Location] on {date}", {}, insert_values) == f"Signed at {BLANK} on {{date}}"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("{}", "{}"),
+    ("{multi\nline}", "{multi\nline}"),
+    ("[Insert Name", "[Insert Name"),
+    ("{{name}}", "{Aisha}"),
+])
+def test_malformed_placeholders_stay_literal(text, expected):
+    assert render(text, {"name": "Aisha", "": "empty"}) == expected
+
+
+def test_brace_only_keeps_insert_placeholders():
+    segments = compile_text("Hello {name}, [Insert Title]", brace_only=True)
+    assert render_segments(segments, {"name": "Aisha"}) == "Hello Aisha, [Insert Title]"
+
+
+def test_compile_contract_template_blocks():
+    compiled = compile_contract_template([
+        "Intro for {name}",
+        {"text": "Plain dict text {role}"},
+        {"clause_id": "c1", "variables": {"notice_period": "60"}},
+        {"id": "c2"},
+        {"type": "heading"},  # neither text nor clause reference
+    ])
+    assert len(compiled) == 4
+    assert compiled[2] == {"clause_id": "c1", "variables": {"notice_period": "60"}}
+    assert compiled[3] == {"clause_id": "c2", "variables": {}}
+    assert referenced_clause_ids(compiled) == ["c1", "c2"]
+
+
+def test_candidate_variables_override_defaults_and_compute_end_date():
+    final_vars = build_candidate_variables("Acme", {"name": "Aisha", "start_date": "2024-02-29", "notice_period": "60"})
+    assert final_vars["company_name"] == "Acme"
+    assert final_vars["notice_period"] == "60"
+    assert final_vars["currency"] == "AED"
+    # Two-year term from a leap day ends on the 28th
+    assert final_vars["end_date"] == "2026-02-28"
+
+
+def test_unparseable_start_date_blanks_end_date():
+    final_vars = build_candidate_variables("", {"start_date": "next month"})
+    assert final_vars["company_name"] == "Employer"
+    assert set(final_vars["end_date"]) == {"_"}
+
+
+def test_render_employment_clauses():
+    clause_map = {
+        "c1": SimpleNamespace(
+            text="Notice period: {notice_period} days for {name}. Bonus: {bonus}. [Insert Date]",
+            variables=json.dumps({"notice_period": "30", "bonus": "none"}),
+        ),
+        "c2": SimpleNamespace(text="Governed by {law}.", variables="not json"),
+    }
+    compiled = compile_contract_template([
+        "Contract between {company_name} and [Insert Name], from {start_date} to {end_date}. Ref: {reference}",
+        {"clause_id": "c1", "variables": {"notice_period": "45"}},
+        {"clause_id": "c2"},
+        {"clause_id": "gone"},
+    ])
+    candidate = {"name": "Aisha", "start_date": "2024-01-01", "bonus": "10%"}
+    final_vars = build_candidate_variables("Acme", candidate)
+
+    assert render_employment_clauses(compiled, clause_map, final_vars, candidate) == [
+        f"Contract between Acme and Aisha, from 2024-01-01 to 2026-01-01. Ref: {{reference}}",
+        # Clause defaults < template variables < candidate data; [Insert ...] in clause text is left alone
+        "Notice period: 45 days for Aisha. Bonus: 10%. [Insert Date]",
+        "Governed by {law}.",
+        "[Clause gone missing]",
+    ]
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+import services.versioning_service as versioning
+from models import Contract
+from services.versioning_service import (
+    make_delta, apply_delta, build_contract_version, load_contract_content, hydrate_contents
+)
+
+BASE_TEXT = " ".join(
+    f"Clause {i}: the employee shall work {i} hours and receive AED {i * 100} per month." for i in range(1, 21)
+)
+
+
+def amended(text, version):
+    """The text after amendment `version` (each one changes a different clause)"""
+    return text.replace(f"receive AED {version * 100} ", f"receive AED {version * 100 + 50} ")
+
+
+@pytest.fixture(autouse=True)
+def empty_content_cache():
+    versioning._CONTENT_CACHE.clear()
+    yield
+    versioning._CONTENT_CACHE.clear()
+
+
+@pytest.mark.parametrize("old, new", [
+    ("a b c", "a b c"),
+    ("a b c", "a x c"),
+    ("a  b\nc", "a b\n\nc d"),
+    ("", "new text"),
+    ("old text", ""),
+])
+def test_delta_round_trip(old, new):
+    assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_multi_amend_chain_rebuilds_from_snapshots(run_db, monkeypatch):
+    monkeypatch.setattr(versioning, "SNAPSHOT_INTERVAL", 3)
+
+    async def body():
+        base = Contract(contract_type="legal", company_id="c", content=BASE_TEXT)
+        await base.create()
+        versions, texts = [base], [BASE_TEXT]
+        for n in range(2, 8):
+            parent = versions[-1]
+            new_text = amended(texts[-1], n)
+            version = build_contract_version(parent, await load_contract_content(parent), new_text, status="amended")
+            await version.create()
+            versions.append(version)
+            texts.append(new_text)
+
+        # v1 snapshot, v2-v3 deltas on v1, v4 snapshot, v5-v6 deltas on v4, v7 snapshot
+        assert [v.version for v in versions] == [1, 2, 3, 4, 5, 6, 7]
+        assert [v.versions_since_snapshot for v in versions] == [0, 1, 2, 0, 1, 2, 0]
+        assert [v.delta is not None for v in versions] == [False, True, True, False, True, True, False]
+        assert versions[2].snapshot_id == str(versions[0].id)
+        assert versions[5].snapshot_id == str(versions[3].id)
+        assert versions[5].content == ""
+
+        # Rebuilt from what is stored, not from the cache filled while amending
+        versioning._CONTENT_CACHE.clear()
+        for version, text in zip(versions, texts):
+            stored = await Contract.get(version.id)
+            assert await load_contract_content(stored) == text
+
+        versioning._CONTENT_CACHE.clear()
+        stored = await Contract.find({"_id": {"$in": [v.id for v in versions]}}).sort("version").to_list()
+        hydrated = await hydrate_contents(stored)
+        assert [c.content for c in hydrated] == texts
+
+    run_db(body)
+
+
+def test_large_rewrite_is_stored_as_snapshot(run_db):
+    async def body():
+        base = Contract(contract_type="legal", company_id="c", content=BASE_TEXT)
+        await base.create()
+        rewritten = json.dumps([{"type": "clause", "text": "Entirely new terms."}])
+        version = build_contract_version(base, BASE_TEXT, rewritten)
+        # A diff longer than the new text isn't worth storing
+        assert version.delta is None
+        assert version.content == rewritten
+        assert version.versions_since_snapshot == 0
+
+    run_db(body)
+
+
+def test_broken_chain_is_reported(run_db):
+    async def body():
+        base = Contract(contract_type="legal", company_id="c", content=BASE_TEXT)
+        await base.create()
+        version = build_contract_version(base, BASE_TEXT, amended(BASE_TEXT, 1))
+        await version.create()
+        await base.delete()
+        versioning._CONTENT_CACHE.clear()
+        with pytest.raises(ValueError, match="chain"):
+            await load_contract_content(version)
+
+    run_db(body)